@@ -0,0 +1,140 @@
+"""partition excel data by user
+
+Revision ID: 0a6d2c8e4b19
+Revises: f5a8c1d7e230
+Create Date: 2026-10-16 14:05:37.218604
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '0a6d2c8e4b19'
+down_revision: Union[str, None] = 'f5a8c1d7e230'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# 면세점별 엑셀 테이블
+EXCEL_TABLES = {
+    'lotte_excel_data': 'lotte',
+    'shilla_excel_data': 'shilla',
+}
+
+
+def _data_columns(table_name: str) -> str:
+    columns = '"receiptNumber", name, "PayBack"'
+    if table_name == 'shilla_excel_data':
+        columns += ', passport_number'
+    return columns
+
+
+def _create_partitioned_table(table_name: str) -> None:
+    """사용자별 LIST 파티션 엑셀 데이터 테이블 생성"""
+    columns = [
+        sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('batch_id', sa.Integer(), nullable=False),
+        sa.Column('receiptNumber', sa.String(length=20), nullable=False),
+        sa.Column('name', sa.String(length=100), nullable=True),
+        sa.Column('PayBack', sa.Float(), nullable=True),
+    ]
+    if table_name == 'shilla_excel_data':
+        columns.append(sa.Column('passport_number', sa.String(length=20), nullable=True))
+    columns.append(sa.Column('created_at', sa.TIMESTAMP(), server_default=sa.text('now()'), nullable=True))
+    
+    op.create_table(table_name, *columns,
+    sa.ForeignKeyConstraint(['batch_id'], ['excel_upload_batches.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id', 'user_id'),
+    postgresql_partition_by='LIST (user_id)'
+    )
+    op.create_index(f'ux_{table_name}_user_receipt_number', table_name, ['user_id', 'receiptNumber'], unique=True)
+    op.create_index(f'ix_{table_name}_user_name', table_name, ['user_id', 'name'], unique=False)
+    if table_name == 'shilla_excel_data':
+        op.create_index('ix_shilla_excel_data_user_passport_number', table_name, ['user_id', 'passport_number'], unique=False)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('excel_upload_batches',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('duty_free_type', sa.String(length=20), nullable=False),
+    sa.Column('file_name', sa.String(length=255), nullable=True),
+    sa.Column('row_count', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.TIMESTAMP(), server_default=sa.text('now()'), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_excel_upload_batches_user_id'), 'excel_upload_batches', ['user_id'], unique=False)
+    
+    for table_name, duty_free_type in EXCEL_TABLES.items():
+        # 기존 전역 테이블은 진행 중인 세션의 사용자에게 배치 1개로 이전 (그 외 사용자는 다시 업로드)
+        legacy_table = f'{table_name}_legacy'
+        op.rename_table(table_name, legacy_table)
+        for index_name in (f'ux_{table_name}_receipt_number', f'ix_{table_name}_name', f'ix_{table_name}_passport_number'):
+            op.execute(f'DROP INDEX IF EXISTS {index_name}')
+        op.execute(f'ALTER TABLE {legacy_table} RENAME CONSTRAINT {table_name}_pkey TO {legacy_table}_pkey')
+        op.execute(f'ALTER SEQUENCE {table_name}_id_seq RENAME TO {legacy_table}_id_seq')
+        _create_partitioned_table(table_name)
+        
+        op.execute(f"""
+        INSERT INTO excel_upload_batches (user_id, duty_free_type, file_name, row_count)
+        SELECT ps.user_id, ps.duty_free_type, '{table_name} (migrated)', (SELECT COUNT(*) FROM {legacy_table})
+        FROM processing_sessions ps
+        WHERE ps.status = 'active' AND ps.duty_free_type = '{duty_free_type}'
+        """)
+        op.execute(f"""
+        DO $$
+        DECLARE batch RECORD;
+        BEGIN
+            FOR batch IN SELECT id, user_id FROM excel_upload_batches WHERE duty_free_type = '{duty_free_type}' LOOP
+                EXECUTE format('CREATE TABLE %I PARTITION OF {table_name} FOR VALUES IN (%s)',
+                               '{table_name}_u' || batch.user_id, batch.user_id);
+                EXECUTE format('INSERT INTO {table_name} (user_id, batch_id, {_data_columns(table_name)}) '
+                               'SELECT %s, %s, {_data_columns(table_name)} FROM {legacy_table}',
+                               batch.user_id, batch.id);
+            END LOOP;
+        END $$;
+        """)
+        op.drop_table(legacy_table)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table_name in EXCEL_TABLES:
+        # 파티션 데이터를 하나의 전역 테이블로 합침 (영수증 번호 중복 시 먼저 들어온 배치의 행 유지)
+        legacy_table = f'{table_name}_partitioned'
+        op.rename_table(table_name, legacy_table)
+        for index_name in (f'ux_{table_name}_user_receipt_number', f'ix_{table_name}_user_name', f'ix_{table_name}_user_passport_number'):
+            op.execute(f'DROP INDEX IF EXISTS {index_name}')
+        op.execute(f'ALTER TABLE {legacy_table} RENAME CONSTRAINT {table_name}_pkey TO {legacy_table}_pkey')
+        op.execute(f'ALTER SEQUENCE {table_name}_id_seq RENAME TO {legacy_table}_id_seq')
+        
+        columns = [
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('receiptNumber', sa.String(length=20), nullable=False),
+            sa.Column('name', sa.String(length=100), nullable=True),
+            sa.Column('PayBack', sa.Float(), nullable=True),
+        ]
+        if table_name == 'shilla_excel_data':
+            columns.append(sa.Column('passport_number', sa.String(length=20), nullable=True))
+        columns.append(sa.Column('created_at', sa.TIMESTAMP(), server_default=sa.text('now()'), nullable=True))
+        op.create_table(table_name, *columns, sa.PrimaryKeyConstraint('id'))
+        op.create_index(f'ux_{table_name}_receipt_number', table_name, ['receiptNumber'], unique=True)
+        op.create_index(f'ix_{table_name}_name', table_name, ['name'], unique=False)
+        if table_name == 'shilla_excel_data':
+            op.create_index('ix_shilla_excel_data_passport_number', table_name, ['passport_number'], unique=False)
+        
+        op.execute(f"""
+        INSERT INTO {table_name} ({_data_columns(table_name)})
+        SELECT DISTINCT ON ("receiptNumber") {_data_columns(table_name)}
+        FROM {legacy_table}
+        ORDER BY "receiptNumber", batch_id, id
+        """)
+        op.drop_table(legacy_table)  # 사용자별 파티션도 함께 삭제됨
+    
+    op.drop_index(op.f('ix_excel_upload_batches_user_id'), table_name='excel_upload_batches')
+    op.drop_table('excel_upload_batches')
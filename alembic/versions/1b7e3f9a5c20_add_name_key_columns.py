@@ -0,0 +1,54 @@
+"""add name_key columns
+
+Revision ID: 1b7e3f9a5c20
+Revises: 0a6d2c8e4b19
+Create Date: 2026-10-16 15:11:48.530271
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '1b7e3f9a5c20'
+down_revision: Union[str, None] = '0a6d2c8e4b19'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+EXCEL_TABLES = ('lotte_excel_data', 'shilla_excel_data')
+
+# app.utils.name_matcher.normalize_name 과 같은 규칙 (NFKC, 대문자, 하이픈/마침표 제거, 토큰 정렬)
+NAME_KEY_SQL = r"""
+NULLIF(array_to_string(ARRAY(
+    SELECT token
+    FROM regexp_split_to_table(
+        regexp_replace(upper(normalize(name, NFKC)), '[-‐‑''’`.]', '', 'g'),
+        '[\s,<>/()]+'
+    ) AS token
+    WHERE token <> ''
+    ORDER BY token COLLATE "C"
+), ' '), '')
+"""
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('passports', sa.Column('name_key', sa.String(length=100), nullable=True))
+    op.execute(f"UPDATE passports SET name_key = {NAME_KEY_SQL} WHERE name IS NOT NULL")
+    op.create_index('ix_passports_user_id_name_key', 'passports', ['user_id', 'name_key'], unique=False)
+    
+    for table_name in EXCEL_TABLES:
+        op.add_column(table_name, sa.Column('name_key', sa.String(length=100), nullable=True))
+        op.execute(f"UPDATE {table_name} SET name_key = {NAME_KEY_SQL} WHERE name IS NOT NULL")
+        op.create_index(f'ix_{table_name}_user_name_key', table_name, ['user_id', 'name_key'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table_name in EXCEL_TABLES:
+        op.drop_index(f'ix_{table_name}_user_name_key', table_name=table_name)
+        op.drop_column(table_name, 'name_key')
+    
+    op.drop_index('ix_passports_user_id_name_key', table_name='passports')
+    op.drop_column('passports', 'name_key')
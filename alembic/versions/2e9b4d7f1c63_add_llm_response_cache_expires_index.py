@@ -0,0 +1,27 @@
+"""add llm_response_cache expires_at index
+
+Revision ID: 2e9b4d7f1c63
+Revises: a6d4f2c8e915
+Create Date: 2026-10-16 21:12:40.532871
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '2e9b4d7f1c63'
+down_revision: Union[str, None] = 'a6d4f2c8e915'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_llm_response_cache_expires_at', 'llm_response_cache', ['expires_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_llm_response_cache_expires_at', table_name='llm_response_cache')
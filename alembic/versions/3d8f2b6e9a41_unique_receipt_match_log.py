@@ -0,0 +1,35 @@
+"""unique receipt_match_log per receipt number
+
+Revision ID: 3d8f2b6e9a41
+Revises: 1b7e3f9a5c20
+Create Date: 2026-10-16 16:02:37.214908
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '3d8f2b6e9a41'
+down_revision: Union[str, None] = '1b7e3f9a5c20'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # 같은 영수증 번호의 중복 로그는 가장 최근 행만 유지
+    op.execute("""
+    DELETE FROM receipt_match_log m
+    USING receipt_match_log newer
+    WHERE newer.user_id = m.user_id
+    AND newer.receipt_number = m.receipt_number
+    AND newer.id > m.id
+    """)
+    op.create_index('ux_receipt_match_log_user_receipt_number', 'receipt_match_log', ['user_id', 'receipt_number'], unique=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ux_receipt_match_log_user_receipt_number', table_name='receipt_match_log')
@@ -0,0 +1,62 @@
+"""add history search indexes
+
+Revision ID: 5f1c7a3e8d26
+Revises: 3d8f2b6e9a41
+Create Date: 2026-10-16 16:48:05.937162
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '5f1c7a3e8d26'
+down_revision: Union[str, None] = '3d8f2b6e9a41'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    
+    op.create_table('matching_history_receipts',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('history_id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('receipt_number', sa.String(length=50), nullable=False),
+    sa.ForeignKeyConstraint(['history_id'], ['matching_history.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    
+    # 기존 이력의 JSON 문자열(receipt_numbers)을 영수증 번호 행으로 분리
+    op.execute("""
+    INSERT INTO matching_history_receipts (history_id, user_id, receipt_number)
+    SELECT mh.id, mh.user_id, r.receipt_number
+    FROM matching_history mh
+    CROSS JOIN LATERAL jsonb_array_elements_text(mh.receipt_numbers::jsonb) AS r(receipt_number)
+    WHERE mh.receipt_numbers LIKE '[%'
+    AND r.receipt_number <> ''
+    """)
+    
+    op.create_index(op.f('ix_matching_history_receipts_history_id'), 'matching_history_receipts', ['history_id'], unique=False)
+    op.create_index('ix_matching_history_receipts_user_receipt_number', 'matching_history_receipts',
+                    ['user_id', 'receipt_number'], unique=False,
+                    postgresql_ops={'receipt_number': 'varchar_pattern_ops'})
+    op.create_index('ix_matching_history_user_created_at', 'matching_history', ['user_id', 'created_at'], unique=False)
+    op.create_index('ix_matching_history_customer_name_trgm', 'matching_history', ['customer_name'], unique=False,
+                    postgresql_using='gin', postgresql_ops={'customer_name': 'gin_trgm_ops'})
+    op.create_index('ix_matching_history_passport_number_trgm', 'matching_history', ['passport_number'], unique=False,
+                    postgresql_using='gin', postgresql_ops={'passport_number': 'gin_trgm_ops'})
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_matching_history_passport_number_trgm', table_name='matching_history', postgresql_using='gin')
+    op.drop_index('ix_matching_history_customer_name_trgm', table_name='matching_history', postgresql_using='gin')
+    op.drop_index('ix_matching_history_user_created_at', table_name='matching_history')
+    op.drop_index('ix_matching_history_receipts_user_receipt_number', table_name='matching_history_receipts')
+    op.drop_index(op.f('ix_matching_history_receipts_history_id'), table_name='matching_history_receipts')
+    op.drop_table('matching_history_receipts')
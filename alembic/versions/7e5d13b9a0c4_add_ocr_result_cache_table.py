@@ -0,0 +1,40 @@
+"""add ocr_result_cache table
+
+Revision ID: 7e5d13b9a0c4
+Revises: 4c2a9e1f7b3d
+Create Date: 2026-10-16 10:03:17.204816
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = '7e5d13b9a0c4'
+down_revision: Union[str, None] = '4c2a9e1f7b3d'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('ocr_result_cache',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('image_hash', sa.String(length=64), nullable=False),
+    sa.Column('duty_free_type', sa.String(length=20), nullable=False),
+    sa.Column('prompt_version', sa.String(length=64), nullable=False),
+    sa.Column('ocr_text', sa.Text(), nullable=True),
+    sa.Column('parsed_result', postgresql.JSONB(astext_type=sa.Text()), nullable=True),
+    sa.Column('hit_count', sa.Integer(), nullable=True),
+    sa.Column('created_at', sa.TIMESTAMP(), server_default=sa.text('now()'), nullable=True),
+    sa.Column('last_hit_at', sa.TIMESTAMP(), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('image_hash', 'duty_free_type', 'prompt_version', name='uq_ocr_result_cache_key')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('ocr_result_cache')
@@ -0,0 +1,31 @@
+"""add keyset pagination indexes
+
+Revision ID: 8a4e6c2f1b57
+Revises: 5f1c7a3e8d26
+Create Date: 2026-10-16 17:21:44.608319
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '8a4e6c2f1b57'
+down_revision: Union[str, None] = '5f1c7a3e8d26'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_processing_archives_user_archive_date_id', 'processing_archives', ['user_id', 'archive_date', 'id'], unique=False)
+    op.create_index('ix_matching_history_user_created_at_id', 'matching_history', ['user_id', 'created_at', 'id'], unique=False)
+    op.drop_index('ix_matching_history_user_created_at', table_name='matching_history')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.create_index('ix_matching_history_user_created_at', 'matching_history', ['user_id', 'created_at'], unique=False)
+    op.drop_index('ix_matching_history_user_created_at_id', table_name='matching_history')
+    op.drop_index('ix_processing_archives_user_archive_date_id', table_name='processing_archives')
@@ -0,0 +1,67 @@
+"""add archived receipts table
+
+Revision ID: 9c3b5d7e2a64
+Revises: 8a4e6c2f1b57
+Create Date: 2026-10-16 17:58:12.304751
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '9c3b5d7e2a64'
+down_revision: Union[str, None] = '8a4e6c2f1b57'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('archived_receipts',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('duty_free_type', sa.String(length=20), nullable=False),
+    sa.Column('receipt_number', sa.String(length=50), nullable=False),
+    sa.Column('archive_id', sa.Integer(), nullable=True),
+    sa.Column('was_matched', sa.Boolean(), nullable=False),
+    sa.Column('archived_at', sa.TIMESTAMP(), server_default=sa.text('now()'), nullable=True),
+    sa.ForeignKeyConstraint(['archive_id'], ['processing_archives.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_archived_receipts_archive_id'), 'archived_receipts', ['archive_id'], unique=False)
+    op.create_index('ux_archived_receipts_user_type_receipt_number', 'archived_receipts',
+                    ['user_id', 'duty_free_type', 'receipt_number'], unique=True)
+    
+    # 기존 아카이브 스냅샷(archive_data.receipts)에서 영수증 번호 백필 (번호별 가장 먼저 아카이브된 세션 유지)
+    op.execute("""
+    INSERT INTO archived_receipts (user_id, duty_free_type, receipt_number, archive_id, was_matched, archived_at)
+    SELECT DISTINCT ON (pa.user_id, pa.duty_free_type, r.item->>'receipt_number')
+           pa.user_id,
+           pa.duty_free_type,
+           r.item->>'receipt_number',
+           pa.id,
+           COALESCE((r.item->>'matched')::boolean, FALSE),
+           pa.archive_date
+    FROM processing_archives pa
+    CROSS JOIN LATERAL jsonb_array_elements(pa.archive_data->'receipts') AS r(item)
+    WHERE pa.duty_free_type IN ('lotte', 'shilla')
+    AND jsonb_typeof(pa.archive_data->'receipts') = 'array'
+    AND COALESCE(r.item->>'receipt_number', '') <> ''
+    ORDER BY pa.user_id, pa.duty_free_type, r.item->>'receipt_number',
+             COALESCE((r.item->>'matched')::boolean, FALSE) DESC, pa.archive_date, pa.id
+    """)
+    
+    op.add_column('receipts', sa.Column('is_archived_duplicate', sa.Boolean(), server_default=sa.text('false'), nullable=False))
+    op.add_column('shilla_receipts', sa.Column('is_archived_duplicate', sa.Boolean(), server_default=sa.text('false'), nullable=False))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('shilla_receipts', 'is_archived_duplicate')
+    op.drop_column('receipts', 'is_archived_duplicate')
+    op.drop_index('ux_archived_receipts_user_type_receipt_number', table_name='archived_receipts')
+    op.drop_index(op.f('ix_archived_receipts_archive_id'), table_name='archived_receipts')
+    op.drop_table('archived_receipts')
@@ -0,0 +1,31 @@
+"""add processing_jobs heartbeat
+
+Revision ID: a6d4f2c8e915
+Revises: 9c3b5d7e2a64
+Create Date: 2026-10-16 19:04:27.118530
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'a6d4f2c8e915'
+down_revision: Union[str, None] = '9c3b5d7e2a64'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('processing_jobs', sa.Column('heartbeat_at', sa.TIMESTAMP(), nullable=True))
+    op.create_index('ix_processing_jobs_active', 'processing_jobs', ['status'], unique=False,
+                    postgresql_where=sa.text("status IN ('pending', 'running')"))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_processing_jobs_active', table_name='processing_jobs',
+                  postgresql_where=sa.text("status IN ('pending', 'running')"))
+    op.drop_column('processing_jobs', 'heartbeat_at')
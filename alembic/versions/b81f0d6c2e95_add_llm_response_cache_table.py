@@ -0,0 +1,37 @@
+"""add llm_response_cache table
+
+Revision ID: b81f0d6c2e95
+Revises: 7e5d13b9a0c4
+Create Date: 2026-10-16 10:41:52.917364
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'b81f0d6c2e95'
+down_revision: Union[str, None] = '7e5d13b9a0c4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('llm_response_cache',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('model', sa.String(length=50), nullable=False),
+    sa.Column('prompt_hash', sa.String(length=64), nullable=False),
+    sa.Column('text_hash', sa.String(length=64), nullable=False),
+    sa.Column('response', sa.Text(), nullable=False),
+    sa.Column('created_at', sa.TIMESTAMP(), server_default=sa.text('now()'), nullable=True),
+    sa.Column('expires_at', sa.TIMESTAMP(), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('model', 'prompt_hash', 'text_hash', name='uq_llm_response_cache_key')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('llm_response_cache')
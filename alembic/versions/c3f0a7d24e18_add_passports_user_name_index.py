@@ -0,0 +1,27 @@
+"""add passports user_id name index
+
+Revision ID: c3f0a7d24e18
+Revises: b81f0d6c2e95
+Create Date: 2026-10-16 11:20:07.481233
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'c3f0a7d24e18'
+down_revision: Union[str, None] = 'b81f0d6c2e95'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_passports_user_id_name', 'passports', ['user_id', 'name'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_passports_user_id_name', table_name='passports')
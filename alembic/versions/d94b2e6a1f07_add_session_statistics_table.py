@@ -0,0 +1,37 @@
+"""add session_statistics table
+
+Revision ID: d94b2e6a1f07
+Revises: c3f0a7d24e18
+Create Date: 2026-10-16 11:48:33.205716
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'd94b2e6a1f07'
+down_revision: Union[str, None] = 'c3f0a7d24e18'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('session_statistics',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('lotte_receipts', sa.Integer(), nullable=False),
+    sa.Column('shilla_receipts', sa.Integer(), nullable=False),
+    sa.Column('matched_receipts', sa.Integer(), nullable=False),
+    sa.Column('total_passports', sa.Integer(), nullable=False),
+    sa.Column('matched_passports', sa.Integer(), nullable=False),
+    sa.Column('updated_at', sa.TIMESTAMP(), server_default=sa.text('now()'), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('user_id')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('session_statistics')
@@ -0,0 +1,101 @@
+"""declare excel data tables
+
+Revision ID: f5a8c1d7e230
+Revises: e17c5a9b3d42
+Create Date: 2026-10-16 12:52:19.640385
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'f5a8c1d7e230'
+down_revision: Union[str, None] = 'e17c5a9b3d42'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# 면세점별 엑셀 테이블과 영수증 번호 자리수
+EXCEL_TABLES = {
+    'lotte_excel_data': 14,
+    'shilla_excel_data': 13,
+}
+
+
+def _create_excel_table(table_name: str) -> None:
+    """엑셀 데이터 테이블 생성"""
+    columns = [
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('receiptNumber', sa.String(length=20), nullable=False),
+        sa.Column('name', sa.String(length=100), nullable=True),
+        sa.Column('PayBack', sa.Float(), nullable=True),
+    ]
+    if table_name == 'shilla_excel_data':
+        columns.append(sa.Column('passport_number', sa.String(length=20), nullable=True))
+    columns.append(sa.Column('created_at', sa.TIMESTAMP(), server_default=sa.text('now()'), nullable=True))
+    
+    op.create_table(table_name, *columns, sa.PrimaryKeyConstraint('id'))
+    op.create_index(f'ux_{table_name}_receipt_number', table_name, ['receiptNumber'], unique=True)
+    op.create_index(f'ix_{table_name}_name', table_name, ['name'], unique=False)
+    if table_name == 'shilla_excel_data':
+        op.create_index('ix_shilla_excel_data_passport_number', table_name, ['passport_number'], unique=False)
+
+
+def _copy_legacy_rows(table_name: str, legacy_table: str, receipt_length: int, legacy_columns: dict) -> None:
+    """pandas to_sql로 만들어진 기존 테이블 데이터를 정규화하여 복사 (영수증 번호 중복 시 먼저 들어온 행 유지)"""
+    receipt_expr = """regexp_replace(regexp_replace("receiptNumber"::text, '\\.0+$', ''), '[^0-9]', '', 'g')"""
+    if not isinstance(legacy_columns['receiptNumber'], (sa.String, sa.Text)):
+        # 숫자 타입으로 저장되며 잘린 앞자리 0 복원
+        receipt_expr = (
+            f"CASE WHEN length({receipt_expr}) < {receipt_length} "
+            f"THEN lpad({receipt_expr}, {receipt_length}, '0') ELSE {receipt_expr} END"
+        )
+    
+    name_expr = "NULLIF(trim(name::text), '')" if 'name' in legacy_columns else "NULL"
+    payback_expr = (
+        """COALESCE(NULLIF(regexp_replace("PayBack"::text, '[^0-9.\\-]', '', 'g'), '')::double precision, 0)"""
+        if 'PayBack' in legacy_columns else "0"
+    )
+    
+    target_columns = '"receiptNumber", name, "PayBack"'
+    select_columns = 'receipt_number, name, payback'
+    source_columns = f'{receipt_expr} AS receipt_number, {name_expr} AS name, {payback_expr} AS payback'
+    if table_name == 'shilla_excel_data':
+        passport_expr = "NULLIF(trim(passport_number::text), '')" if 'passport_number' in legacy_columns else "NULL"
+        target_columns += ', passport_number'
+        select_columns += ', passport_number'
+        source_columns += f', {passport_expr} AS passport_number'
+    
+    op.execute(f"""
+    INSERT INTO {table_name} ({target_columns})
+    SELECT DISTINCT ON (receipt_number) {select_columns}
+    FROM (SELECT {source_columns}, ctid AS row_order FROM {legacy_table}) legacy
+    WHERE receipt_number <> ''
+    ORDER BY receipt_number, row_order
+    """)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    inspector = sa.inspect(op.get_bind())
+    existing_tables = set(inspector.get_table_names())
+    
+    for table_name, receipt_length in EXCEL_TABLES.items():
+        if table_name not in existing_tables:
+            _create_excel_table(table_name)
+            continue
+        
+        # 기존 동적 테이블은 이름을 바꾼 뒤 새 테이블로 데이터 이전
+        legacy_table = f'{table_name}_legacy'
+        legacy_columns = {column['name']: column['type'] for column in inspector.get_columns(table_name)}
+        op.rename_table(table_name, legacy_table)
+        _create_excel_table(table_name)
+        _copy_legacy_rows(table_name, legacy_table, receipt_length, legacy_columns)
+        op.drop_table(legacy_table)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table_name in EXCEL_TABLES:
+        op.drop_table(table_name)
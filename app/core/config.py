@@ -24,7 +24,44 @@ class Settings(BaseSettings):
     
     # 파일 업로드 설정
     UPLOAD_DIR: str = "uploads"
-    MAX_FILE_SIZE: int = 100 * 1024 * 1024  # 100MB
+    MAX_FILE_SIZE: int = 1024 * 1024 * 1024  # 1GB (업로드 시 스트리밍하며 검사)
+    EXCEL_COPY_CHUNK_ROWS: int = 50000  # 엑셀 데이터 COPY 시 한 번에 변환할 행 수
+    
+    # OCR 엔진 설정
+    OCR_BACKEND: str = "vision"  # vision(macOS) | tesseract(Linux) | fake(벤치마크)
+    OCR_TIMEOUT_SECONDS: int = 60  # 이미지 1장당 OCR 제한 시간
+    TESSERACT_CMD: str = "tesseract"
+    TESSERACT_LANG: str = "kor+eng"
+    FAKE_OCR_DELAY_MS: int = 0  # 가짜 OCR 처리 지연 시간 (벤치마크용)
+    
+    # 이미지 병렬 처리 설정
+    OCR_WORKERS: int = 2  # OCR 워커 프로세스 수
+    GPT_WORKERS: int = 8  # GPT 호출 워커 스레드 수 (API rate limit 이하로 설정)
+    OCR_CACHE_ENABLED: bool = True  # 이미지 해시 기반 OCR/GPT 결과 캐시 사용 여부
+    DB_BATCH_SIZE: int = 100  # OCR 결과를 한 번에 저장할 이미지 수
+    FAST_PATH_ENABLED: bool = True  # 영수증 번호/MRZ 로컬 추출로 GPT 호출 생략
+    JOB_STALE_TIMEOUT_SECONDS: int = 60 * 30  # 이 시간 동안 진행상황 갱신이 없는 작업은 중단된 것으로 보고 실패 처리
+    JOB_STALE_SWEEP_INTERVAL_SECONDS: int = 60 * 5  # 중단된 작업/만료된 GPT 캐시 정리 주기
+    JOB_HEARTBEAT_INTERVAL_SECONDS: int = 60  # 처리 중 작업 heartbeat 갱신 주기 (JOB_STALE_TIMEOUT_SECONDS보다 충분히 짧게)
+    
+    # 영수증 번호 보정 설정 (OCR 숫자 오인식)
+    RECEIPT_SUGGESTION_MAX_DISTANCE: int = 2  # 보정 후보로 보여줄 최대 자리 차이
+    RECEIPT_SUGGESTION_LIMIT: int = 3  # 미매칭 영수증당 보정 후보 수
+    RECEIPT_AUTO_CORRECT_ENABLED: bool = False  # 매칭 전 후보가 1개뿐인 번호 자동 보정
+    RECEIPT_AUTO_CORRECT_MAX_DISTANCE: int = 1  # 자동 보정할 최대 자리 차이
+    RECEIPT_INDEX_CACHE_SIZE: int = 8  # 메모리에 유지할 엑셀 영수증 번호 인덱스 수
+
+    # 이름 매칭 설정 (롯데 여권 ↔ 엑셀 이름)
+    NAME_MATCH_THRESHOLD: float = 0.85  # 정규화 키가 다를 때 여권 후보로 보여줄 최소 유사도 (자동 연결은 키 일치만)
+    NAME_SUGGESTION_LIMIT: int = 3  # 여권이 연결되지 않은 고객당 여권 후보 수
+
+    # 아카이브 중복 영수증 검사 설정 (이전 세션에서 이미 아카이브된 번호 표시)
+    ARCHIVED_DUPLICATE_CHECK_ENABLED: bool = True
+
+    # GPT 응답 캐시 설정
+    GPT_CACHE_ENABLED: bool = True
+    GPT_CACHE_MAX_ENTRIES: int = 10000  # 메모리 LRU 최대 항목 수
+    GPT_CACHE_TTL_SECONDS: int = 60 * 60 * 24 * 30  # 30일
     
     # 템플릿 경로 설정
     LOTTE_PROMPT_PATH: str = "/Users/gimdonghun/Documents/DbTest/LottePrompt.txt"
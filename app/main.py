@@ -1,14 +1,19 @@
 # app/main.py
+import asyncio
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from fastapi.responses import RedirectResponse
+from starlette.concurrency import run_in_threadpool
 
 from .routers import auth_router, ocr_router
 from .core.config import settings
 from .core.database import engine
 from .models.user_model import User
 from .models.ocr_model import *
+from .services.job_service import JobService
+from .utils.gpt_cache import gpt_cache
 
 # 데이터베이스 테이블 생성 (개발용 - 실제 운영에서는 Alembic 사용)
 # Base.metadata.create_all(bind=engine)
@@ -59,6 +64,21 @@ app.mount("/uploads", StaticFiles(directory=settings.UPLOAD_DIR), name="uploads"
 app.include_router(auth_router.router)
 app.include_router(ocr_router.router)
 
+async def run_periodic_cleanup():
+    """중단된 이미지 처리 작업 실패 처리와 만료된 GPT 캐시 삭제를 주기적으로 실행 (작업 조회 API는 읽기 전용으로 유지)"""
+    while True:
+        for cleanup in (JobService.sweep_stale_jobs, gpt_cache.purge_expired):
+            try:
+                await run_in_threadpool(cleanup)
+            except Exception as e:
+                print(f"주기 정리 작업 오류 ({cleanup.__name__}): {e}")
+        await asyncio.sleep(settings.JOB_STALE_SWEEP_INTERVAL_SECONDS)
+
+@app.on_event("startup")
+async def start_periodic_cleanup():
+    """서버 시작 시 이전 프로세스에서 중단된 작업과 만료된 캐시를 정리하고 주기 정리 작업 시작"""
+    app.state.periodic_cleanup = asyncio.create_task(run_periodic_cleanup())
+
 @app.get("/", tags=["기본"])
 async def root():
     """API 루트 엔드포인트"""
@@ -1,8 +1,9 @@
 # app/models/ocr_model.py
-from sqlalchemy import Column, Integer, String, Text, Boolean, Date, ForeignKey, TIMESTAMP, func, Float, Enum
+from sqlalchemy import Column, Integer, String, Text, Boolean, Date, ForeignKey, TIMESTAMP, func, Float, Enum, UniqueConstraint, Index, text
 from sqlalchemy.orm import relationship
 from sqlalchemy.dialects.postgresql import JSONB
 import enum
+import uuid
 
 from ..core.database import Base
 
@@ -18,6 +19,7 @@ class Receipt(Base):
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     file_path = Column(Text, nullable=True)
     receipt_number = Column(String(50), nullable=True)
+    is_archived_duplicate = Column(Boolean, nullable=False, default=False, server_default=text("false"))  # 이전 세션에서 이미 아카이브된 번호
     created_at = Column(TIMESTAMP, server_default=func.now())
 
     user = relationship("User", back_populates="receipts")
@@ -37,6 +39,7 @@ class ShillaReceipt(Base):
     file_path = Column(Text, nullable=True)
     receipt_number = Column(String(50), nullable=True)
     passport_number = Column(String(20), nullable=True)
+    is_archived_duplicate = Column(Boolean, nullable=False, default=False, server_default=text("false"))  # 이전 세션에서 이미 아카이브된 번호
     created_at = Column(TIMESTAMP, server_default=func.now())
     
     user = relationship("User", back_populates="shilla_receipts")
@@ -51,11 +54,17 @@ class Passport(Base):
     passport_number = Column(String(20), nullable=True)
     birthday = Column(Date, nullable=True)
     name = Column(String(100), nullable=True)
+    name_key = Column(String(100), nullable=True)  # 정규화된 이름 (normalize_name)
     created_at = Column(TIMESTAMP, server_default=func.now())
     is_matched = Column(Boolean, default=False)
 
     user = relationship("User", back_populates="passports")
 
+    __table_args__ = (
+        Index("ix_passports_user_id_name", "user_id", "name"),  # 고객명 기준 여권 조회용
+        Index("ix_passports_user_id_name_key", "user_id", "name_key"),  # 정규화 이름 기준 여권 조회용
+    )
+
 class ReceiptMatchLog(Base):
     """영수증 매칭 로그 모델"""
     __tablename__ = "receipt_match_log"
@@ -68,6 +77,11 @@ class ReceiptMatchLog(Base):
     excel_name = Column(String(100), nullable=True)
     passport_number = Column(String(20), nullable=True)
     birthday = Column(Date, nullable=True)
+    
+    __table_args__ = (
+        # 영수증 번호당 최신 매칭 상태 1행 (증분 매칭 시 ON CONFLICT로 갱신)
+        Index("ux_receipt_match_log_user_receipt_number", "user_id", "receipt_number", unique=True),
+    )
 
 class UnrecognizedImage(Base):
     """인식되지 않은 이미지 모델"""
@@ -108,6 +122,10 @@ class ProcessingArchive(Base):
     
     user = relationship("User", back_populates="archives")
     matching_histories = relationship("MatchingHistory", back_populates="archive")
+    
+    __table_args__ = (
+        Index("ix_processing_archives_user_archive_date_id", "user_id", "archive_date", "id"),  # 최신순 키셋 페이지네이션용
+    )
 
 class MatchingHistory(Base):
     """매칭 이력 저장"""
@@ -128,4 +146,208 @@ class MatchingHistory(Base):
     created_at = Column(TIMESTAMP, server_default=func.now())
     
     user = relationship("User")
-    archive = relationship("ProcessingArchive", back_populates="matching_histories")
\ No newline at end of file
+    archive = relationship("ProcessingArchive", back_populates="matching_histories")
+    receipts = relationship("MatchingHistoryReceipt", back_populates="history", cascade="all, delete-orphan")
+    
+    __table_args__ = (
+        Index("ix_matching_history_user_created_at_id", "user_id", "created_at", "id"),  # 최신순 키셋 페이지네이션용
+        # 고객명/여권번호 부분 문자열 검색용 트라이그램 인덱스 (pg_trgm)
+        Index("ix_matching_history_customer_name_trgm", "customer_name",
+              postgresql_using="gin", postgresql_ops={"customer_name": "gin_trgm_ops"}),
+        Index("ix_matching_history_passport_number_trgm", "passport_number",
+              postgresql_using="gin", postgresql_ops={"passport_number": "gin_trgm_ops"}),
+    )
+
+class MatchingHistoryReceipt(Base):
+    """매칭 이력별 영수증 번호 (영수증 번호 정확/접두사 검색용)"""
+    __tablename__ = "matching_history_receipts"
+    
+    id = Column(Integer, primary_key=True)
+    history_id = Column(Integer, ForeignKey("matching_history.id", ondelete="CASCADE"), nullable=False, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    receipt_number = Column(String(50), nullable=False)  # 영수증 테이블과 같은 길이
+    
+    history = relationship("MatchingHistory", back_populates="receipts")
+    
+    __table_args__ = (
+        # varchar_pattern_ops: 정확 일치와 LIKE '접두사%' 모두 B-tree 사용
+        Index("ix_matching_history_receipts_user_receipt_number", "user_id", "receipt_number",
+              postgresql_ops={"receipt_number": "varchar_pattern_ops"}),
+    )
+
+class ArchivedReceipt(Base):
+    """아카이브된 영수증 번호 (사용자+면세점별, 이후 세션의 중복 지급 검사용)"""
+    __tablename__ = "archived_receipts"
+    
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    duty_free_type = Column(String(20), nullable=False)
+    receipt_number = Column(String(50), nullable=False)
+    archive_id = Column(Integer, ForeignKey("processing_archives.id", ondelete="CASCADE"), nullable=True, index=True)
+    was_matched = Column(Boolean, nullable=False, default=False)  # 아카이브 당시 엑셀 매칭(지급) 여부
+    archived_at = Column(TIMESTAMP, server_default=func.now())
+    
+    __table_args__ = (
+        Index("ux_archived_receipts_user_type_receipt_number", "user_id", "duty_free_type", "receipt_number", unique=True),
+    )
+
+class ProcessingJob(Base):
+    """이미지 처리 백그라운드 작업"""
+    __tablename__ = "processing_jobs"
+    
+    id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    duty_free_type = Column(String(20), nullable=True)
+    
+    # 작업 상태 (pending, running, completed, failed)
+    status = Column(String(20), nullable=False, default="pending")
+    done = Column(Integer, default=0)
+    total = Column(Integer, default=0)
+    
+    # 처리 결과 (OcrProcessResponse JSON) 및 오류 메시지
+    result = Column(JSONB, nullable=True)
+    error = Column(Text, nullable=True)
+    
+    created_at = Column(TIMESTAMP, server_default=func.now())
+    started_at = Column(TIMESTAMP, nullable=True)
+    finished_at = Column(TIMESTAMP, nullable=True)
+    heartbeat_at = Column(TIMESTAMP, nullable=True)  # 마지막 상태/진행상황 갱신 시각 (중단된 작업 감지용)
+    
+    user = relationship("User")
+    
+    __table_args__ = (
+        # 진행 중인 작업만 담는 부분 인덱스 (작업 조회 시 중단된 작업 검사용)
+        Index("ix_processing_jobs_active", "status", postgresql_where=text("status IN ('pending', 'running')")),
+    )
+
+
+class OcrResultCache(Base):
+    """이미지 해시 기반 OCR/GPT 결과 캐시 (동일 이미지 재업로드 시 재처리 생략)"""
+    __tablename__ = "ocr_result_cache"
+    
+    id = Column(Integer, primary_key=True)
+    image_hash = Column(String(64), nullable=False)  # 이미지 SHA-256
+    duty_free_type = Column(String(20), nullable=False)
+    prompt_version = Column(String(64), nullable=False)  # 모델/프롬프트 버전 해시
+    
+    ocr_text = Column(Text, nullable=True)
+    parsed_result = Column(JSONB, nullable=True)
+    
+    hit_count = Column(Integer, default=0)
+    created_at = Column(TIMESTAMP, server_default=func.now())
+    last_hit_at = Column(TIMESTAMP, nullable=True)
+    
+    __table_args__ = (
+        UniqueConstraint("image_hash", "duty_free_type", "prompt_version", name="uq_ocr_result_cache_key"),
+    )
+
+
+class LlmResponseCache(Base):
+    """GPT 분류 응답 캐시 (모델 + 시스템 프롬프트 해시 + OCR 텍스트 해시)"""
+    __tablename__ = "llm_response_cache"
+    
+    id = Column(Integer, primary_key=True)
+    model = Column(String(50), nullable=False)
+    prompt_hash = Column(String(64), nullable=False)
+    text_hash = Column(String(64), nullable=False)
+    
+    response = Column(Text, nullable=False)
+    created_at = Column(TIMESTAMP, server_default=func.now())
+    expires_at = Column(TIMESTAMP, nullable=False)
+    
+    __table_args__ = (
+        UniqueConstraint("model", "prompt_hash", "text_hash", name="uq_llm_response_cache_key"),
+        Index("ix_llm_response_cache_expires_at", "expires_at"),  # 만료 캐시 정리용
+    )
+
+class SessionStatistics(Base):
+    """사용자별 현재 세션 통계 카운터 (저장/매칭/수정/초기화 시 함께 갱신)"""
+    __tablename__ = "session_statistics"
+    
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    
+    lotte_receipts = Column(Integer, nullable=False, default=0)
+    shilla_receipts = Column(Integer, nullable=False, default=0)
+    matched_receipts = Column(Integer, nullable=False, default=0)
+    total_passports = Column(Integer, nullable=False, default=0)
+    matched_passports = Column(Integer, nullable=False, default=0)
+    
+    updated_at = Column(TIMESTAMP, server_default=func.now(), onupdate=func.now())
+
+class ProcessingSession(Base):
+    """사용자별 처리 세션 (ZIP/엑셀 업로드 시 생성, 세션 완료 시 종료)"""
+    __tablename__ = "processing_sessions"
+    
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    duty_free_type = Column(String(20), nullable=False)
+    
+    # 세션 상태 (active, completed)
+    status = Column(String(20), nullable=False, default="active")
+    
+    created_at = Column(TIMESTAMP, server_default=func.now())
+    updated_at = Column(TIMESTAMP, server_default=func.now(), onupdate=func.now())
+    completed_at = Column(TIMESTAMP, nullable=True)
+    
+    __table_args__ = (
+        # 사용자당 진행 중인 세션은 1개
+        Index("uq_processing_sessions_active_user", "user_id", unique=True,
+              postgresql_where=text("status = 'active'")),
+    )
+
+class ExcelUploadBatch(Base):
+    """매출 파일 업로드 배치 (업로드 1회 = 배치 1개, 매칭은 시작 시점의 배치 목록만 사용)"""
+    __tablename__ = "excel_upload_batches"
+    
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    duty_free_type = Column(String(20), nullable=False)
+    file_name = Column(String(255), nullable=True)
+    row_count = Column(Integer, nullable=False, default=0)  # 이 배치로 새로 추가된 행 수
+    created_at = Column(TIMESTAMP, server_default=func.now())
+
+class LotteExcelData(Base):
+    """롯데 매출 엑셀 데이터 (사용자별 LIST 파티션, 영수증 번호는 숫자 문자열로 정규화하여 저장)"""
+    __tablename__ = "lotte_excel_data"
+    
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    batch_id = Column(Integer, ForeignKey("excel_upload_batches.id"), nullable=False)
+    receipt_number = Column("receiptNumber", String(20), nullable=False)
+    name = Column(String(100), nullable=True)
+    name_key = Column(String(100), nullable=True)  # 정규화된 이름 (normalize_name)
+    payback = Column("PayBack", Float, nullable=True, default=0)
+    created_at = Column(TIMESTAMP, server_default=func.now())
+    
+    __table_args__ = (
+        Index("ux_lotte_excel_data_user_receipt_number", "user_id", "receiptNumber", unique=True),
+        Index("ix_lotte_excel_data_user_name", "user_id", "name"),
+        Index("ix_lotte_excel_data_user_name_key", "user_id", "name_key"),
+        {"postgresql_partition_by": "LIST (user_id)"},
+    )
+
+class ShillaExcelData(Base):
+    """신라 매출 엑셀 데이터 (사용자별 LIST 파티션, 영수증 번호는 숫자 문자열로 정규화하여 저장)"""
+    __tablename__ = "shilla_excel_data"
+    
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    batch_id = Column(Integer, ForeignKey("excel_upload_batches.id"), nullable=False)
+    receipt_number = Column("receiptNumber", String(20), nullable=False)
+    name = Column(String(100), nullable=True)
+    name_key = Column(String(100), nullable=True)  # 정규화된 이름 (normalize_name)
+    payback = Column("PayBack", Float, nullable=True, default=0)
+    passport_number = Column(String(20), nullable=True)  # 매칭 시 영수증의 여권번호로 업데이트
+    created_at = Column(TIMESTAMP, server_default=func.now())
+    
+    __table_args__ = (
+        Index("ux_shilla_excel_data_user_receipt_number", "user_id", "receiptNumber", unique=True),
+        Index("ix_shilla_excel_data_user_name", "user_id", "name"),
+        Index("ix_shilla_excel_data_user_name_key", "user_id", "name_key"),
+        Index("ix_shilla_excel_data_user_passport_number", "user_id", "passport_number"),
+        {"postgresql_partition_by": "LIST (user_id)"},
+    )
+
+def excel_partition_name(table_name: str, user_id: int) -> str:
+    """사용자별 엑셀 데이터 파티션 테이블 이름"""
+    return f"{table_name}_u{int(user_id)}"
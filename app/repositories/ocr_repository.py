@@ -1,51 +1,42 @@
 # app/repositories/ocr_repository.py
 from sqlalchemy.orm import Session
-from sqlalchemy import text
-from typing import List, Optional, Dict, Any
+from sqlalchemy import text, func
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from typing import List, Optional, Dict, Any, Set, Tuple
 
 from ..models.ocr_model import (
     Receipt, ShillaReceipt, Passport, ReceiptMatchLog, 
-    UnrecognizedImage, ProcessingArchive, MatchingHistory
+    UnrecognizedImage, ProcessingArchive, ProcessingJob,
+    OcrResultCache, SessionStatistics, ProcessingSession, ExcelUploadBatch,
+    excel_partition_name
 )
+from ..utils.receipt_index import ReceiptNumberIndex, get_receipt_index
+from ..utils.name_matcher import NameMatcher, normalize_name
+from ..core.config import settings
+
+# 사용자별로 파티션된 엑셀 데이터 테이블
+EXCEL_DATA_TABLES = ("lotte_excel_data", "shilla_excel_data")
+
+# session_statistics 카운터 컬럼
+STATISTICS_COLUMNS = ("lotte_receipts", "shilla_receipts", "matched_receipts", "total_passports", "matched_passports")
 
 class OcrRepository:
     def __init__(self, db: Session):
         self.db = db
     
     # === 영수증 관련 메서드 ===
-    def create_receipt(self, user_id: int, receipt_number: str, file_path: str) -> Receipt:
-        """롯데 영수증 생성"""
-        receipt = Receipt(
-            user_id=user_id,
-            receipt_number=receipt_number,
-            file_path=file_path
-        )
-        self.db.add(receipt)
-        self.db.commit()
-        self.db.refresh(receipt)
-        return receipt
+    def get_user_receipt_numbers(self, user_id: int, duty_free_type: str) -> List[tuple]:
+        """사용자의 (영수증 ID, 영수증 번호) 목록 (면세점 타입별 영수증 테이블)"""
+        model = ShillaReceipt if duty_free_type == "shilla" else Receipt
+        return self.db.query(model.id, model.receipt_number).filter(model.user_id == user_id).all()
     
-    def create_shilla_receipt(self, user_id: int, receipt_number: str, 
-                            passport_number: Optional[str], file_path: str) -> ShillaReceipt:
-        """신라 영수증 생성"""
-        receipt = ShillaReceipt(
-            user_id=user_id,
-            receipt_number=receipt_number,
-            passport_number=passport_number,
-            file_path=file_path
-        )
-        self.db.add(receipt)
-        self.db.commit()
-        self.db.refresh(receipt)
-        return receipt
-    
-    def get_user_receipts(self, user_id: int) -> List[Receipt]:
-        """사용자의 롯데 영수증 목록 조회"""
-        return self.db.query(Receipt).filter(Receipt.user_id == user_id).all()
-    
-    def get_user_shilla_receipts(self, user_id: int) -> List[ShillaReceipt]:
-        """사용자의 신라 영수증 목록 조회"""
-        return self.db.query(ShillaReceipt).filter(ShillaReceipt.user_id == user_id).all()
+    def correct_receipt_numbers(self, duty_free_type: str, corrections: Dict[int, str]) -> None:
+        """영수증 번호 일괄 보정 (커밋은 호출한 쪽 트랜잭션에서 수행)"""
+        model = ShillaReceipt if duty_free_type == "shilla" else Receipt
+        for receipt_id, receipt_number in corrections.items():
+            self.db.query(model).filter(model.id == receipt_id).update(
+                {"receipt_number": receipt_number}, synchronize_session=False
+            )
     
     def update_receipt(self, receipt_id: int, user_id: int, **kwargs) -> Optional[Receipt]:
         """영수증 정보 업데이트"""
@@ -115,21 +106,6 @@ class OcrRepository:
             return None
     
     # === 여권 관련 메서드 ===
-    def create_passport(self, user_id: int, name: str, passport_number: str, 
-                       birthday: Optional[str], file_path: str) -> Passport:
-        """여권 정보 생성"""
-        passport = Passport(
-            user_id=user_id,
-            name=name,
-            passport_number=passport_number,
-            birthday=birthday,
-            file_path=file_path
-        )
-        self.db.add(passport)
-        self.db.commit()
-        self.db.refresh(passport)
-        return passport
-    
     def get_user_passports(self, user_id: int) -> List[Passport]:
         """사용자의 여권 목록 조회"""
         return self.db.query(Passport).filter(Passport.user_id == user_id).all()
@@ -154,145 +130,152 @@ class OcrRepository:
         for key, value in kwargs.items():
             if hasattr(passport, key):
                 setattr(passport, key, value)
+        if "name" in kwargs:
+            passport.name_key = normalize_name(passport.name)
         
         self.db.commit()
         self.db.refresh(passport)
         return passport
     
-    def update_passport_matching_status(self, passport_name: str, user_id: int, is_matched: bool) -> bool:
-        """여권 매칭 상태 업데이트"""
-        passport = self.db.query(Passport).filter(
-            Passport.name == passport_name,
-            Passport.user_id == user_id
-        ).first()
+    def get_passport_name_matcher(self, user_id: int) -> NameMatcher:
+        """사용자 여권 이름 매칭 인덱스 (값: 여권 객체)"""
+        return NameMatcher((passport, passport.name) for passport in self.get_user_passports(user_id))
+    
+    def find_excel_row_by_name(self, user_id: int, duty_free_type: str, name: str) -> Optional[tuple]:
+        """정규화 키가 같은 엑셀 행 조회 ("receiptNumber", name, "PayBack")"""
+        table_name = f"{duty_free_type}_excel_data"
+        if table_name not in EXCEL_DATA_TABLES:
+            raise ValueError(f"지원하지 않는 면세점 타입입니다: {duty_free_type}")
+        name_key = normalize_name(name)
+        if name_key is None:
+            return None
         
-        if passport:
-            passport.is_matched = is_matched
-            self.db.commit()
-            return True
-        return False
+        row = self.db.execute(text(f"""
+            SELECT "receiptNumber", name, "PayBack" FROM {table_name}
+            WHERE user_id = :user_id AND name_key = :name_key
+            ORDER BY id
+            LIMIT 1
+        """), {"user_id": user_id, "name_key": name_key}).first()
+        return tuple(row) if row else None
     
     # === 매칭 로그 관련 메서드 ===
     def create_match_log(self, user_id: int, receipt_number: str, is_matched: bool, **kwargs) -> ReceiptMatchLog:
-        """매칭 로그 생성"""
-        match_log = ReceiptMatchLog(
-            user_id=user_id,
-            receipt_number=receipt_number,
-            is_matched=is_matched,
-            **kwargs
-        )
-        self.db.add(match_log)
+        """매칭 로그 생성 (같은 영수증 번호의 로그가 있으면 갱신)"""
+        values = {"user_id": user_id, "receipt_number": receipt_number, "is_matched": is_matched, **kwargs}
+        stmt = pg_insert(ReceiptMatchLog).values(**values)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["user_id", "receipt_number"],
+            set_={**{key: stmt.excluded[key] for key in values if key not in ("user_id", "receipt_number")},
+                  "checked_at": func.now()}
+        ).returning(ReceiptMatchLog.id)
+        match_log_id = self.db.execute(stmt).scalar_one()
         self.db.commit()
-        self.db.refresh(match_log)
-        return match_log
+        return self.db.get(ReceiptMatchLog, match_log_id)
     
-    def get_match_logs(self, user_id: int) -> List[ReceiptMatchLog]:
-        """사용자의 매칭 로그 조회"""
-        return self.db.query(ReceiptMatchLog).filter(ReceiptMatchLog.user_id == user_id).all()
+    def get_match_states(self, user_id: int, receipt_numbers: List[str]) -> Dict[str, bool]:
+        """영수증 번호별 현재 매칭 로그 상태 (로그가 없는 번호는 제외)"""
+        rows = self.db.query(ReceiptMatchLog.receipt_number, ReceiptMatchLog.is_matched).filter(
+            ReceiptMatchLog.user_id == user_id,
+            ReceiptMatchLog.receipt_number.in_(receipt_numbers)
+        ).all()
+        return {receipt_number: is_matched for receipt_number, is_matched in rows}
     
-    # === 인식되지 않은 이미지 관련 메서드 ===
-    def create_unrecognized_image(self, user_id: int, file_path: str) -> UnrecognizedImage:
-        """인식되지 않은 이미지 생성"""
-        unrecognized = UnrecognizedImage(
-            user_id=user_id,
-            file_path=file_path
-        )
-        self.db.add(unrecognized)
-        self.db.commit()
-        self.db.refresh(unrecognized)
-        return unrecognized
+    def get_pending_receipt_numbers(self, user_id: int, duty_free_type: str, batch_id: int) -> List[str]:
+        """엑셀 배치에 새로 들어온 번호 중 아직 매칭되지 않은(또는 로그가 없는) 영수증 번호 목록"""
+        receipt_table = "shilla_receipts" if duty_free_type == "shilla" else "receipts"
+        excel_table = f"{duty_free_type}_excel_data"
+        if excel_table not in EXCEL_DATA_TABLES:
+            raise ValueError(f"지원하지 않는 면세점 타입입니다: {duty_free_type}")
+        
+        return self.db.execute(text(f"""
+            SELECT DISTINCT r.receipt_number
+            FROM {receipt_table} r
+            JOIN {excel_table} e
+              ON e.user_id = r.user_id
+             AND e.batch_id = :batch_id
+             AND e."receiptNumber" = r.receipt_number
+            LEFT JOIN receipt_match_log m
+              ON m.user_id = r.user_id AND m.receipt_number = r.receipt_number
+            WHERE r.user_id = :user_id
+            AND (m.id IS NULL OR m.is_matched = FALSE)
+        """), {"user_id": user_id, "batch_id": batch_id}).scalars().all()
+    
+    def delete_orphan_match_log(self, user_id: int, duty_free_type: str, receipt_number: str) -> None:
+        """더 이상 해당 번호의 영수증이 없으면 매칭 로그 삭제 (영수증 번호 수정 시, 커밋은 호출한 쪽에서 수행)"""
+        receipt_table = "shilla_receipts" if duty_free_type == "shilla" else "receipts"
+        self.db.execute(text(f"""
+            DELETE FROM receipt_match_log m
+            WHERE m.user_id = :user_id
+            AND m.receipt_number = :receipt_number
+            AND NOT EXISTS (
+                SELECT 1 FROM {receipt_table} r
+                WHERE r.user_id = :user_id AND r.receipt_number = :receipt_number
+            )
+        """), {"user_id": user_id, "receipt_number": receipt_number})
     
     # === 데이터 삭제 관련 메서드 ===
-    def clear_user_session_data(self, user_id: int) -> bool:
-        """사용자의 현재 세션 데이터 삭제"""
-        try:
-            # 매칭 로그 삭제
-            self.db.query(ReceiptMatchLog).filter(ReceiptMatchLog.user_id == user_id).delete()
-            
-            # 영수증 데이터 삭제
-            self.db.query(Receipt).filter(Receipt.user_id == user_id).delete()
-            self.db.query(ShillaReceipt).filter(ShillaReceipt.user_id == user_id).delete()
-            
-            # 여권 데이터 삭제
-            self.db.query(Passport).filter(Passport.user_id == user_id).delete()
-            
-            # 인식되지 않은 이미지 삭제
-            self.db.query(UnrecognizedImage).filter(UnrecognizedImage.user_id == user_id).delete()
-            
-            # 신라 엑셀 데이터에서 여권번호 초기화
-            try:
-                self.db.execute(text("""
-                    UPDATE shilla_excel_data 
-                    SET passport_number = NULL 
-                    WHERE passport_number IS NOT NULL
-                """))
-            except Exception as e:
-                print(f"신라 엑셀 데이터 초기화 오류: {e}")
-            
-            self.db.commit()
-            return True
-        except Exception as e:
-            self.db.rollback()
-            print(f"데이터 삭제 오류: {e}")
-            return False
+    def delete_user_session_data(self, user_id: int) -> Dict[str, int]:
+        """현재 세션 데이터 삭제 후 테이블별 삭제 행 수 반환 (커밋은 호출한 쪽 트랜잭션에서 수행)
+        
+        매칭 로그/영수증/여권/인식 실패 이미지는 DELETE ... RETURNING CTE 한 문장으로 삭제하고,
+        엑셀 데이터는 사용자 파티션만 TRUNCATE 합니다.
+        """
+        deleted = self.db.execute(text("""
+        WITH match_logs AS (
+            DELETE FROM receipt_match_log WHERE user_id = :user_id RETURNING 1
+        ), lotte_receipts AS (
+            DELETE FROM receipts WHERE user_id = :user_id RETURNING 1
+        ), shilla_receipts AS (
+            DELETE FROM shilla_receipts WHERE user_id = :user_id RETURNING 1
+        ), passports AS (
+            DELETE FROM passports WHERE user_id = :user_id RETURNING 1
+        ), unrecognized_images AS (
+            DELETE FROM unrecognized_images WHERE user_id = :user_id RETURNING 1
+        )
+        SELECT (SELECT COUNT(*) FROM match_logs) AS match_logs,
+               (SELECT COUNT(*) FROM lotte_receipts) AS lotte_receipts,
+               (SELECT COUNT(*) FROM shilla_receipts) AS shilla_receipts,
+               (SELECT COUNT(*) FROM passports) AS passports,
+               (SELECT COUNT(*) FROM unrecognized_images) AS unrecognized_images
+        """), {"user_id": user_id}).mappings().one()
+        
+        # 사용자 엑셀 데이터 파티션 비우기 및 업로드 배치 삭제
+        self.truncate_user_excel_data(user_id)
+        
+        # 세션 통계 초기화 및 처리 세션 종료
+        self.reset_statistics(user_id)
+        self.complete_active_session(user_id)
+        return dict(deleted)
     
     # === 통계 관련 메서드 ===
     def get_user_statistics(self, user_id: int) -> Dict[str, Any]:
-        """사용자 통계 조회"""
+        """사용자 통계 조회 (session_statistics 카운터 1행 조회)"""
         try:
-            # 신라와 롯데 데이터 개수 확인
-            shilla_count = self.db.query(ShillaReceipt).filter(ShillaReceipt.user_id == user_id).count()
-            lotte_count = self.db.query(Receipt).filter(Receipt.user_id == user_id).count()
+            stats = self.db.query(SessionStatistics).filter(SessionStatistics.user_id == user_id).first()
             
-            duty_free_type = "shilla" if shilla_count >= lotte_count else "lotte"
-            
-            if duty_free_type == "shilla":
-                # 신라 데이터 통계
-                stats_sql = text("""
-                SELECT 
-                    COUNT(DISTINCT sr.id) as total_receipts,
-                    COUNT(DISTINCT CASE WHEN se."receiptNumber" IS NOT NULL THEN sr.id END) as matched_receipts,
-                    COUNT(DISTINCT p.id) as total_passports,
-                    COUNT(DISTINCT CASE WHEN p.is_matched = TRUE THEN p.id END) as matched_passports
-                FROM shilla_receipts sr
-                LEFT JOIN shilla_excel_data se ON se."receiptNumber"::text = sr.receipt_number
-                LEFT JOIN passports p ON p.user_id = sr.user_id
-                WHERE sr.user_id = :user_id
-                """)
+            if stats:
+                values = {column: getattr(stats, column) for column in STATISTICS_COLUMNS}
             else:
-                # 롯데 데이터 통계
-                stats_sql = text("""
-                SELECT 
-                    COUNT(DISTINCT r.id) as total_receipts,
-                    COUNT(DISTINCT CASE WHEN rml.is_matched = TRUE THEN r.id END) as matched_receipts,
-                    COUNT(DISTINCT p.id) as total_passports,
-                    COUNT(DISTINCT CASE WHEN p.is_matched = TRUE THEN p.id END) as matched_passports
-                FROM receipts r
-                LEFT JOIN receipt_match_log rml ON r.receipt_number = rml.receipt_number AND rml.user_id = r.user_id
-                LEFT JOIN passports p ON p.user_id = r.user_id
-                WHERE r.user_id = :user_id
-                """)
+                # 카운터가 아직 없으면 현재 데이터로 1회 계산하여 저장
+                values = self.refresh_statistics(user_id)
+                self.db.commit()
             
-            result = self.db.execute(stats_sql, {"user_id": user_id}).first()
+            duty_free_type = self.get_session_duty_free_type(user_id) or (
+                "shilla" if values["shilla_receipts"] >= values["lotte_receipts"] else "lotte"
+            )
+            total_receipts = values[f"{duty_free_type}_receipts"]
             
-            if result:
-                return {
-                    "total_receipts": result[0] or 0,
-                    "matched_receipts": result[1] or 0,
-                    "total_passports": result[2] or 0,
-                    "matched_passports": result[3] or 0,
-                    "unmatched_receipts": (result[0] or 0) - (result[1] or 0),
-                    "unmatched_passports": (result[2] or 0) - (result[3] or 0),
-                    "duty_free_type": duty_free_type
-                }
-            else:
-                return {
-                    "total_receipts": 0, "matched_receipts": 0,
-                    "total_passports": 0, "matched_passports": 0,
-                    "unmatched_receipts": 0, "unmatched_passports": 0,
-                    "duty_free_type": duty_free_type
-                }
+            return {
+                "total_receipts": total_receipts,
+                "matched_receipts": values["matched_receipts"],
+                "total_passports": values["total_passports"],
+                "matched_passports": values["matched_passports"],
+                "unmatched_receipts": total_receipts - values["matched_receipts"],
+                "unmatched_passports": values["total_passports"] - values["matched_passports"],
+                "duty_free_type": duty_free_type
+            }
         except Exception as e:
+            self.db.rollback()
             print(f"통계 조회 오류: {e}")
             return {
                 "total_receipts": 0, "matched_receipts": 0,
@@ -301,33 +284,422 @@ class OcrRepository:
                 "duty_free_type": "lotte"
             }
     
-    # === 아카이브 관련 메서드 ===
-    def create_archive(self, user_id: int, session_name: str, **kwargs) -> ProcessingArchive:
-        """아카이브 생성"""
-        archive = ProcessingArchive(
-            user_id=user_id,
-            session_name=session_name,
-            **kwargs
+    def compute_user_statistics(self, user_id: int) -> Dict[str, int]:
+        """현재 세션 데이터에서 통계 카운터를 처음부터 계산 (reconcile_statistics.py 불일치 점검용)"""
+        stats_sql = text("""
+        SELECT 
+            (SELECT COUNT(*) FROM receipts WHERE user_id = :user_id) AS lotte_receipts,
+            (SELECT COUNT(*) FROM shilla_receipts WHERE user_id = :user_id) AS shilla_receipts,
+            (SELECT COUNT(*) FROM receipts r
+              WHERE r.user_id = :user_id
+                AND EXISTS (
+                    SELECT 1 FROM receipt_match_log rml
+                    WHERE rml.user_id = r.user_id
+                      AND rml.receipt_number = r.receipt_number
+                      AND rml.is_matched = TRUE
+                )) AS lotte_matched_receipts,
+            (SELECT COUNT(*) FROM shilla_receipts sr
+              WHERE sr.user_id = :user_id
+                AND EXISTS (
+                    SELECT 1 FROM receipt_match_log rml
+                    WHERE rml.user_id = sr.user_id
+                      AND rml.receipt_number = sr.receipt_number
+                      AND rml.is_matched = TRUE
+                )) AS shilla_matched_receipts,
+            (SELECT COUNT(*) FROM passports WHERE user_id = :user_id) AS total_passports,
+            (SELECT COUNT(*) FROM passports WHERE user_id = :user_id AND is_matched = TRUE) AS matched_passports
+        """)
+        row = self.db.execute(stats_sql, {"user_id": user_id}).mappings().one()
+        
+        # 매칭 영수증 수는 현재 세션의 면세점 타입 기준
+        duty_free_type = self.get_session_duty_free_type(user_id) or (
+            "shilla" if row["shilla_receipts"] >= row["lotte_receipts"] else "lotte"
         )
-        self.db.add(archive)
-        self.db.commit()
-        self.db.refresh(archive)
-        return archive
+        is_shilla = duty_free_type == "shilla"
+        return {
+            "lotte_receipts": row["lotte_receipts"],
+            "shilla_receipts": row["shilla_receipts"],
+            "matched_receipts": row["shilla_matched_receipts"] if is_shilla else row["lotte_matched_receipts"],
+            "total_passports": row["total_passports"],
+            "matched_passports": row["matched_passports"]
+        }
     
+    def refresh_statistics(self, user_id: int) -> Dict[str, int]:
+        """통계 카운터를 다시 계산하여 저장 (카운터가 없을 때와 reconcile_statistics.py 전용, 커밋은 호출한 쪽에서 수행)
+        
+        세션 크기에 비례하고 동시에 적용되는 증감을 덮어쓰므로, 저장/매칭/수정 경로는 increment_statistics를 사용합니다.
+        """
+        values = self.compute_user_statistics(user_id)
+        
+        stmt = pg_insert(SessionStatistics).values(user_id=user_id, **values)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["user_id"],
+            set_={**{column: stmt.excluded[column] for column in STATISTICS_COLUMNS}, "updated_at": func.now()}
+        )
+        self.db.execute(stmt)
+        return values
+    
+    def increment_statistics(self, user_id: int, **deltas: int) -> None:
+        """저장/매칭/수정 시 통계 카운터를 부호 있는 증감으로 갱신 (카운터가 없으면 전체 재계산)"""
+        deltas = {column: delta for column, delta in deltas.items() if delta}
+        if not deltas:
+            return
+        
+        updated = self.db.query(SessionStatistics).filter(SessionStatistics.user_id == user_id).update(
+            {
+                **{getattr(SessionStatistics, column): getattr(SessionStatistics, column) + delta
+                   for column, delta in deltas.items()},
+                SessionStatistics.updated_at: func.now()
+            },
+            synchronize_session=False
+        )
+        if not updated:
+            self.refresh_statistics(user_id)
+    
+    def reset_statistics(self, user_id: int) -> None:
+        """세션 초기화 시 통계 카운터 삭제"""
+        self.db.query(SessionStatistics).filter(SessionStatistics.user_id == user_id).delete()
+    
+    # === 아카이브 관련 메서드 ===
     def get_user_archives(self, user_id: int, limit: int = 50) -> List[ProcessingArchive]:
         """사용자 아카이브 목록 조회"""
         return self.db.query(ProcessingArchive).filter(
             ProcessingArchive.user_id == user_id
         ).order_by(ProcessingArchive.archive_date.desc()).limit(limit).all()
     
-    def create_matching_history(self, user_id: int, archive_id: int, **kwargs) -> MatchingHistory:
-        """매칭 히스토리 생성"""
-        history = MatchingHistory(
+    # === 아카이브 영수증 (중복 지급 검사) 관련 메서드 ===
+    def get_archived_receipt_numbers(self, user_id: int, duty_free_type: str) -> Set[str]:
+        """사용자+면세점의 아카이브된 영수증 번호 집합 (처리 시작 시 1회 로드, 이후 영수증마다 DB 조회 없음)"""
+        return set(self.db.execute(text("""
+            SELECT receipt_number FROM archived_receipts
+            WHERE user_id = :user_id AND duty_free_type = :duty_free_type
+        """), {"user_id": user_id, "duty_free_type": duty_free_type}).scalars())
+    
+    def refresh_archived_duplicate_flags(self, user_id: int, duty_free_type: str,
+                                         receipt_numbers: Optional[List[str]] = None) -> int:
+        """영수증의 아카이브 중복 여부 재계산 (번호 보정/수정 후, 커밋은 호출한 쪽에서 수행)"""
+        receipt_table = "shilla_receipts" if duty_free_type == "shilla" else "receipts"
+        receipt_filter = "AND r.receipt_number = ANY(:receipt_numbers)" if receipt_numbers is not None else ""
+        return self.db.execute(text(f"""
+            UPDATE {receipt_table} r
+            SET is_archived_duplicate = EXISTS (
+                SELECT 1 FROM archived_receipts a
+                WHERE a.user_id = :user_id
+                AND a.duty_free_type = :duty_free_type
+                AND a.receipt_number = r.receipt_number
+            )
+            WHERE r.user_id = :user_id
+            {receipt_filter}
+        """), {
+            "user_id": user_id, "duty_free_type": duty_free_type, "receipt_numbers": receipt_numbers
+        }).rowcount
+    
+    def count_archived_duplicates(self, user_id: int, duty_free_type: str) -> int:
+        """현재 세션 영수증 중 아카이브 중복으로 표시된 영수증 수"""
+        model = ShillaReceipt if duty_free_type == "shilla" else Receipt
+        return self.db.query(func.count(model.id)).filter(
+            model.user_id == user_id,
+            model.is_archived_duplicate.is_(True)
+        ).scalar()
+    
+    def get_archived_duplicate_numbers(self, user_id: int, duty_free_type: str) -> List[str]:
+        """현재 세션에서 아카이브 중복으로 표시된 영수증 번호 목록"""
+        model = ShillaReceipt if duty_free_type == "shilla" else Receipt
+        return [
+            receipt_number for receipt_number, in self.db.query(model.receipt_number).filter(
+                model.user_id == user_id,
+                model.is_archived_duplicate.is_(True)
+            ).distinct().all()
+        ]
+    
+    # === 백그라운드 작업 관련 메서드 ===
+    def create_job(self, user_id: int, duty_free_type: str) -> ProcessingJob:
+        """이미지 처리 작업 생성"""
+        job = ProcessingJob(
             user_id=user_id,
-            archive_id=archive_id,
-            **kwargs
+            duty_free_type=duty_free_type,
+            status="pending"
+        )
+        self.db.add(job)
+        self.db.commit()
+        self.db.refresh(job)
+        return job
+    
+    def get_job(self, job_id: str, user_id: int) -> Optional[ProcessingJob]:
+        """사용자의 작업 조회"""
+        return self.db.query(ProcessingJob).filter(
+            ProcessingJob.id == job_id,
+            ProcessingJob.user_id == user_id
+        ).first()
+    
+    def get_user_jobs(self, user_id: int, limit: int = 20) -> List[ProcessingJob]:
+        """사용자의 최근 작업 목록 조회"""
+        return self.db.query(ProcessingJob).filter(
+            ProcessingJob.user_id == user_id
+        ).order_by(ProcessingJob.created_at.desc()).limit(limit).all()
+    
+    def update_job(self, job_id: str, **kwargs) -> None:
+        """작업 상태/진행상황 업데이트 (갱신 시각도 함께 기록)"""
+        self.db.query(ProcessingJob).filter(ProcessingJob.id == job_id).update(
+            {**kwargs, "heartbeat_at": func.now()}, synchronize_session=False
+        )
+        self.db.commit()
+    
+    def fail_stale_jobs(self, stale_seconds: int) -> List[Tuple[str, int]]:
+        """일정 시간 갱신이 없는 pending/running 작업을 실패 처리 ((작업 ID, 사용자 ID) 목록 반환)"""
+        rows = self.db.execute(text("""
+            UPDATE processing_jobs
+            SET status = 'failed',
+                error = '작업이 중단되었습니다. (서버 재시작 또는 응답 없음)',
+                finished_at = now()
+            WHERE status IN ('pending', 'running')
+            AND COALESCE(heartbeat_at, started_at, created_at) < now() - make_interval(secs => :stale_seconds)
+            RETURNING id, user_id
+        """), {"stale_seconds": stale_seconds}).all()
+        self.db.commit()
+        return [tuple(row) for row in rows]
+    
+    # === 처리 세션 관련 메서드 ===
+    def get_active_session(self, user_id: int) -> Optional[ProcessingSession]:
+        """사용자의 진행 중인 처리 세션 조회"""
+        return self.db.query(ProcessingSession).filter(
+            ProcessingSession.user_id == user_id,
+            ProcessingSession.status == "active"
+        ).first()
+    
+    def start_session(self, user_id: int, duty_free_type: str) -> ProcessingSession:
+        """ZIP/엑셀 업로드 시 처리 세션 시작 (진행 중인 세션이 있으면 면세점 타입만 갱신)"""
+        session = self.get_active_session(user_id)
+        
+        if session is None:
+            session = ProcessingSession(user_id=user_id, duty_free_type=duty_free_type, status="active")
+            self.db.add(session)
+        elif session.duty_free_type != duty_free_type:
+            print(f"처리 세션 면세점 타입 변경: {session.duty_free_type} -> {duty_free_type}")
+            session.duty_free_type = duty_free_type
+        
+        self.db.commit()
+        self.db.refresh(session)
+        self._duty_free_type_cache()[user_id] = duty_free_type
+        return session
+    
+    def complete_active_session(self, user_id: int) -> None:
+        """진행 중인 처리 세션 종료 (커밋은 호출한 쪽 트랜잭션에서 수행)"""
+        self.db.query(ProcessingSession).filter(
+            ProcessingSession.user_id == user_id,
+            ProcessingSession.status == "active"
+        ).update({"status": "completed", "completed_at": func.now()}, synchronize_session=False)
+        self._duty_free_type_cache().pop(user_id, None)
+    
+    def get_session_duty_free_type(self, user_id: int) -> Optional[str]:
+        """진행 중인 세션의 면세점 타입 (요청 단위로 캐시, 세션이 없으면 None)"""
+        cache = self._duty_free_type_cache()
+        if user_id not in cache:
+            session = self.get_active_session(user_id)
+            cache[user_id] = session.duty_free_type if session else None
+        return cache[user_id]
+    
+    def get_user_duty_free_type(self, user_id: int) -> str:
+        """사용자의 현재 면세점 타입 (세션이 없던 기존 데이터는 통계 카운터로 판단)"""
+        return self.get_session_duty_free_type(user_id) or self.get_user_statistics(user_id)["duty_free_type"]
+    
+    def _duty_free_type_cache(self) -> Dict[int, Optional[str]]:
+        """DB 세션(요청)마다 유지되는 면세점 타입 캐시"""
+        return self.db.info.setdefault("duty_free_type", {})
+    
+    # === 엑셀 업로드 배치 관련 메서드 ===
+    def get_excel_batch_ids(self, user_id: int) -> List[int]:
+        """사용자의 커밋된 엑셀 업로드 배치 ID 목록 (매칭 시작 시점의 스냅샷으로 사용)"""
+        rows = self.db.query(ExcelUploadBatch.id).filter(
+            ExcelUploadBatch.user_id == user_id
+        ).order_by(ExcelUploadBatch.id).all()
+        return [row.id for row in rows]
+    
+    def get_excel_receipt_index(self, user_id: int, duty_free_type: str) -> ReceiptNumberIndex:
+        """사용자 엑셀 영수증 번호 근사 검색 인덱스 (업로드 배치가 바뀌기 전까지 메모리에 캐시)"""
+        batch_ids = self.get_excel_batch_ids(user_id)
+        table_name = f"{duty_free_type}_excel_data"
+        if table_name not in EXCEL_DATA_TABLES:
+            raise ValueError(f"지원하지 않는 면세점 타입입니다: {duty_free_type}")
+        
+        def load_receipt_numbers() -> List[str]:
+            return self.db.execute(text(f"""
+                SELECT "receiptNumber" FROM {table_name}
+                WHERE user_id = :user_id AND batch_id = ANY(:batch_ids)
+            """), {"user_id": user_id, "batch_ids": batch_ids}).scalars().all()
+        
+        return get_receipt_index((user_id, duty_free_type, tuple(batch_ids)), load_receipt_numbers)
+    
+    def truncate_user_excel_data(self, user_id: int) -> None:
+        """사용자 엑셀 데이터 파티션 비우기 및 업로드 배치 삭제 (커밋은 호출한 쪽 트랜잭션에서 수행)
+        
+        파티션 DROP은 부모 테이블에 ACCESS EXCLUSIVE 잠금을 걸어 커밋까지 모든 사용자의 엑셀 조회/저장을 막으므로,
+        사용자 파티션만 잠그는 TRUNCATE를 사용합니다. (빈 파티션은 다음 업로드에서 그대로 재사용)
+        """
+        partitions = [excel_partition_name(table_name, user_id) for table_name in EXCEL_DATA_TABLES]
+        existing = self.db.execute(
+            text("SELECT name FROM unnest(CAST(:names AS text[])) AS name WHERE to_regclass(name) IS NOT NULL"),
+            {"names": partitions}
+        ).scalars().all()
+        if existing:
+            self.db.execute(text(f"TRUNCATE TABLE {', '.join(existing)}"))
+        self.db.query(ExcelUploadBatch).filter(ExcelUploadBatch.user_id == user_id).delete()
+    
+    # === OCR 결과 캐시 관련 메서드 ===
+    def get_ocr_cache_entries(self, image_hashes: List[str], duty_free_type: str,
+                              prompt_version: str) -> Dict[str, OcrResultCache]:
+        """이미지 해시 목록에 대한 캐시 항목 일괄 조회"""
+        if not image_hashes:
+            return {}
+        
+        entries = self.db.query(OcrResultCache).filter(
+            OcrResultCache.image_hash.in_(image_hashes),
+            OcrResultCache.duty_free_type == duty_free_type,
+            OcrResultCache.prompt_version == prompt_version
+        ).all()
+        return {entry.image_hash: entry for entry in entries}
+    
+    def mark_ocr_cache_hits(self, entry_ids: List[int]) -> None:
+        """캐시 적중 횟수 기록"""
+        if not entry_ids:
+            return
+        
+        self.db.query(OcrResultCache).filter(OcrResultCache.id.in_(entry_ids)).update(
+            {
+                OcrResultCache.hit_count: OcrResultCache.hit_count + 1,
+                OcrResultCache.last_hit_at: func.now()
+            },
+            synchronize_session=False
         )
-        self.db.add(history)
         self.db.commit()
-        self.db.refresh(history)
-        return history
\ No newline at end of file
+    
+    def save_ocr_cache_entries(self, entries: List[Dict[str, Any]]) -> None:
+        """OCR/GPT 결과 캐시 일괄 저장 (이미 있으면 무시)"""
+        if not entries:
+            return
+        
+        stmt = pg_insert(OcrResultCache).values([
+            {**entry, "hit_count": 0} for entry in entries
+        ]).on_conflict_do_nothing(constraint="uq_ocr_result_cache_key")
+        self.db.execute(stmt)
+        self.db.commit()
+
+class OcrBatchWriter:
+    """OCR 결과 일괄 저장기
+    
+    이미지별 저장 행을 모아 두었다가 flush 시 테이블별 multi-row INSERT로 한 번에 저장합니다.
+    일괄 저장이 실패하면 이미지별 SAVEPOINT로 다시 저장하여, 실패한 이미지만 인식 실패 이미지로 기록합니다.
+    """
+    
+    TABLES = {
+        "receipts": Receipt.__table__,
+        "shilla_receipts": ShillaReceipt.__table__,
+        "passports": Passport.__table__,
+        "unrecognized_images": UnrecognizedImage.__table__,
+    }
+    
+    # INSERT 1회당 최대 행 수 (PostgreSQL 바인드 파라미터 제한 대비)
+    MAX_ROWS_PER_INSERT = 1000
+    
+    def __init__(self, db: Session, user_id: int):
+        self.db = db
+        self.user_id = user_id
+        self.pending: List[Tuple[str, Dict[str, List[Dict[str, Any]]]]] = []
+        self.cache_entries: List[Dict[str, Any]] = []
+    
+    def __len__(self) -> int:
+        return len(self.pending)
+    
+    def add(self, image_path: str, rows: Dict[str, List[Dict[str, Any]]]):
+        """이미지 1장의 저장 행 추가 ({테이블 이름: 행 목록})"""
+        self.pending.append((image_path, rows))
+    
+    def add_unrecognized(self, image_path: str):
+        """인식 실패 이미지 추가"""
+        self.add(image_path, self._unrecognized_rows(image_path))
+    
+    def add_cache_entry(self, image_hash: str, duty_free_type: str, prompt_version: str,
+                        ocr_text: str, parsed_result: Dict[str, Any]):
+        """OCR/GPT 결과 캐시 항목 추가"""
+        self.cache_entries.append({
+            "image_hash": image_hash,
+            "duty_free_type": duty_free_type,
+            "prompt_version": prompt_version,
+            "ocr_text": ocr_text,
+            "parsed_result": parsed_result
+        })
+    
+    def flush(self) -> int:
+        """모아 둔 행 저장 (인식 실패로 전환된 이미지 수 반환)"""
+        pending, self.pending = self.pending, []
+        failed_count = 0
+        
+        if pending:
+            try:
+                inserted = self._insert_rows([rows for _, rows in pending])
+                self._increment_statistics(inserted)
+                self.db.commit()
+            except Exception as e:
+                self.db.rollback()
+                print(f"일괄 저장 실패, 이미지별로 다시 저장합니다: {e}")
+                failed_count = self._insert_each(pending)
+        
+        # 캐시 저장 실패는 처리 결과에 영향 없음
+        cache_entries, self.cache_entries = self.cache_entries, []
+        try:
+            OcrRepository(self.db).save_ocr_cache_entries(cache_entries)
+        except Exception as e:
+            self.db.rollback()
+            print(f"OCR 캐시 저장 오류: {e}")
+        
+        return failed_count
+    
+    def _insert_each(self, pending: List[Tuple[str, Dict[str, List[Dict[str, Any]]]]]) -> int:
+        """이미지별 SAVEPOINT로 저장 (실패한 이미지는 인식 실패 이미지로 기록)"""
+        failed_count = 0
+        inserted: Dict[str, int] = {}
+        
+        for image_path, rows in pending:
+            try:
+                with self.db.begin_nested():
+                    for table_name, count in self._insert_rows([rows]).items():
+                        inserted[table_name] = inserted.get(table_name, 0) + count
+            except Exception as e:
+                print(f"이미지 저장 오류: {image_path} - {e}")
+                failed_count += 1
+                try:
+                    with self.db.begin_nested():
+                        self._insert_rows([self._unrecognized_rows(image_path)])
+                except Exception as save_error:
+                    print(f"인식 실패 이미지 저장 오류: {image_path} - {save_error}")
+        
+        self._increment_statistics(inserted)
+        self.db.commit()
+        return failed_count
+    
+    def _increment_statistics(self, inserted: Dict[str, int]):
+        """저장한 영수증/여권 수만큼 세션 통계 카운터 증가 (같은 트랜잭션)"""
+        OcrRepository(self.db).increment_statistics(
+            self.user_id,
+            lotte_receipts=inserted.get("receipts", 0),
+            shilla_receipts=inserted.get("shilla_receipts", 0),
+            total_passports=inserted.get("passports", 0)
+        )
+    
+    def _unrecognized_rows(self, image_path: str) -> Dict[str, List[Dict[str, Any]]]:
+        """인식 실패 이미지 저장 행"""
+        return {"unrecognized_images": [{"user_id": self.user_id, "file_path": image_path}]}
+    
+    def _insert_rows(self, rows_list: List[Dict[str, List[Dict[str, Any]]]]) -> Dict[str, int]:
+        """테이블별로 행을 합쳐 multi-row INSERT 실행 (테이블별 저장 행 수 반환)"""
+        rows_by_table: Dict[str, List[Dict[str, Any]]] = {}
+        for rows in rows_list:
+            for table_name, table_rows in rows.items():
+                rows_by_table.setdefault(table_name, []).extend(table_rows)
+        
+        for table_name, table_rows in rows_by_table.items():
+            for start in range(0, len(table_rows), self.MAX_ROWS_PER_INSERT):
+                chunk = table_rows[start:start + self.MAX_ROWS_PER_INSERT]
+                self.db.execute(self.TABLES[table_name].insert().values(chunk))
+        
+        return {table_name: len(table_rows) for table_name, table_rows in rows_by_table.items()}
@@ -1,20 +1,22 @@
 # app/routers/ocr_router.py
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form
+from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form, BackgroundTasks
 from sqlalchemy.orm import Session
 from typing import List, Optional
-import tempfile
 import os
 import time
 
 from ..core.database import get_db
 from ..core.dependencies import get_current_user
-from ..services.ocr_service import OcrService
 from ..services.matching_service import MatchingService
 from ..services.archive_service import ArchiveService
-from ..utils.excel_parser import ExcelParser
+from ..services.job_service import JobService
+from ..services.incremental_matching_service import IncrementalMatchingService
+from ..repositories.ocr_repository import OcrRepository
+from ..utils.excel_parser import ExcelParser, SALES_FILE_EXTENSIONS, PARQUET_AVAILABLE
+from ..utils.file_upload import save_upload_to_temp
 from ..schemas.ocr_schema import (
     DutyFreeType, OcrProcessResponse, ExcelUploadResponse,
-    MatchingResults, ProgressResponse, UserStatistics,
+    MatchingResults, JobCreateResponse, JobResponse, UserStatistics,
     ReceiptUpdate, PassportUpdate, SessionCompleteRequest,
     HistorySearchRequest, HistorySearchResponse
 )
@@ -27,7 +29,7 @@ router = APIRouter(
 
 @router.post("/upload-excel", response_model=ExcelUploadResponse, summary="엑셀 데이터 업로드")
 async def upload_excel(
-    excel_file: UploadFile = File(..., description="엑셀 파일 (.xlsx, .xls)"),
+    excel_file: UploadFile = File(..., description="매출 파일 (.xlsx, .xls, .csv, .parquet)"),
     duty_free_type: DutyFreeType = Form(..., description="면세점 타입"),
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
@@ -35,35 +37,55 @@ async def upload_excel(
     """
     매출 내역 엑셀 파일을 업로드하고 데이터베이스에 저장합니다.
     
-    - **excel_file**: 엑셀 파일 (롯데: 교환권번호/고객명/PayBack, 신라: BILL번호/고객명/수수료)
+    - **excel_file**: 엑셀/CSV/Parquet 파일 (롯데: 교환권번호/고객명/PayBack, 신라: BILL번호/고객명/수수료)
     - **duty_free_type**: 면세점 타입 (lotte 또는 shilla)
     """
-    if not excel_file.filename.lower().endswith(('.xlsx', '.xls')):
+    suffix = os.path.splitext(excel_file.filename)[1].lower()
+    if suffix not in SALES_FILE_EXTENSIONS:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail="엑셀 파일만 업로드 가능합니다 (.xlsx, .xls)"
+            detail=f"엑셀/CSV/Parquet 파일만 업로드 가능합니다 ({', '.join(SALES_FILE_EXTENSIONS)})"
+        )
+    if suffix == '.parquet' and not PARQUET_AVAILABLE:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="서버에 pyarrow가 설치되어 있지 않아 Parquet 파일을 처리할 수 없습니다"
         )
     
-    # 임시 파일 저장
-    with tempfile.NamedTemporaryFile(delete=False, suffix=".xlsx") as tmp_file:
-        tmp_file.write(await excel_file.read())
-        tmp_path = tmp_file.name
+    # 임시 파일 저장 (청크 단위 스트리밍, 최대 크기 제한)
+    tmp_path = await save_upload_to_temp(excel_file, suffix=suffix)
     
     try:
         start_time = time.time()
         
-        # 엑셀 파싱
         excel_parser = ExcelParser()
+        table_name = 'lotte_excel_data' if duty_free_type == DutyFreeType.LOTTE else 'shilla_excel_data'
         
-        if duty_free_type == DutyFreeType.LOTTE:
-            df, records_before, total_records = excel_parser.parse_lotte_excel(tmp_path)
-            table_name = 'lotte_excel_data'
+        if suffix != '.xls':
+            # 스트리밍 파싱(.xlsx/.csv/.parquet) → 청크 단위 DB 적재 (메모리 사용량은 청크 크기에 비례)
+            chunks = excel_parser.iter_file_chunks(tmp_path, duty_free_type.value)
+            records_added, final_total, batch_id = excel_parser.save_rows_to_database(
+                chunks, table_name, current_user.id, excel_file.filename
+            )
         else:
-            df, records_before, total_records = excel_parser.parse_shilla_excel(tmp_path)
-            table_name = 'shilla_excel_data'
+            # .xls는 openpyxl이 지원하지 않으므로 pandas로 파싱
+            if duty_free_type == DutyFreeType.LOTTE:
+                df, records_before, total_records = excel_parser.parse_lotte_excel(tmp_path)
+            else:
+                df, records_before, total_records = excel_parser.parse_shilla_excel(tmp_path)
+            records_added, final_total, batch_id = excel_parser.save_to_database(
+                df, table_name, current_user.id, excel_file.filename
+            )
+        
+        # 처리 세션 시작 (면세점 타입 기록)
+        ocr_repo = OcrRepository(db)
+        ocr_repo.start_session(current_user.id, duty_free_type.value)
         
-        # 데이터베이스 저장
-        records_added, final_total = excel_parser.save_to_database(df, table_name)
+        # 새 배치에 들어온 번호의 미매칭 영수증/여권만 다시 매칭 (전체 재매칭 없이, 세션 통계는 증감 반영)
+        rematched_receipts = IncrementalMatchingService(db).match_excel_batch(
+            current_user.id, duty_free_type.value, batch_id
+        )
+        db.commit()
         
         processing_time = f"{time.time() - start_time:.2f}초"
         
@@ -72,7 +94,9 @@ async def upload_excel(
             records_added=records_added,
             total_records=final_total,
             processing_time=processing_time,
-            duty_free_type=duty_free_type.value
+            duty_free_type=duty_free_type.value,
+            batch_id=batch_id,
+            rematched_receipts=rematched_receipts
         )
         
     finally:
@@ -80,15 +104,17 @@ async def upload_excel(
         if os.path.exists(tmp_path):
             os.remove(tmp_path)
 
-@router.post("/process-images", response_model=OcrProcessResponse, summary="이미지 OCR 처리")
+@router.post("/process-images", response_model=JobCreateResponse, summary="이미지 OCR 처리 작업 등록")
 async def process_images(
+    background_tasks: BackgroundTasks,
     zip_file: UploadFile = File(..., description="이미지들이 포함된 ZIP 파일"),
     duty_free_type: DutyFreeType = Form(..., description="면세점 타입"),
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """
-    ZIP 파일에 포함된 이미지들을 OCR 처리하고 자동 매칭을 수행합니다.
+    ZIP 파일에 포함된 이미지들의 OCR 처리 및 자동 매칭 작업을 등록하고 작업 ID를 즉시 반환합니다.
+    처리 상태와 결과는 **GET /ocr/jobs/{job_id}** 로 조회합니다.
     
     - **zip_file**: 영수증과 여권 이미지가 포함된 ZIP 파일
     - **duty_free_type**: 면세점 타입 (lotte 또는 shilla)
@@ -99,32 +125,63 @@ async def process_images(
             detail="ZIP 파일만 업로드 가능합니다"
         )
     
-    # 임시 파일 저장
-    with tempfile.NamedTemporaryFile(delete=False, suffix=".zip") as tmp_file:
-        tmp_file.write(await zip_file.read())
-        tmp_path = tmp_file.name
+    # 임시 파일 저장 (청크 단위 스트리밍, 최대 크기 제한)
+    tmp_path = await save_upload_to_temp(zip_file, suffix=".zip")
     
     try:
-        ocr_service = OcrService(db)
-        result = ocr_service.process_images_from_zip(tmp_path, current_user.id, duty_free_type)
-        return result
-        
-    finally:
-        # 임시 파일 삭제
-        if os.path.exists(tmp_path):
-            os.remove(tmp_path)
+        job_service = JobService(db)
+        job = job_service.create_image_job(current_user.id, duty_free_type)
+    except Exception:
+        os.remove(tmp_path)
+        raise
+    
+    # 응답 후 백그라운드에서 처리 (임시 파일은 작업 종료 시 삭제)
+    background_tasks.add_task(
+        JobService.run_image_job, job.id, tmp_path, current_user.id, duty_free_type
+    )
+    
+    return JobCreateResponse(
+        job_id=job.id,
+        status=job.status,
+        duty_free_type=duty_free_type.value
+    )
+
+@router.get("/jobs", response_model=List[JobResponse], summary="처리 작업 목록")
+async def get_jobs(
+    limit: int = 20,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    사용자의 최근 이미지 처리 작업 목록을 반환합니다.
+    
+    - **limit**: 조회할 작업 개수 (기본: 20)
+    """
+    job_service = JobService(db)
+    return job_service.get_user_jobs(current_user.id, limit)
 
-@router.get("/progress", response_model=ProgressResponse, summary="처리 진행상황")
-async def get_progress():
+@router.get("/jobs/{job_id}", response_model=JobResponse, summary="처리 작업 상태")
+async def get_job(
+    job_id: str,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
     """
-    현재 OCR 처리 진행상황을 반환합니다.
+    이미지 처리 작업의 상태와 진행상황을 반환합니다.
+    작업이 완료되면 **result**에 처리 결과가 포함됩니다.
+    
+    - **job_id**: 작업 ID
     """
-    from ..services.ocr_service import progress
+    job_service = JobService(db)
+    job = job_service.get_job(job_id, current_user.id)
     
-    return ProgressResponse(
-        done=progress["done"],
-        total=progress["total"]
-    )
+    if not job:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="작업을 찾을 수 없습니다."
+        )
+    
+    return job
 
 @router.get("/results", response_model=MatchingResults, summary="매칭 결과 조회")
 async def get_matching_results(
@@ -228,59 +285,54 @@ async def complete_session(
     """
     archive_service = ArchiveService(db)
     
-    # 현재 상태 확인
-    from ..repositories.ocr_repository import OcrRepository
-    ocr_repo = OcrRepository(db)
-    stats = ocr_repo.get_user_statistics(current_user.id)
-    
-    if stats["total_receipts"] == 0:
+    # 이력 저장(선택)과 데이터 초기화를 한 트랜잭션으로 처리
+    try:
+        result = archive_service.complete_session(
+            current_user.id, session_data.session_name, session_data.save_to_history
+        )
+    except ValueError as e:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail="처리할 데이터가 없습니다."
+            detail=str(e)
         )
-    
-    # 이력 저장 (선택사항)
-    if session_data.save_to_history:
-        session_name = session_data.session_name or f"세션_{int(time.time())}"
-        archive_success = archive_service.save_current_session_to_history(
-            current_user.id, session_name
-        )
-        
-        if not archive_success:
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail="이력 저장 중 오류가 발생했습니다."
-            )
-    
-    # 현재 세션 데이터 초기화
-    clear_success = ocr_repo.clear_user_session_data(current_user.id)
-    
-    if not clear_success:
+    except Exception as e:
+        print(f"세션 완료 오류: {e}")
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="데이터 초기화 중 오류가 발생했습니다."
+            detail="세션 완료 중 오류가 발생했습니다. 이력 저장과 데이터 초기화 모두 취소되었습니다."
         )
     
     return {
         "message": "처리가 완료되었습니다.",
         "session_saved": session_data.save_to_history,
-        "data_cleared": True
+        "data_cleared": True,
+        "archive_id": result["archive_id"],
+        "history_count": result["history_count"],
+        "deleted": result["deleted"],
+        "timings": result["timings"]
     }
 
 @router.get("/history", summary="처리 이력 조회")
 async def get_processing_history(
     limit: int = 50,
+    cursor: Optional[str] = None,
+    include_total: bool = False,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """
-    사용자의 처리 이력을 조회합니다.
+    사용자의 처리 이력을 최신순으로 조회합니다.
     
-    - **limit**: 조회할 이력 개수 (기본: 50)
+    - **limit**: 한 페이지 이력 개수 (기본: 50, 최대: 200)
+    - **cursor**: 이전 응답의 next_cursor (다음 페이지 조회)
+    - **include_total**: 전체 이력 수 포함 여부
     """
     archive_service = ArchiveService(db)
-    archives = archive_service.get_user_archives(current_user.id, limit)
-    return {"archives": archives}
+    try:
+        page = archive_service.get_user_archives(current_user.id, limit, cursor, include_total)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    return page
 
 @router.post("/history/search", response_model=HistorySearchResponse, summary="이력 검색")
 async def search_history(
@@ -289,22 +341,32 @@ async def search_history(
     db: Session = Depends(get_db)
 ):
     """
-    처리 이력을 검색합니다.
+    처리 이력을 최신순으로 검색합니다.
     
     - **query**: 검색어 (고객명, 여권번호, 영수증번호)
     - **search_type**: 검색 타입 (all, customer, passport, receipt)
+    - **limit** / **cursor**: 페이지 크기와 이전 응답의 next_cursor
+    - **include_total**: 예상 전체 결과 수 포함 여부
     """
     archive_service = ArchiveService(db)
-    results = archive_service.search_matching_history(
-        user_id=current_user.id,
-        query=search_data.query,
-        search_type=search_data.search_type
-    )
+    try:
+        page = archive_service.search_matching_history(
+            user_id=current_user.id,
+            query=search_data.query,
+            search_type=search_data.search_type,
+            limit=search_data.limit,
+            cursor=search_data.cursor,
+            include_total=search_data.include_total
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
     
     return HistorySearchResponse(
         success=True,
-        results=results,
-        total=len(results)
+        results=page["results"],
+        total=len(page["results"]),
+        next_cursor=page["next_cursor"],
+        total_estimate=page["total_estimate"]
     )
 
 @router.get("/available-passports", summary="매칭 가능한 여권 목록")
@@ -16,6 +16,8 @@ class ExcelUploadResponse(BaseModel):
     total_records: int
     processing_time: str
     duty_free_type: str
+    batch_id: Optional[int] = None  # 이번 업로드의 엑셀 배치 ID
+    rematched_receipts: int = 0  # 이번 업로드로 새로 매칭된 기존 미매칭 영수증 수
 
 class OcrProcessRequest(BaseModel):
     """OCR 처리 요청"""
@@ -29,14 +31,32 @@ class OcrProcessResponse(BaseModel):
     matched_receipts: int
     unmatched_receipts: int
     processing_time: str
+    cache_hits: int = 0
+    cache_hit_ratio: float = 0.0
+    archived_duplicates: int = 0  # 이전 세션에서 이미 아카이브된 영수증 수
     
 # === 영수증 관련 스키마 ===
+class ReceiptSuggestion(BaseModel):
+    """미매칭 영수증 번호 보정 후보"""
+    receipt_number: str
+    distance: int  # 자리 차이 수
+    claimed: bool  # 다른 영수증이 이미 매칭한 번호인지 여부
+
+class PassportSuggestion(BaseModel):
+    """여권이 연결되지 않은 고객의 유사 이름 여권 후보 (사용자 확인 필요)"""
+    passport_id: int
+    name: str
+    passport_number: Optional[str] = None
+    score: float  # 이름 유사도 (0~1)
+
 class ReceiptResponse(BaseModel):
     """영수증 응답 스키마"""
     id: int
     receipt_number: Optional[str]
     file_path: Optional[str]
     created_at: datetime
+    suggestions: List[ReceiptSuggestion] = []  # 미매칭 영수증의 엑셀 번호 보정 후보
+    is_archived_duplicate: bool = False  # 이전 세션에서 이미 아카이브된 번호
     
     class Config:
         from_attributes = True
@@ -90,6 +110,8 @@ class CustomerMatchResult(BaseModel):
     needs_update: bool = False
     passport_match_status: str = "확인 필요"
     passport_status: str = "unknown"
+    archived_receipt_numbers: List[str] = []  # 이전 세션에서 이미 아카이브된 영수증 번호
+    passport_suggestions: List[PassportSuggestion] = []  # 이름이 비슷한 여권 후보 (자동 연결하지 않음)
 
 class MatchingResults(BaseModel):
     """전체 매칭 결과"""
@@ -123,12 +145,17 @@ class HistorySearchRequest(BaseModel):
     """이력 검색 요청"""
     query: str
     search_type: str = "all"  # all, customer, passport, receipt
+    limit: int = 100  # 한 페이지 결과 수 (최대 200)
+    cursor: Optional[str] = None  # 이전 응답의 next_cursor
+    include_total: bool = False  # 예상 전체 결과 수 포함 여부
 
 class HistorySearchResponse(BaseModel):
     """이력 검색 응답"""
     success: bool
     results: List[Dict[str, Any]]
-    total: int
+    total: int  # 이번 페이지 결과 수
+    next_cursor: Optional[str] = None  # 다음 페이지 커서 (마지막 페이지면 None)
+    total_estimate: Optional[int] = None  # 예상 전체 결과 수 (include_total 요청 시)
 
 # === 수령증 생성 관련 스키마 ===
 class ReceiptGenerationResponse(BaseModel):
@@ -137,12 +164,26 @@ class ReceiptGenerationResponse(BaseModel):
     generated_count: int
     download_path: str
 
-# === 진행상황 관련 스키마 ===
-class ProgressResponse(BaseModel):
-    """처리 진행상황 응답"""
-    done: int
-    total: int
+# === 작업(진행상황) 관련 스키마 ===
+class JobCreateResponse(BaseModel):
+    """이미지 처리 작업 등록 응답"""
+    job_id: str
+    status: str
+    duty_free_type: str
+
+class JobResponse(BaseModel):
+    """이미지 처리 작업 상태 응답"""
+    job_id: str
+    status: str
+    duty_free_type: Optional[str] = None
+    done: int = 0
+    total: int = 0
     percentage: float = 0.0
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    created_at: Optional[datetime] = None
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
     
     def __init__(self, **data):
         super().__init__(**data)
@@ -2,10 +2,13 @@
 from sqlalchemy.orm import Session
 from sqlalchemy import text
 from datetime import datetime
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 import json
+import re
+import time
 
 from ..repositories.ocr_repository import OcrRepository
+from ..utils.pagination import encode_cursor, decode_cursor, clamp_page_size
 
 class ArchiveService:
     """아카이브 및 이력 관리 서비스 (기존 로직 100% 보존)"""
@@ -14,275 +17,259 @@ class ArchiveService:
         self.db = db
         self.ocr_repo = OcrRepository(db)
     
-    def save_current_session_to_history(self, user_id: int, session_name: str) -> bool:
-        """현재 세션을 이력에 저장 (기존 로직 보존)"""
+    def complete_session(self, user_id: int, session_name: Optional[str], save_to_history: bool) -> Dict[str, Any]:
+        """세션 완료 (이력 저장과 세션 데이터 초기화를 한 트랜잭션으로 수행)
+        
+        중간에 실패하면 전체를 롤백하므로 이력만 저장되고 데이터가 남는 상태가 생기지 않습니다.
+        처리할 데이터가 없으면 ValueError를 발생시킵니다.
+        """
+        timings: Dict[str, float] = {}
+        started = time.perf_counter()
+        
+        def mark(phase: str, since: float) -> float:
+            now = time.perf_counter()
+            timings[phase] = round((now - since) * 1000, 1)
+            return now
+        
         try:
-            print(f"사용자 {user_id}의 세션 '{session_name}' 이력 저장 시작...")
+            # 통계 행이 없으면 여기서 생성/커밋되므로 잠금 전에 한 번 조회
+            self.ocr_repo.get_user_statistics(user_id)
             
-            # 1. 현재 세션 통계 수집
-            stats = self._collect_session_statistics(user_id)
-            print(f"수집된 통계: {stats}")
-            
-            if stats["total_receipts"] == 0:
-                print("저장할 데이터가 없습니다.")
-                return False
-            
-            # 2. 아카이브 레코드 생성
-            archive = self.ocr_repo.create_archive(
-                user_id=user_id,
-                session_name=session_name,
-                total_receipts=stats["total_receipts"],
-                matched_receipts=stats["matched_receipts"],
-                total_passports=stats["total_passports"],
-                matched_passports=stats["matched_passports"],
-                duty_free_type=stats["duty_free_type"],
-                archive_data=stats["detailed_data"]
+            # 같은 사용자의 완료 요청이 동시에 들어와도 한 번만 처리 (트랜잭션 종료 시 잠금 해제)
+            self.db.execute(
+                text("SELECT pg_advisory_xact_lock(hashtext(:lock_key))"),
+                {"lock_key": f"complete_session_u{user_id}"}
             )
-            print(f"아카이브 레코드 생성 완료 (ID: {archive.id})")
+            stats = self.ocr_repo.get_user_statistics(user_id)
+            if stats["total_receipts"] == 0:
+                raise ValueError("처리할 데이터가 없습니다.")
+            phase_start = mark("lock_ms", started)
             
-            # 3. 상세 매칭 이력 저장
-            detail_count = self._save_detailed_matching_history(user_id, archive.id, stats["duty_free_type"])
-            print(f"상세 이력 저장 완료: {detail_count}개")
+            archive_id = None
+            history_count = 0
+            if save_to_history:
+                session_name = session_name or f"세션_{int(time.time())}"
+                archive_id = self._insert_archive_snapshot(user_id, session_name, stats)
+                phase_start = mark("archive_ms", phase_start)
+                history_count = self._save_detailed_matching_history(user_id, archive_id, stats["duty_free_type"])
+                self._save_archived_receipts(user_id, archive_id, stats["duty_free_type"])
+                phase_start = mark("history_ms", phase_start)
             
-            print(f"세션 '{session_name}' 이력 저장 완료!")
-            return True
+            deleted = self.ocr_repo.delete_user_session_data(user_id)
+            phase_start = mark("clear_ms", phase_start)
             
-        except Exception as e:
+            self.db.commit()
+            mark("commit_ms", phase_start)
+        except Exception:
             self.db.rollback()
-            print(f"이력 저장 오류: {e}")
-            import traceback
-            traceback.print_exc()
-            return False
+            raise
+        
+        timings["total_ms"] = round((time.perf_counter() - started) * 1000, 1)
+        print(f"사용자 {user_id} 세션 완료: 이력 {history_count}개, 삭제 {deleted}, 소요 {timings}")
+        return {
+            "archive_id": archive_id,
+            "history_count": history_count,
+            "deleted": deleted,
+            "timings": timings
+        }
     
-    def _collect_session_statistics(self, user_id: int) -> Dict[str, Any]:
-        """현재 세션 통계 수집 (기존 로직 보존)"""
-        try:
-            # 신라와 롯데 데이터 모두 확인하여 실제 사용 중인 타입 결정
-            shilla_count_sql = text("SELECT COUNT(*) FROM shilla_receipts WHERE user_id = :user_id")
-            lotte_count_sql = text("SELECT COUNT(*) FROM receipts WHERE user_id = :user_id")
-            
-            try:
-                shilla_count = self.db.execute(shilla_count_sql, {"user_id": user_id}).scalar() or 0
-            except:
-                shilla_count = 0
-                
-            try:
-                lotte_count = self.db.execute(lotte_count_sql, {"user_id": user_id}).scalar() or 0
-            except:
-                lotte_count = 0
-            
-            duty_free_type = "shilla" if shilla_count >= lotte_count else "lotte"
-            print(f"통계 수집: 신라={shilla_count}, 롯데={lotte_count}, 타입={duty_free_type}")
-            
-            if duty_free_type == "shilla":
-                stats_sql = text("""
-                SELECT 
-                    COUNT(DISTINCT sr.id) as total_receipts,
-                    COUNT(DISTINCT CASE WHEN se."receiptNumber" IS NOT NULL THEN sr.id END) as matched_receipts,
-                    COUNT(DISTINCT p.id) as total_passports,
-                    COUNT(DISTINCT CASE WHEN p.is_matched = TRUE THEN p.id END) as matched_passports
-                FROM shilla_receipts sr
-                LEFT JOIN shilla_excel_data se ON se."receiptNumber"::text = sr.receipt_number
-                LEFT JOIN passports p ON p.user_id = sr.user_id
-                WHERE sr.user_id = :user_id
-                """)
-                
-                detail_sql = text("""
-                SELECT 
-                    sr.id as receipt_id,
-                    sr.receipt_number,
-                    sr.passport_number as receipt_passport,
-                    se.name as excel_name,
-                    se.passport_number as excel_passport,
-                    CASE WHEN se."receiptNumber" IS NOT NULL THEN true ELSE false END as matched
-                FROM shilla_receipts sr
-                LEFT JOIN shilla_excel_data se ON se."receiptNumber"::text = sr.receipt_number
-                WHERE sr.user_id = :user_id
-                ORDER BY sr.receipt_number
-                """)
-            else:
-                stats_sql = text("""
-                SELECT 
-                    COUNT(DISTINCT r.id) as total_receipts,
-                    COUNT(DISTINCT CASE WHEN rml.is_matched = TRUE THEN r.id END) as matched_receipts,
-                    COUNT(DISTINCT p.id) as total_passports,
-                    COUNT(DISTINCT CASE WHEN p.is_matched = TRUE THEN p.id END) as matched_passports
-                FROM receipts r
-                LEFT JOIN receipt_match_log rml ON r.receipt_number = rml.receipt_number AND rml.user_id = r.user_id
-                LEFT JOIN passports p ON p.user_id = r.user_id
-                WHERE r.user_id = :user_id
-                """)
-                
-                detail_sql = text("""
-                SELECT 
-                    r.id as receipt_id,
-                    r.receipt_number,
-                    '' as receipt_passport,
-                    rml.excel_name,
-                    rml.passport_number as excel_passport,
-                    COALESCE(rml.is_matched, false) as matched
-                FROM receipts r
-                LEFT JOIN receipt_match_log rml ON r.receipt_number = rml.receipt_number AND rml.user_id = r.user_id
-                WHERE r.user_id = :user_id
-                ORDER BY r.receipt_number
-                """)
-            
-            # 기본 통계 수집
-            result = self.db.execute(stats_sql, {"user_id": user_id}).first()
-            
-            # 상세 영수증 데이터 수집
-            receipt_details = self.db.execute(detail_sql, {"user_id": user_id}).fetchall()
-            receipt_data = []
-            for row in receipt_details:
-                receipt_data.append({
-                    'receipt_id': row[0],
-                    'receipt_number': row[1],
-                    'receipt_passport': row[2],
-                    'excel_name': row[3],
-                    'excel_passport': row[4],
-                    'matched': row[5]
-                })
-            
-            # 여권 데이터 수집
-            passport_sql = text("""
-            SELECT id, name, passport_number, birthday, is_matched
-            FROM passports 
-            WHERE user_id = :user_id
-            ORDER BY name
-            """)
-            passport_details = self.db.execute(passport_sql, {"user_id": user_id}).fetchall()
-            passport_data = []
-            for row in passport_details:
-                passport_data.append({
-                    'passport_id': row[0],
-                    'name': row[1],
-                    'passport_number': row[2],
-                    'birthday': row[3].isoformat() if row[3] else None,
-                    'is_matched': row[4]
-                })
-            
-            return {
-                "total_receipts": result[0] or 0,
-                "matched_receipts": result[1] or 0,
-                "total_passports": result[2] or 0,
-                "matched_passports": result[3] or 0,
-                "duty_free_type": duty_free_type,
-                "detailed_data": {
-                    "receipts": receipt_data,
-                    "passports": passport_data,
-                    "archived_at": datetime.now().isoformat(),
-                    "duty_free_type": duty_free_type
-                }
-            }
-            
-        except Exception as e:
-            print(f"통계 수집 오류: {e}")
-            import traceback
-            traceback.print_exc()
-            return {
-                "total_receipts": 0, "matched_receipts": 0,
-                "total_passports": 0, "matched_passports": 0,
-                "duty_free_type": "unknown", "detailed_data": {}
-            }
+    def _insert_archive_snapshot(self, user_id: int, session_name: str, stats: Dict[str, Any]) -> int:
+        """아카이브 레코드 생성 (영수증/여권 상세 데이터를 jsonb_agg로 서버에서 생성, 커밋은 호출한 쪽에서 수행)"""
+        duty_free_type = stats["duty_free_type"]
+        
+        if duty_free_type == "shilla":
+            receipts_sql = """
+            SELECT jsonb_agg(jsonb_build_object(
+                       'receipt_id', sr.id,
+                       'receipt_number', sr.receipt_number,
+                       'receipt_passport', sr.passport_number,
+                       'excel_name', se.name,
+                       'excel_passport', se.passport_number,
+                       'matched', se."receiptNumber" IS NOT NULL
+                   ) ORDER BY sr.receipt_number)
+            FROM shilla_receipts sr
+            LEFT JOIN shilla_excel_data se ON se.user_id = sr.user_id AND se."receiptNumber" = sr.receipt_number
+            WHERE sr.user_id = :user_id
+            """
+        else:
+            receipts_sql = """
+            SELECT jsonb_agg(jsonb_build_object(
+                       'receipt_id', r.id,
+                       'receipt_number', r.receipt_number,
+                       'receipt_passport', '',
+                       'excel_name', rml.excel_name,
+                       'excel_passport', rml.passport_number,
+                       'matched', COALESCE(rml.is_matched, false)
+                   ) ORDER BY r.receipt_number)
+            FROM receipts r
+            LEFT JOIN receipt_match_log rml ON r.receipt_number = rml.receipt_number AND rml.user_id = r.user_id
+            WHERE r.user_id = :user_id
+            """
+        
+        passports_sql = """
+        SELECT jsonb_agg(jsonb_build_object(
+                   'passport_id', id,
+                   'name', name,
+                   'passport_number', passport_number,
+                   'birthday', birthday,
+                   'is_matched', is_matched
+               ) ORDER BY name)
+        FROM passports
+        WHERE user_id = :user_id
+        """
+        
+        archive_sql = text(f"""
+        INSERT INTO processing_archives (
+            user_id, session_name,
+            total_receipts, matched_receipts, total_passports, matched_passports,
+            duty_free_type, archive_data
+        )
+        SELECT :user_id, :session_name,
+               :total_receipts, :matched_receipts, :total_passports, :matched_passports,
+               :duty_free_type,
+               jsonb_build_object(
+                   'receipts', COALESCE(({receipts_sql}), '[]'::jsonb),
+                   'passports', COALESCE(({passports_sql}), '[]'::jsonb),
+                   'archived_at', CAST(:archived_at AS text),
+                   'duty_free_type', CAST(:duty_free_type AS text)
+               )
+        RETURNING id
+        """)
+        
+        return self.db.execute(archive_sql, {
+            "user_id": user_id,
+            "session_name": session_name,
+            "total_receipts": stats["total_receipts"],
+            "matched_receipts": stats["matched_receipts"],
+            "total_passports": stats["total_passports"],
+            "matched_passports": stats["matched_passports"],
+            "duty_free_type": duty_free_type,
+            "archived_at": datetime.now().isoformat()
+        }).scalar_one()
     
     def _save_detailed_matching_history(self, user_id: int, archive_id: int, duty_free_type: str) -> int:
-        """상세 매칭 이력 저장 (기존 로직 보존)"""
-        try:
-            print(f"상세 이력 저장 시작 (타입: {duty_free_type})")
-            
-            if duty_free_type == "shilla":
-                history_sql = text("""
-                SELECT DISTINCT
-                    COALESCE(p.name, se.name) as customer_name,
-                    COALESCE(sr.passport_number, se.passport_number) as passport_number,
-                    sr.receipt_number,
-                    se.name as excel_name,
-                    p.name as passport_name,
-                    p.birthday,
-                    CASE WHEN se."receiptNumber" IS NOT NULL THEN 'matched' ELSE 'unmatched' END as match_status
-                FROM shilla_receipts sr
-                LEFT JOIN shilla_excel_data se ON se."receiptNumber"::text = sr.receipt_number
-                LEFT JOIN passports p ON COALESCE(sr.passport_number, se.passport_number) = p.passport_number 
-                                       AND p.user_id = :user_id
-                WHERE sr.user_id = :user_id
-                AND se."receiptNumber" IS NOT NULL
-                ORDER BY customer_name
-                """)
-            else:
-                history_sql = text("""
-                SELECT DISTINCT
-                    COALESCE(p.name, rml.excel_name) as customer_name,
-                    rml.passport_number,
-                    rml.receipt_number,
-                    rml.excel_name,
-                    p.name as passport_name,
-                    p.birthday,
-                    CASE WHEN rml.is_matched = TRUE THEN 'matched' ELSE 'unmatched' END as match_status
-                FROM receipt_match_log rml
-                LEFT JOIN passports p ON rml.passport_number = p.passport_number AND p.user_id = :user_id
-                WHERE rml.user_id = :user_id
-                AND rml.is_matched = TRUE
-                ORDER BY customer_name
-                """)
-            
-            history_results = self.db.execute(history_sql, {"user_id": user_id}).fetchall()
-            
-            # 고객별로 그룹화하여 저장
-            customer_groups = {}
-            for row in history_results:
-                customer_name = row[0] or '알 수 없음'
-                passport_number = row[1]
-                receipt_number = row[2]
-                excel_name = row[3]
-                passport_name = row[4]
-                birthday = row[5]
-                match_status = row[6]
-                
-                group_key = f"{customer_name}_{passport_number}" if passport_number else f"{customer_name}_no_passport"
-                
-                if group_key not in customer_groups:
-                    customer_groups[group_key] = {
-                        'customer_name': customer_name,
-                        'passport_number': passport_number,
-                        'receipt_numbers': [],
-                        'excel_data': {
-                            'excel_name': excel_name,
-                            'passport_name': passport_name,
-                            'birthday': birthday.isoformat() if birthday else None,
-                            'duty_free_type': duty_free_type
-                        },
-                        'match_status': match_status
-                    }
-                
-                customer_groups[group_key]['receipt_numbers'].append(receipt_number)
-            
-            # 각 그룹별로 MatchingHistory 레코드 생성
-            saved_count = 0
-            for group_data in customer_groups.values():
-                history = self.ocr_repo.create_matching_history(
-                    user_id=user_id,
-                    archive_id=archive_id,
-                    customer_name=group_data['customer_name'],
-                    passport_number=group_data['passport_number'],
-                    receipt_numbers=json.dumps(group_data['receipt_numbers']),
-                    excel_data=group_data['excel_data'],
-                    match_status=group_data['match_status']
-                )
-                saved_count += 1
-                print(f"이력 저장: {group_data['customer_name']} - {len(group_data['receipt_numbers'])}건")
-            
-            return saved_count
-                
-        except Exception as e:
-            print(f"상세 이력 저장 오류: {e}")
-            import traceback
-            traceback.print_exc()
-            return 0
+        """상세 매칭 이력 저장 (고객+여권번호별 1행, 단일 INSERT ... SELECT ... GROUP BY, 커밋은 호출한 쪽에서 수행)"""
+        print(f"상세 이력 저장 시작 (타입: {duty_free_type})")
+        
+        if duty_free_type == "shilla":
+            rows_sql = """
+            SELECT
+                COALESCE(p.name, se.name) as customer_name,
+                COALESCE(sr.passport_number, se.passport_number) as passport_number,
+                sr.receipt_number,
+                se.name as excel_name,
+                p.name as passport_name,
+                p.birthday,
+                'matched' as match_status
+            FROM shilla_receipts sr
+            JOIN shilla_excel_data se ON se.user_id = sr.user_id AND se."receiptNumber" = sr.receipt_number
+            LEFT JOIN passports p ON COALESCE(sr.passport_number, se.passport_number) = p.passport_number 
+                                   AND p.user_id = :user_id
+            WHERE sr.user_id = :user_id
+            """
+        else:
+            rows_sql = """
+            SELECT
+                COALESCE(p.name, rml.excel_name) as customer_name,
+                rml.passport_number,
+                rml.receipt_number,
+                rml.excel_name,
+                p.name as passport_name,
+                p.birthday,
+                'matched' as match_status
+            FROM receipt_match_log rml
+            LEFT JOIN passports p ON rml.passport_number = p.passport_number AND p.user_id = :user_id
+            WHERE rml.user_id = :user_id
+            AND rml.is_matched = TRUE
+            """
+        
+        history_sql = text(f"""
+        WITH history AS (
+            INSERT INTO matching_history (
+                user_id, archive_id, customer_name, passport_number, receipt_numbers, excel_data, match_status
+            )
+            SELECT :user_id,
+                   :archive_id,
+                   h.customer_name,
+                   h.passport_number,
+                   jsonb_agg(DISTINCT h.receipt_number ORDER BY h.receipt_number)::text,
+                   jsonb_build_object(
+                       'excel_name', MIN(h.excel_name),
+                       'passport_name', MIN(h.passport_name),
+                       'birthday', MIN(h.birthday),
+                       'duty_free_type', CAST(:duty_free_type AS text)
+                   ),
+                   MIN(h.match_status)
+            FROM (
+                SELECT COALESCE(src.customer_name, '알 수 없음') as customer_name,
+                       src.passport_number, src.receipt_number, src.excel_name,
+                       src.passport_name, src.birthday, src.match_status
+                FROM ({rows_sql}) src
+            ) h
+            GROUP BY h.customer_name, h.passport_number
+            RETURNING id, receipt_numbers
+        ), history_receipts AS (
+            -- 영수증 번호 검색용 자식 테이블에도 같은 문장에서 저장
+            INSERT INTO matching_history_receipts (history_id, user_id, receipt_number)
+            SELECT history.id, :user_id, r.receipt_number
+            FROM history
+            CROSS JOIN LATERAL jsonb_array_elements_text(history.receipt_numbers::jsonb) AS r(receipt_number)
+            WHERE r.receipt_number IS NOT NULL
+        )
+        SELECT COUNT(*) FROM history
+        """)
+        
+        return self.db.execute(history_sql, {
+            "user_id": user_id,
+            "archive_id": archive_id,
+            "duty_free_type": duty_free_type
+        }).scalar_one()
+    
+    def _save_archived_receipts(self, user_id: int, archive_id: int, duty_free_type: str) -> int:
+        """세션 영수증 번호를 archived_receipts에 저장 (커밋은 호출한 쪽에서 수행)
+        
+        이미 있는 번호는 처음 아카이브된 세션을 유지하고, 당시 미매칭이었다가 이번에 매칭된 경우만 갱신합니다.
+        """
+        receipt_table = "shilla_receipts" if duty_free_type == "shilla" else "receipts"
+        archived_sql = text(f"""
+        INSERT INTO archived_receipts (user_id, duty_free_type, receipt_number, archive_id, was_matched)
+        SELECT DISTINCT ON (r.receipt_number)
+               :user_id, :duty_free_type, r.receipt_number, :archive_id, COALESCE(rml.is_matched, FALSE)
+        FROM {receipt_table} r
+        LEFT JOIN receipt_match_log rml ON rml.user_id = r.user_id AND rml.receipt_number = r.receipt_number
+        WHERE r.user_id = :user_id
+        AND r.receipt_number IS NOT NULL
+        AND r.receipt_number != ''
+        ORDER BY r.receipt_number
+        ON CONFLICT (user_id, duty_free_type, receipt_number) DO UPDATE
+        SET archive_id = EXCLUDED.archive_id,
+            was_matched = TRUE,
+            archived_at = now()
+        WHERE archived_receipts.was_matched = FALSE AND EXCLUDED.was_matched = TRUE
+        """)
+        
+        return self.db.execute(archived_sql, {
+            "user_id": user_id,
+            "archive_id": archive_id,
+            "duty_free_type": duty_free_type
+        }).rowcount
     
-    def get_user_archives(self, user_id: int, limit: int = 50) -> List[Dict[str, Any]]:
-        """사용자 아카이브 목록 조회 (기존 로직 보존)"""
+    def get_user_archives(self, user_id: int, limit: int = 50, cursor: Optional[str] = None,
+                          include_total: bool = False) -> Dict[str, Any]:
+        """사용자 아카이브 목록 조회 (archive_date, id 기준 키셋 페이지네이션)
+        
+        잘못된 커서는 ValueError를 발생시킵니다.
+        """
+        limit = clamp_page_size(limit)
+        after = decode_cursor(cursor)
         try:
-            archives_sql = text("""
+            params = {"user_id": user_id, "limit": limit + 1}
+            keyset_sql = ""
+            if after:
+                keyset_sql = "AND (archive_date, id) < (:cursor_date, :cursor_id)"
+                params["cursor_date"], params["cursor_id"] = after
+            
+            archives_sql = text(f"""
             SELECT 
                 id, session_name, archive_date,
                 total_receipts, matched_receipts,
@@ -290,17 +277,18 @@ class ArchiveService:
                 duty_free_type, notes
             FROM processing_archives
             WHERE user_id = :user_id
-            ORDER BY archive_date DESC
+            {keyset_sql}
+            ORDER BY archive_date DESC, id DESC
             LIMIT :limit
             """)
             
-            results = self.db.execute(archives_sql, {
-                "user_id": user_id, 
-                "limit": limit
-            }).fetchall()
+            results = self.db.execute(archives_sql, params).fetchall()
+            
+            # limit + 1 행을 읽어 다음 페이지 존재 여부 확인
+            next_cursor = encode_cursor(results[limit - 1][2], results[limit - 1][0]) if len(results) > limit else None
             
             archives = []
-            for row in results:
+            for row in results[:limit]:
                 completion_rate = round((row[4] / row[3] * 100) if row[3] > 0 else 0, 1)
                 archives.append({
                     "id": row[0],
@@ -315,49 +303,68 @@ class ArchiveService:
                     "completion_rate": completion_rate
                 })
             
+            # 사용자별 아카이브 수는 인덱스로 바로 계산 가능하므로 정확한 값 사용
+            total_estimate = None
+            if include_total:
+                total_estimate = self.db.execute(text(
+                    "SELECT COUNT(*) FROM processing_archives WHERE user_id = :user_id"
+                ), {"user_id": user_id}).scalar_one()
+            
             print(f"사용자 {user_id}의 아카이브 조회: {len(archives)}개")
-            return archives
+            return {"archives": archives, "next_cursor": next_cursor, "total_estimate": total_estimate}
             
         except Exception as e:
             print(f"아카이브 조회 오류: {e}")
             import traceback
             traceback.print_exc()
-            return []
+            return {"archives": [], "next_cursor": None, "total_estimate": None}
     
-    def search_matching_history(self, user_id: int, query: str, search_type: str = "all") -> List[Dict[str, Any]]:
-        """매칭 이력 검색 (기존 로직 보존)"""
+    def search_matching_history(self, user_id: int, query: str, search_type: str = "all", limit: int = 100,
+                                cursor: Optional[str] = None, include_total: bool = False) -> Dict[str, Any]:
+        """매칭 이력 검색 (검색어 형태에 맞는 인덱스 경로 사용, created_at, id 기준 키셋 페이지네이션)
+        
+        - 영수증 번호: matching_history_receipts B-tree (정확 일치/접두사)
+        - 고객명/여권번호: pg_trgm GIN 인덱스 (부분 문자열)
+        
+        전체 건수는 실행 계획의 예상 행 수입니다. 잘못된 커서는 ValueError를 발생시킵니다.
+        """
+        limit = clamp_page_size(limit)
+        after = decode_cursor(cursor)
+        empty = {"results": [], "next_cursor": None, "total_estimate": 0 if include_total else None}
         try:
-            base_sql = """
-            SELECT 
-                mh.id, mh.customer_name, mh.passport_number,
-                mh.receipt_numbers, mh.excel_data, mh.match_status,
-                mh.created_at, pa.session_name, pa.archive_date
+            filter_sql = """
             FROM matching_history mh
             LEFT JOIN processing_archives pa ON mh.archive_id = pa.id
             WHERE mh.user_id = :user_id
             """
             
-            params = {"user_id": user_id, "query": f"%{query}%"}
+            query = query.strip()
+            params = {"user_id": user_id}
+            conditions = self._history_search_conditions(query, search_type, params)
+            if not conditions:
+                return empty
+            filter_sql += " AND (" + " OR ".join(conditions) + ")"
             
-            if search_type == "customer":
-                base_sql += " AND mh.customer_name ILIKE :query"
-            elif search_type == "passport":
-                base_sql += " AND mh.passport_number ILIKE :query"
-            elif search_type == "receipt":
-                base_sql += " AND mh.receipt_numbers ILIKE :query"
-            else:  # search_type == "all"
-                base_sql += """ AND (
-                    mh.customer_name ILIKE :query OR 
-                    mh.passport_number ILIKE :query OR 
-                    mh.receipt_numbers ILIKE :query
-                )"""
+            total_estimate = self._estimate_rows(f"SELECT mh.id {filter_sql}", params) if include_total else None
             
-            base_sql += " ORDER BY mh.created_at DESC LIMIT 100"
+            base_sql = """
+            SELECT 
+                mh.id, mh.customer_name, mh.passport_number,
+                mh.receipt_numbers, mh.excel_data, mh.match_status,
+                mh.created_at, pa.session_name, pa.archive_date
+            """ + filter_sql
+            if after:
+                base_sql += " AND (mh.created_at, mh.id) < (:cursor_created_at, :cursor_id)"
+                params["cursor_created_at"], params["cursor_id"] = after
+            
+            base_sql += " ORDER BY mh.created_at DESC, mh.id DESC LIMIT :limit"
+            params["limit"] = limit + 1
             
             results = self.db.execute(text(base_sql), params).fetchall()
+            next_cursor = encode_cursor(results[limit - 1][6], results[limit - 1][0]) if len(results) > limit else None
             
             search_results = []
-            for row in results:
+            for row in results[:limit]:
                 search_results.append({
                     "id": row[0],
                     "customer_name": row[1],
@@ -370,8 +377,50 @@ class ArchiveService:
                     "archive_date": row[8]
                 })
             
-            return search_results
+            return {"results": search_results, "next_cursor": next_cursor, "total_estimate": total_estimate}
             
         except Exception as e:
             print(f"이력 검색 오류: {e}")
-            return []
\ No newline at end of file
+            return empty
+    
+    def _estimate_rows(self, sql: str, params: Dict[str, Any]) -> int:
+        """실행 계획의 예상 행 수 (COUNT(*) 전체 스캔 없이 대략적인 검색 결과 수)"""
+        plan = self.db.execute(text(f"EXPLAIN (FORMAT JSON) {sql}"), params).scalar()
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return int(plan[0]["Plan"]["Plan Rows"])
+    
+    @staticmethod
+    def _history_search_conditions(query: str, search_type: str, params: Dict[str, Any]) -> List[str]:
+        """검색 유형과 검색어 형태에 맞는 WHERE 조건 목록 (params에 바인드 값 추가)"""
+        escaped = query.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        receipt_prefix = re.sub(r"[^0-9]", "", query)
+        # 숫자/구분자로만 된 검색어만 영수증 번호로 취급
+        is_receipt_query = bool(receipt_prefix) and re.fullmatch(r"[0-9\s-]+", query) is not None
+        
+        conditions = []
+        if search_type in ("receipt", "all") and is_receipt_query:
+            params["receipt_prefix"] = f"{receipt_prefix}%"
+            receipt_ids = """
+                SELECT hr.history_id FROM matching_history_receipts hr
+                WHERE hr.user_id = :user_id AND hr.receipt_number LIKE :receipt_prefix"""
+            if search_type == "all":
+                # 영수증 IN (...) OR 여권번호 ILIKE는 해시 SubPlan + 사용자 전체 행 필터가 되므로
+                # 두 조건을 각각 인덱스로 찾은 ID의 UNION으로 후보를 만듦
+                # (EXPLAIN: HashAggregate ← ix_matching_history_receipts_user_receipt_number Index Scan
+                #  + ix_matching_history_passport_number_trgm Bitmap Index Scan, 이후 mh.id 조인)
+                params["passport_query"] = f"%{escaped}%"
+                return [f"""mh.id IN ({receipt_ids}
+                UNION
+                SELECT ph.id FROM matching_history ph
+                WHERE ph.user_id = :user_id AND ph.passport_number ILIKE :passport_query
+            )"""]
+            conditions.append(f"""mh.id IN ({receipt_ids}
+            )""")
+        if query and (search_type == "customer" or (search_type == "all" and not is_receipt_query)):
+            params["name_query"] = f"%{escaped}%"
+            conditions.append("mh.customer_name ILIKE :name_query")
+        if search_type in ("passport", "all") and query:
+            params["passport_query"] = f"%{escaped}%"
+            conditions.append("mh.passport_number ILIKE :passport_query")
+        return conditions
\ No newline at end of file
@@ -0,0 +1,246 @@
+# app/services/incremental_matching_service.py
+from sqlalchemy.orm import Session
+from sqlalchemy import text
+from typing import List, Optional, Tuple
+
+from ..repositories.ocr_repository import OcrRepository
+
+class IncrementalMatchingService:
+    """증분 매칭 서비스 (영향받은 영수증 번호만 다시 매칭하여 receipt_match_log 갱신)
+    
+    OCR 처리 완료 시 전체 매칭과 엑셀 업로드/영수증 수정 시 부분 매칭이 같은 SQL을 사용합니다.
+    receipt_numbers가 None이면 사용자 영수증 전체, 아니면 해당 번호만 매칭합니다.
+    매칭 상태가 바뀐 만큼만 세션 통계 카운터를 증감하며, 커밋은 호출한 쪽 트랜잭션에서 수행합니다.
+    """
+    
+    def __init__(self, db: Session):
+        self.db = db
+        self.ocr_repo = OcrRepository(db)
+    
+    def match(self, user_id: int, duty_free_type: str, receipt_numbers: Optional[List[str]] = None) -> Tuple[int, int]:
+        """영수증 매칭 실행 후 (매칭 수, 갱신한 로그 수) 반환"""
+        # 매칭 시작 시점의 엑셀 배치만 사용 (진행 중인 업로드와 섞이지 않도록)
+        batch_ids = self.ocr_repo.get_excel_batch_ids(user_id)
+        
+        if duty_free_type == "shilla":
+            matched_count, total_count, matched_delta = self._match_shilla(user_id, batch_ids, receipt_numbers)
+        else:
+            matched_count, total_count, matched_delta = self._match_lotte(user_id, batch_ids, receipt_numbers)
+        
+        self.ocr_repo.increment_statistics(user_id, matched_receipts=matched_delta)
+        return matched_count, total_count
+    
+    def match_excel_batch(self, user_id: int, duty_free_type: str, batch_id: int) -> int:
+        """새 엑셀 배치에 들어온 미매칭 영수증/여권만 매칭 (매칭된 영수증 수 반환)"""
+        pending = self.ocr_repo.get_pending_receipt_numbers(user_id, duty_free_type, batch_id)
+        matched_count = 0
+        if pending:
+            matched_count, _ = self.match(user_id, duty_free_type, pending)
+        
+        if duty_free_type == "lotte":
+            # 롯데 여권은 이름으로 연결 (신라 여권은 영수증 매칭 시 여권번호로 연결됨)
+            passport_updated = self.db.execute(text("""
+            UPDATE passports p
+            SET is_matched = TRUE
+            WHERE p.user_id = :user_id
+            AND p.is_matched = FALSE
+            AND EXISTS (
+                SELECT 1 FROM lotte_excel_data e
+                WHERE e.user_id = :user_id AND e.batch_id = :batch_id AND e.name_key = p.name_key
+            )
+            """), {"user_id": user_id, "batch_id": batch_id}).rowcount
+            self.ocr_repo.increment_statistics(user_id, matched_passports=passport_updated)
+            print(f"엑셀 배치 {batch_id} 여권 매칭: {passport_updated}개")
+        
+        print(f"엑셀 배치 {batch_id} 증분 매칭: 미매칭 {len(pending)}개 중 {matched_count}개 매칭")
+        return matched_count
+    
+    def rematch_receipt(self, user_id: int, duty_free_type: str,
+                        old_receipt_number: Optional[str], new_receipt_number: str) -> bool:
+        """수정된 영수증 번호 1개만 다시 매칭 (이전 번호의 로그는 해당 영수증이 없으면 삭제)"""
+        if old_receipt_number and old_receipt_number != new_receipt_number:
+            # match의 증감은 새 번호의 기존 매칭 상태 기준이므로, 수정한 영수증 1건은
+            # 이전 번호의 매칭 상태에서 옮겨 온 것으로 보정
+            states = self.ocr_repo.get_match_states(user_id, [old_receipt_number, new_receipt_number])
+            self.ocr_repo.increment_statistics(
+                user_id,
+                matched_receipts=int(states.get(new_receipt_number, False)) - int(states.get(old_receipt_number, False))
+            )
+            self.ocr_repo.delete_orphan_match_log(user_id, duty_free_type, old_receipt_number)
+        
+        # 수정된 번호가 이전 세션에서 아카이브된 번호인지 다시 표시
+        self.ocr_repo.refresh_archived_duplicate_flags(user_id, duty_free_type, [new_receipt_number])
+        
+        matched_count, _ = self.match(user_id, duty_free_type, [new_receipt_number])
+        return matched_count > 0
+    
+    def match_passport_number(self, user_id: int, passport_number: str) -> int:
+        """여권번호가 수정된 신라 여권과 연결된 영수증만 다시 매칭 (매칭된 영수증 수 반환)"""
+        receipt_numbers = self.db.execute(text("""
+        SELECT receipt_number FROM shilla_receipts
+        WHERE user_id = :user_id AND passport_number = :passport_number
+        UNION
+        SELECT "receiptNumber" FROM shilla_excel_data
+        WHERE user_id = :user_id AND passport_number = :passport_number
+        """), {"user_id": user_id, "passport_number": passport_number}).scalars().all()
+        if not receipt_numbers:
+            return 0
+        
+        matched_count, _ = self.match(user_id, "shilla", receipt_numbers)
+        return matched_count
+    
+    @staticmethod
+    def _receipt_filter(receipt_numbers: Optional[List[str]], column: str) -> str:
+        return f"AND {column} = ANY(:receipt_numbers)" if receipt_numbers is not None else ""
+    
+    @classmethod
+    def _previous_states_sql(cls, receipt_numbers: Optional[List[str]]) -> str:
+        """갱신 전 매칭 로그 상태 CTE (같은 문장의 INSERT 결과가 보이지 않으므로 이전 값이 조회됨)"""
+        return f"""
+        previous AS (
+            SELECT receipt_number, is_matched FROM receipt_match_log
+            WHERE user_id = :user_id
+            {cls._receipt_filter(receipt_numbers, "receipt_number")}
+        )"""
+    
+    @staticmethod
+    def _upsert_summary_sql(receipt_table: str) -> str:
+        """(매칭 수, 갱신한 로그 수, 매칭 영수증 증감) 집계
+        
+        매칭 상태가 바뀐 번호만 해당 번호의 영수증 수만큼 +/- 합니다.
+        """
+        return f"""
+        SELECT COUNT(*) FILTER (WHERE u.is_matched) AS matched_count,
+               COUNT(*) AS total_count,
+               COALESCE(SUM(
+                   CASE WHEN u.is_matched IS DISTINCT FROM COALESCE(p.is_matched, FALSE) THEN
+                       (CASE WHEN u.is_matched THEN 1 ELSE -1 END) * (
+                           SELECT COUNT(*) FROM {receipt_table} r
+                           WHERE r.user_id = :user_id AND r.receipt_number = u.receipt_number
+                       )
+                   ELSE 0 END
+               ), 0)::int AS matched_delta
+        FROM upserted u
+        LEFT JOIN previous p ON p.receipt_number = u.receipt_number
+        """
+    
+    def _match_lotte(self, user_id: int, batch_ids: List[int],
+                     receipt_numbers: Optional[List[str]]) -> Tuple[int, int, int]:
+        """롯데 매칭 (기존 matchingResult 로직, 단일 INSERT ... SELECT ... ON CONFLICT)"""
+        sql = text(f"""
+        WITH {self._previous_states_sql(receipt_numbers)},
+        upserted AS (
+            INSERT INTO receipt_match_log (user_id, receipt_number, is_matched)
+            SELECT DISTINCT :user_id,
+                   r.receipt_number,
+                   CASE
+                       WHEN e."receiptNumber" IS NOT NULL THEN TRUE
+                       ELSE FALSE
+                   END AS is_matched
+            FROM receipts r
+            LEFT JOIN lotte_excel_data e
+              ON e.user_id = :user_id
+             AND e.batch_id = ANY(:batch_ids)
+             AND r.receipt_number = e."receiptNumber"
+            WHERE r.user_id = :user_id
+            {self._receipt_filter(receipt_numbers, "r.receipt_number")}
+            ON CONFLICT (user_id, receipt_number) DO UPDATE
+            SET is_matched = EXCLUDED.is_matched,
+                checked_at = now()
+            RETURNING receipt_number, is_matched
+        )
+        {self._upsert_summary_sql("receipts")}
+        """)
+        
+        matched_count, total_count, matched_delta = self.db.execute(sql, {
+            "user_id": user_id, "batch_ids": batch_ids, "receipt_numbers": receipt_numbers
+        }).one()
+        return matched_count, total_count, matched_delta
+    
+    def _match_shilla(self, user_id: int, batch_ids: List[int],
+                      receipt_numbers: Optional[List[str]]) -> Tuple[int, int, int]:
+        """신라 매칭 (기존 shilla_matching_result 로직, 세 단계가 같은 배치 스냅샷을 사용)"""
+        params = {"user_id": user_id, "batch_ids": batch_ids, "receipt_numbers": receipt_numbers}
+        
+        # 1단계: 영수증 번호 매칭 및 여권번호 업데이트
+        sql_update_passport = text(f"""
+        UPDATE shilla_excel_data se
+        SET passport_number = sr.passport_number
+        FROM shilla_receipts sr
+        WHERE se.user_id = :user_id
+        AND se.batch_id = ANY(:batch_ids)
+        AND se."receiptNumber" = sr.receipt_number
+        AND sr.user_id = :user_id
+        {self._receipt_filter(receipt_numbers, "sr.receipt_number")}
+        AND sr.passport_number IS NOT NULL
+        AND sr.passport_number != ''
+        AND (se.passport_number IS NULL OR se.passport_number = '' OR se.passport_number != sr.passport_number)
+        """)
+        updated_rows = self.db.execute(sql_update_passport, params).rowcount
+        print(f"신라 엑셀 데이터에 여권번호 업데이트: {updated_rows}행")
+        
+        # 2단계: 여권 매칭 상태 업데이트
+        sql_update_passport_status = text(f"""
+        UPDATE passports p
+        SET is_matched = TRUE
+        FROM shilla_excel_data se
+        WHERE p.passport_number = se.passport_number
+        AND p.user_id = :user_id
+        AND se.user_id = :user_id
+        AND se.batch_id = ANY(:batch_ids)
+        {self._receipt_filter(receipt_numbers, 'se."receiptNumber"')}
+        AND se.passport_number IS NOT NULL
+        AND se.passport_number != ''
+        AND p.is_matched = FALSE
+        """)
+        passport_updated = self.db.execute(sql_update_passport_status, params).rowcount
+        self.ocr_repo.increment_statistics(user_id, matched_passports=passport_updated)
+        print(f"자동 여권 매칭 상태 업데이트: {passport_updated}개")
+        
+        # 3단계: 매칭 결과 로그 저장 (영수증 번호당 1행, 여권이 여러 개면 먼저 등록된 여권)
+        sql_matching = text(f"""
+        WITH {self._previous_states_sql(receipt_numbers)},
+        upserted AS (
+            INSERT INTO receipt_match_log (user_id, receipt_number, is_matched, excel_name, passport_number, birthday)
+            SELECT :user_id,
+                   m.receipt_number,
+                   m.is_matched,
+                   CASE WHEN m.is_matched THEN m.excel_name END,
+                   COALESCE(NULLIF(m.receipt_passport_number, ''), m.excel_passport_number),
+                   m.passport_birthday
+            FROM (
+                SELECT DISTINCT ON (sr.receipt_number)
+                    sr.receipt_number,
+                    CASE
+                        WHEN se."receiptNumber" IS NOT NULL THEN TRUE
+                        ELSE FALSE
+                    END AS is_matched,
+                    se.name as excel_name,
+                    sr.passport_number as receipt_passport_number,
+                    se.passport_number as excel_passport_number,
+                    p.birthday as passport_birthday
+                FROM shilla_receipts sr
+                LEFT JOIN shilla_excel_data se
+                  ON se.user_id = :user_id
+                 AND se.batch_id = ANY(:batch_ids)
+                 AND se."receiptNumber" = sr.receipt_number
+                LEFT JOIN passports p
+                  ON (sr.passport_number = p.passport_number OR se.passport_number = p.passport_number)
+                  AND p.user_id = :user_id
+                WHERE sr.user_id = :user_id
+                {self._receipt_filter(receipt_numbers, "sr.receipt_number")}
+                ORDER BY sr.receipt_number, p.id
+            ) m
+            ON CONFLICT (user_id, receipt_number) DO UPDATE
+            SET is_matched = EXCLUDED.is_matched,
+                excel_name = EXCLUDED.excel_name,
+                passport_number = EXCLUDED.passport_number,
+                birthday = EXCLUDED.birthday,
+                checked_at = now()
+            RETURNING receipt_number, is_matched
+        )
+        {self._upsert_summary_sql("shilla_receipts")}
+        """)
+        
+        matched_count, total_count, matched_delta = self.db.execute(sql_matching, params).one()
+        return matched_count, total_count, matched_delta
@@ -0,0 +1,112 @@
+# app/services/job_service.py
+import os
+from datetime import datetime
+from typing import List, Optional
+from sqlalchemy.orm import Session
+
+from ..core.config import settings
+from ..core.database import SessionLocal
+from ..repositories.ocr_repository import OcrRepository
+from ..models.ocr_model import ProcessingJob
+from ..schemas.ocr_schema import DutyFreeType, JobResponse
+
+class JobService:
+    """이미지 처리 백그라운드 작업 관리 서비스"""
+    
+    def __init__(self, db: Session):
+        self.db = db
+        self.ocr_repo = OcrRepository(db)
+    
+    def create_image_job(self, user_id: int, duty_free_type: DutyFreeType) -> ProcessingJob:
+        """이미지 처리 작업 등록 (pending 상태, 처리 세션 시작)"""
+        self.ocr_repo.start_session(user_id, duty_free_type.value)
+        return self.ocr_repo.create_job(user_id, duty_free_type.value)
+    
+    def get_job(self, job_id: str, user_id: int) -> Optional[JobResponse]:
+        """사용자의 작업 상태 조회 (읽기 전용, 중단된 작업 정리는 주기 작업에서 수행)"""
+        job = self.ocr_repo.get_job(job_id, user_id)
+        return self.to_response(job) if job else None
+    
+    def get_user_jobs(self, user_id: int, limit: int = 20) -> List[JobResponse]:
+        """사용자의 최근 작업 목록 조회 (읽기 전용)"""
+        return [self.to_response(job) for job in self.ocr_repo.get_user_jobs(user_id, limit)]
+    
+    def fail_stale_jobs(self) -> int:
+        """서버 재시작 등으로 갱신이 멈춘 pending/running 작업을 실패 처리 (실패 처리한 작업 수 반환)"""
+        stale_jobs = self.ocr_repo.fail_stale_jobs(settings.JOB_STALE_TIMEOUT_SECONDS)
+        for job_id, user_id in stale_jobs:
+            print(f"중단된 작업 실패 처리: {job_id} (사용자 {user_id})")
+            self._close_empty_session(self.ocr_repo, user_id)
+        return len(stale_jobs)
+    
+    @staticmethod
+    def sweep_stale_jobs() -> int:
+        """별도 DB 세션으로 중단된 작업 정리 (서버 시작 시와 JOB_STALE_SWEEP_INTERVAL_SECONDS마다 실행)"""
+        db = SessionLocal()
+        try:
+            return JobService(db).fail_stale_jobs()
+        finally:
+            db.close()
+    
+    @staticmethod
+    def _close_empty_session(ocr_repo: OcrRepository, user_id: int) -> None:
+        """실패한 작업이 데이터를 하나도 남기지 않았으면 처리 세션 종료 (남은 데이터가 있으면 세션 완료 API로 정리하도록 유지)"""
+        stats = ocr_repo.get_user_statistics(user_id)
+        if stats["total_receipts"] == 0 and stats["total_passports"] == 0:
+            ocr_repo.complete_active_session(user_id)
+            ocr_repo.db.commit()
+    
+    @staticmethod
+    def to_response(job: ProcessingJob) -> JobResponse:
+        """작업 모델을 응답 스키마로 변환"""
+        return JobResponse(
+            job_id=job.id,
+            status=job.status,
+            duty_free_type=job.duty_free_type,
+            done=job.done or 0,
+            total=job.total or 0,
+            result=job.result,
+            error=job.error,
+            created_at=job.created_at,
+            started_at=job.started_at,
+            finished_at=job.finished_at
+        )
+    
+    @staticmethod
+    def run_image_job(job_id: str, zip_file_path: str, user_id: int, duty_free_type: DutyFreeType):
+        """백그라운드에서 이미지 처리 작업 실행
+        
+        요청 세션과 분리된 별도 DB 세션을 사용하며, 작업이 끝나면 업로드된 ZIP 파일을 삭제합니다.
+        """
+        from .ocr_service import OcrService
+        
+        db = SessionLocal()
+        ocr_repo = OcrRepository(db)
+        
+        try:
+            ocr_repo.update_job(job_id, status="running", started_at=datetime.now())
+            
+            ocr_service = OcrService(db)
+            result = ocr_service.process_images_from_zip(zip_file_path, user_id, duty_free_type, job_id=job_id)
+            
+            ocr_repo.update_job(
+                job_id,
+                status="completed",
+                result=result.dict(),
+                finished_at=datetime.now()
+            )
+            print(f"작업 완료: {job_id}")
+        
+        except Exception as e:
+            print(f"작업 실패: {job_id} - {e}")
+            import traceback
+            traceback.print_exc()
+            db.rollback()
+            ocr_repo.update_job(job_id, status="failed", error=str(e), finished_at=datetime.now())
+            JobService._close_empty_session(ocr_repo, user_id)
+        
+        finally:
+            db.close()
+            # 임시 ZIP 파일 삭제
+            if os.path.exists(zip_file_path):
+                os.remove(zip_file_path)
@@ -4,9 +4,11 @@ from sqlalchemy import text
 from typing import List, Dict, Any, Optional
 from datetime import datetime
 
+from ..core.config import settings
 from ..repositories.ocr_repository import OcrRepository
+from .incremental_matching_service import IncrementalMatchingService
 from ..schemas.ocr_schema import (
-    MatchingResults, CustomerMatchResult, ReceiptResponse, 
+    MatchingResults, CustomerMatchResult, ReceiptResponse, ReceiptSuggestion, PassportSuggestion,
     ReceiptUpdate, PassportUpdate, UserStatistics  # ← UserStatistics 추가
 )
 
@@ -16,18 +18,28 @@ class MatchingService:
     def __init__(self, db: Session):
         self.db = db
         self.ocr_repo = OcrRepository(db)
+        self.matcher = IncrementalMatchingService(db)
     
     # app/services/matching_service.py
 
     def get_user_matching_results(self, user_id: int) -> MatchingResults:
         """사용자의 매칭 결과 조회"""
         # 면세점 타입 자동 감지
-        duty_free_type = self._detect_duty_free_type(user_id)
+        duty_free_type = self.ocr_repo.get_user_duty_free_type(user_id)
+        
+        # 매칭과 같은 커밋된 엑셀 배치 스냅샷만 사용 (진행 중인 업로드 행 제외)
+        batch_ids = self.ocr_repo.get_excel_batch_ids(user_id)
         
         if duty_free_type == "shilla":
-            matched_customers, unmatched_receipts = self._get_shilla_results(user_id)
+            matched_customers, unmatched_receipts = self._get_shilla_results(user_id, batch_ids)
         else:
-            matched_customers, unmatched_receipts = self._get_lotte_results(user_id)
+            matched_customers, unmatched_receipts = self._get_lotte_results(user_id, batch_ids)
+        
+        # 미매칭 영수증에 엑셀 번호 보정 후보 추가
+        self._attach_receipt_suggestions(user_id, duty_free_type, unmatched_receipts)
+        
+        # 이전 세션에서 이미 아카이브된 영수증 표시 (중복 지급 방지)
+        self._attach_archived_duplicates(user_id, duty_free_type, matched_customers, unmatched_receipts)
         
         # 통계 계산
         stats_dict = self.ocr_repo.get_user_statistics(user_id)
@@ -45,20 +57,42 @@ class MatchingService:
             statistics=stats  # ← Dict 전달
     )
     
-    def _detect_duty_free_type(self, user_id: int) -> str:
-        """사용자의 면세점 타입 감지"""
-        try:
-            shilla_count_sql = text("SELECT COUNT(*) FROM shilla_receipts WHERE user_id = :user_id")
-            lotte_count_sql = text("SELECT COUNT(*) FROM receipts WHERE user_id = :user_id")
-            
-            shilla_count = self.db.execute(shilla_count_sql, {"user_id": user_id}).scalar() or 0
-            lotte_count = self.db.execute(lotte_count_sql, {"user_id": user_id}).scalar() or 0
-            
-            return "shilla" if shilla_count >= lotte_count else "lotte"
-        except Exception:
-            return "lotte"
+    def _attach_receipt_suggestions(self, user_id: int, duty_free_type: str,
+                                    unmatched_receipts: List[ReceiptResponse]) -> None:
+        """미매칭 영수증마다 자리 차이가 작은 엑셀 영수증 번호 후보 추가 (이미 매칭된 번호는 뒤로)"""
+        if not unmatched_receipts:
+            return
+        
+        index = self.ocr_repo.get_excel_receipt_index(user_id, duty_free_type)
+        if not len(index):
+            return
+        
+        claimed = {
+            receipt_number for _, receipt_number in self.ocr_repo.get_user_receipt_numbers(user_id, duty_free_type)
+            if receipt_number in index
+        }
+        for receipt in unmatched_receipts:
+            receipt.suggestions = [
+                ReceiptSuggestion(**candidate)
+                for candidate in index.suggest(receipt.receipt_number, claimed, limit=settings.RECEIPT_SUGGESTION_LIMIT)
+            ]
     
-    def _get_shilla_results(self, user_id: int) -> tuple:
+    def _attach_archived_duplicates(self, user_id: int, duty_free_type: str,
+                                    matched_customers: List[CustomerMatchResult],
+                                    unmatched_receipts: List[ReceiptResponse]) -> None:
+        """고객별/미매칭 영수증에 이전 세션 아카이브 중복 여부 표시"""
+        archived = set(self.ocr_repo.get_archived_duplicate_numbers(user_id, duty_free_type))
+        if not archived:
+            return
+        
+        for customer in matched_customers:
+            customer.archived_receipt_numbers = [
+                receipt_number for receipt_number in customer.receipt_numbers if receipt_number in archived
+            ]
+        for receipt in unmatched_receipts:
+            receipt.is_archived_duplicate = receipt.receipt_number in archived
+    
+    def _get_shilla_results(self, user_id: int, batch_ids: List[int]) -> tuple:
         """신라 면세점 매칭 결과 조회 (기존 fetch_shilla_results_with_receipt_ids 로직)"""
         matched_sql = text("""
         SELECT DISTINCT 
@@ -80,24 +114,26 @@ class MatchingService:
             COALESCE(p.name, se.name) as order_name,
             se."PayBack" as payback_amount
         FROM shilla_receipts sr
-        JOIN shilla_excel_data se ON se."receiptNumber"::text = sr.receipt_number
+        JOIN shilla_excel_data se ON se.user_id = sr.user_id AND se.batch_id = ANY(:batch_ids)
+                                 AND se."receiptNumber" = sr.receipt_number
         LEFT JOIN passports p ON (sr.passport_number = p.passport_number OR se.passport_number = p.passport_number) 
                                AND p.user_id = :user_id
         WHERE sr.user_id = :user_id
         ORDER BY order_name, sr.receipt_number
         """)
         
-        matched = self.db.execute(matched_sql, {"user_id": user_id}).fetchall()
+        matched = self.db.execute(matched_sql, {"user_id": user_id, "batch_ids": batch_ids}).fetchall()
         
         # 매칭되지 않은 영수증 조회
         unmatched_sql = text("""
         SELECT DISTINCT sr.id, sr.receipt_number, sr.file_path, sr.created_at
         FROM shilla_receipts sr
-        LEFT JOIN shilla_excel_data se ON se."receiptNumber"::text = sr.receipt_number
+        LEFT JOIN shilla_excel_data se ON se.user_id = sr.user_id AND se.batch_id = ANY(:batch_ids)
+                                      AND se."receiptNumber" = sr.receipt_number
         WHERE se."receiptNumber" IS NULL AND sr.user_id = :user_id
         ORDER BY sr.receipt_number
         """)
-        unmatched = self.db.execute(unmatched_sql, {"user_id": user_id}).fetchall()
+        unmatched = self.db.execute(unmatched_sql, {"user_id": user_id, "batch_ids": batch_ids}).fetchall()
         
         # 고객별 그룹화
         customer_data = {}
@@ -165,17 +201,55 @@ class MatchingService:
         
         return matched_customers, unmatched_receipts
     
-    def _get_lotte_results(self, user_id: int) -> tuple:
+    def _get_lotte_results(self, user_id: int, batch_ids: List[int]) -> tuple:
         """롯데 면세점 매칭 결과 조회 (기존 fetch_results + matching_passport 로직)"""
-        # 매칭된 영수증 조회
+        # 매칭된 영수증을 고객(엑셀 이름)별로 묶어 조회
         matched_sql = text("""
-        SELECT r.receipt_number, e.name
+        SELECT e.name AS excel_name,
+               array_agg(DISTINCT r.receipt_number ORDER BY r.receipt_number) AS receipt_numbers
         FROM receipts r
         JOIN receipt_match_log m ON r.receipt_number = m.receipt_number
-        JOIN lotte_excel_data e ON r.receipt_number = e."receiptNumber"
+        JOIN lotte_excel_data e ON e.user_id = r.user_id AND e.batch_id = ANY(:batch_ids)
+                                AND r.receipt_number = e."receiptNumber"
         WHERE m.is_matched = TRUE AND r.user_id = :user_id AND m.user_id = :user_id
+        GROUP BY e.name
+        ORDER BY e.name
         """)
-        matched = self.db.execute(matched_sql, {"user_id": user_id}).fetchall()
+        matched = self.db.execute(matched_sql, {"user_id": user_id, "batch_ids": batch_ids}).fetchall()
+        
+        # 여권은 정규화 키가 같거나 띄어쓰기만 다른 경우에만 연결하고, 한 여권은 고객 1명에게만 배정
+        name_matcher = self.ocr_repo.get_passport_name_matcher(user_id)
+        assigned = set()
+        matched_customers = []
+        for excel_name, receipt_numbers in matched:
+            customer = CustomerMatchResult(
+                name=excel_name,
+                receipt_numbers=list(receipt_numbers),
+                needs_update=True
+            )
+            exact = name_matcher.match(excel_name, exclude=assigned)
+            if exact:
+                passport = exact[0]
+                assigned.add(passport)
+                customer.passport_number = passport.passport_number
+                customer.birthday = passport.birthday
+                customer.needs_update = False
+            matched_customers.append(customer)
+        
+        # 연결되지 않은 고객에는 이름이 비슷한 미배정 여권을 후보로만 표시 (OCR 오인식, 철자 차이 확인용)
+        for customer in matched_customers:
+            if not customer.needs_update:
+                continue
+            customer.passport_suggestions = [
+                PassportSuggestion(
+                    passport_id=passport.id,
+                    name=passport_name,
+                    passport_number=passport.passport_number,
+                    score=round(score, 3)
+                )
+                for passport, passport_name, score in name_matcher.suggest(customer.name)
+                if passport not in assigned
+            ][:settings.NAME_SUGGESTION_LIMIT]
         
         # 매칭되지 않은 영수증 조회
         unmatched_sql = text("""
@@ -186,32 +260,6 @@ class MatchingService:
         """)
         unmatched = self.db.execute(unmatched_sql, {"user_id": user_id}).fetchall()
         
-        # 고객별 그룹화
-        customer_receipts = {}
-        for receipt_number, excel_name in matched:
-            if excel_name not in customer_receipts:
-                customer_receipts[excel_name] = []
-            customer_receipts[excel_name].append(receipt_number)
-        
-        matched_customers = []
-        for excel_name, receipt_numbers in customer_receipts.items():
-            # 여권 정보 조회
-            passport_sql = text("""
-            SELECT passport_number, birthday, name
-            FROM passports
-            WHERE name = :name AND user_id = :user_id
-            """)
-            passport_result = self.db.execute(passport_sql, {"name": excel_name, "user_id": user_id}).first()
-            
-            customer = CustomerMatchResult(
-                name=excel_name,
-                receipt_numbers=receipt_numbers,
-                passport_number=passport_result[0] if passport_result else None,
-                birthday=passport_result[1] if passport_result else None,
-                needs_update=passport_result is None or (passport_result and passport_result[2] != excel_name)
-            )
-            matched_customers.append(customer)
-        
         # 매칭되지 않은 영수증 변환
         unmatched_receipts = [
             ReceiptResponse(
@@ -230,7 +278,7 @@ class MatchingService:
         print(f"🔍 영수증 수정 요청 - receipt_id: {receipt_id}, user_id: {user_id}")
         
         # 면세점 타입 감지
-        duty_free_type = self._detect_duty_free_type(user_id)
+        duty_free_type = self.ocr_repo.get_user_duty_free_type(user_id)
         print(f"🔍 감지된 면세점 타입: {duty_free_type}")
         
         # 🔍 현재 사용자의 영수증 목록 확인
@@ -273,6 +321,11 @@ class MatchingService:
         # ocr_repo.update_shilla_receipt 메서드 호출 전 확인
         print(f"🔍 ocr_repo.update_shilla_receipt 호출 시도...")
 
+        old_receipt = self.db.execute(text("""
+        SELECT receipt_number FROM shilla_receipts WHERE id = :receipt_id AND user_id = :user_id
+        """), {"receipt_id": receipt_id, "user_id": user_id}).first()
+        old_receipt_number = old_receipt[0] if old_receipt else None
+
         try:
             receipt = self.ocr_repo.update_shilla_receipt(
                 receipt_id, user_id,
@@ -287,16 +340,6 @@ class MatchingService:
             
             print(f"✅ 영수증 업데이트 성공: {receipt.receipt_number}")
             
-            # 엑셀 데이터 매칭 확인 및 업데이트
-            print(f"🔍 엑셀 데이터 매칭 확인 중...")
-            excel_sql = text("""
-            SELECT "receiptNumber", name, "PayBack"
-            FROM shilla_excel_data
-            WHERE "receiptNumber"::text = :receipt_number
-            """)
-            excel_result = self.db.execute(excel_sql, {"receipt_number": receipt_data.new_receipt_number}).first()
-            print(f"🔍 엑셀 매칭 결과: {excel_result}")
-            
             # 여권 정보 처리
             if receipt_data.passport_number:
                 print(f"🔍 여권번호 업데이트 시작: {receipt_data.passport_number}")
@@ -304,38 +347,23 @@ class MatchingService:
                 UPDATE passports 
                 SET is_matched = TRUE
                 WHERE passport_number = :passport_number AND user_id = :user_id
+                AND is_matched = FALSE
                 """)
                 passport_result = self.db.execute(passport_sql, {
                     "passport_number": receipt_data.passport_number,
                     "user_id": user_id
                 })
+                self.ocr_repo.increment_statistics(user_id, matched_passports=passport_result.rowcount)
                 print(f"🔍 여권 업데이트 결과: {passport_result.rowcount}행 영향")
-                
-                # 엑셀 데이터에 여권번호 업데이트
-                if excel_result:
-                    print(f"🔍 엑셀 데이터에 여권번호 업데이트 중...")
-                    update_excel_sql = text("""
-                    UPDATE shilla_excel_data 
-                    SET passport_number = :passport_number
-                    WHERE "receiptNumber"::text = :receipt_number
-                    """)
-                    excel_update_result = self.db.execute(update_excel_sql, {
-                        "passport_number": receipt_data.passport_number,
-                        "receipt_number": receipt_data.new_receipt_number
-                    })
-                    print(f"🔍 엑셀 여권번호 업데이트 결과: {excel_update_result.rowcount}행 영향")
             
-            # 매칭 로그 업데이트
-            print(f"🔍 매칭 로그 생성 중...")
-            match_log = self.ocr_repo.create_match_log(
-                user_id=user_id,
-                receipt_number=receipt_data.new_receipt_number,
-                is_matched=excel_result is not None,
-                excel_name=excel_result[1] if excel_result else None,
-                passport_number=receipt_data.passport_number
+            # 수정된 영수증 번호만 다시 매칭 (엑셀 여권번호 반영, 매칭 로그 갱신)
+            print(f"🔍 증분 매칭 중...")
+            is_matched = self.matcher.rematch_receipt(
+                user_id, "shilla", old_receipt_number, receipt_data.new_receipt_number
             )
-            print(f"🔍 매칭 로그 생성 완료: {match_log.id}")
+            print(f"🔍 엑셀 매칭 결과: {is_matched}")
             
+            # 여권/매칭 상태 변경과 세션 통계 증감을 한 번에 커밋
             self.db.commit()
             print(f"✅ 신라 영수증 수정 완료!")
             return True
@@ -367,27 +395,10 @@ class MatchingService:
         if not receipt:
             return False
         
-        # 엑셀 데이터 매칭 확인
-        excel_sql = text("""
-        SELECT "receiptNumber"
-        FROM lotte_excel_data
-        WHERE "receiptNumber" = :receipt_number
-        """)
-        excel_result = self.db.execute(excel_sql, {"receipt_number": receipt_data.new_receipt_number}).first()
-        
-        # 매칭 로그 업데이트
-        match_log_sql = text("""
-        UPDATE receipt_match_log 
-        SET receipt_number = :new_receipt_number, is_matched = :is_matched
-        WHERE receipt_number = :old_receipt_number AND user_id = :user_id
-        """)
-        self.db.execute(match_log_sql, {
-            "new_receipt_number": receipt_data.new_receipt_number,
-            "old_receipt_number": old_receipt_number,
-            "is_matched": excel_result is not None,
-            "user_id": user_id
-        })
+        # 수정된 영수증 번호만 다시 매칭 (이전 번호의 매칭 로그 정리)
+        self.matcher.rematch_receipt(user_id, "lotte", old_receipt_number, receipt_data.new_receipt_number)
         
+        # 매칭 로그와 세션 통계 증감을 한 번에 커밋
         self.db.commit()
         return True
     
@@ -399,29 +410,23 @@ class MatchingService:
             return False
         
         # 엑셀 데이터와 매칭 확인 (면세점 타입에 따라)
-        duty_free_type = self._detect_duty_free_type(user_id)
+        duty_free_type = self.ocr_repo.get_user_duty_free_type(user_id)
         
-        if duty_free_type == "shilla" and passport_data.name:
-            excel_sql = text("""
-            SELECT "receiptNumber", name, "PayBack" 
-            FROM shilla_excel_data 
-            WHERE name = :name
-            """)
-        elif passport_data.name:
-            excel_sql = text("""
-            SELECT "receiptNumber", name, "PayBack" 
-            FROM lotte_excel_data 
-            WHERE name = :name
-            """)
-        else:
+        # 신라는 수정된 여권번호와 연결된 영수증만 다시 매칭
+        if duty_free_type == "shilla" and passport_data.passport_number:
+            self.matcher.match_passport_number(user_id, passport_data.passport_number)
+        
+        if not passport_data.name:
             self.db.commit()
             return True
         
-        excel_result = self.db.execute(excel_sql, {"name": passport_data.name}).first()
+        excel_result = self.ocr_repo.find_excel_row_by_name(user_id, duty_free_type, passport_data.name)
         
         if excel_result:
-            # 여권 매칭 상태 업데이트
-            passport.is_matched = True
+            # 여권 매칭 상태 업데이트 (처음 매칭된 경우에만 통계 증가, 아래 매칭 로그와 함께 커밋)
+            if not passport.is_matched:
+                passport.is_matched = True
+                self.ocr_repo.increment_statistics(user_id, matched_passports=1)
             
             # 매칭 로그 업데이트
             self.ocr_repo.create_match_log(
@@ -445,9 +450,9 @@ class MatchingService:
             WHERE p.user_id = :user_id
             AND p.is_matched = FALSE
             AND NOT EXISTS (
-                SELECT 1 FROM lotte_excel_data le WHERE le.name = p.name
+                SELECT 1 FROM lotte_excel_data le WHERE le.user_id = p.user_id AND le.name_key = p.name_key
                 UNION ALL
-                SELECT 1 FROM shilla_excel_data se WHERE se.name = p.name
+                SELECT 1 FROM shilla_excel_data se WHERE se.user_id = p.user_id AND se.name_key = p.name_key
             )
             ORDER BY p.name
             """)
@@ -1,304 +1,428 @@
 # app/services/ocr_service.py
+import hashlib
 import json
 import os
-import tempfile
+import time
+import uuid
 import zipfile
-import shutil
-from typing import List, Dict, Any, Optional
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import List, Dict, Any, Optional, Set
 from sqlalchemy.orm import Session
 
 from ..core.config import settings
-from ..repositories.ocr_repository import OcrRepository
+from ..repositories.ocr_repository import OcrRepository, OcrBatchWriter
+from .incremental_matching_service import IncrementalMatchingService
 from ..schemas.ocr_schema import DutyFreeType, OcrProcessResponse
-from ..utils.vision_ocr import VisionOcr
-from ..utils.gpt_response import LotteClassificationUseGpt, ShillaClassificationUseGpt
+from ..utils.ocr_backend import get_ocr_backend, run_ocr
+from ..utils.gpt_response import LotteClassificationUseGpt, ShillaClassificationUseGpt, get_prompt_version
+from ..utils.fast_extractor import extract_fast_path
+from ..utils.normalizer import normalize_receipt_number
+from ..utils.name_matcher import normalize_name
 
-# 전역 진행상황 변수 (기존 코드와 동일하게 유지)
-progress = {"done": 0, "total": 0}
+# ZIP 추출/해시 계산 시 읽기 단위
+HASH_CHUNK_SIZE = 1024 * 1024
+
+def _classify_ocr_text(ocr_text: str, duty_free_type: DutyFreeType) -> Dict[str, Any]:
+    """GPT 워커 스레드에서 OCR 텍스트 분류 및 JSON 파싱
+    
+    영수증 번호/MRZ 로컬 추출 결과가 확실하면 GPT를 호출하지 않습니다.
+    """
+    if settings.FAST_PATH_ENABLED:
+        fast_result = extract_fast_path(ocr_text, duty_free_type.value)
+        if fast_result is not None:
+            return fast_result
+    
+    if duty_free_type == DutyFreeType.LOTTE:
+        gpt_result = LotteClassificationUseGpt(ocr_text)
+    else:
+        gpt_result = ShillaClassificationUseGpt(ocr_text)
+    return json.loads(gpt_result)
 
 class OcrService:
     def __init__(self, db: Session):
         self.db = db
         self.ocr_repo = OcrRepository(db)
-        self.vision_ocr = VisionOcr()
+        self.matcher = IncrementalMatchingService(db)
+        
+        # 작업별 진행상황 (job_id가 있으면 processing_jobs 테이블에 기록)
+        self.job_id: Optional[str] = None
+        self.progress = {"done": 0, "total": 0}
+        self.last_heartbeat = 0.0
+        
+        # 이미지 처리 결과 일괄 저장기 (처리 시작 시 생성)
+        self.writer: Optional[OcrBatchWriter] = None
+        
+        # 이전 세션에서 아카이브된 영수증 번호 (처리 시작 시 로드, 비활성화 시 None)
+        self.archived_numbers: Optional[Set[str]] = None
+        
+        # 설정된 OCR 엔진 (사용할 수 없으면 RuntimeError)
+        self.ocr_backend = get_ocr_backend(settings.OCR_BACKEND)
     
-    def process_images_from_zip(self, zip_file_path: str, user_id: int, duty_free_type: DutyFreeType) -> OcrProcessResponse:
+    def process_images_from_zip(self, zip_file_path: str, user_id: int, duty_free_type: DutyFreeType,
+                                job_id: Optional[str] = None) -> OcrProcessResponse:
         """ZIP 파일에서 이미지 추출 및 OCR 처리"""
-        global progress
+        self.job_id = job_id
         
-        # 임시 디렉토리 생성
-        temp_dir = tempfile.mkdtemp()
-        user_uploads_dir = f"{settings.UPLOAD_DIR}/user_{user_id}"
-        os.makedirs(user_uploads_dir, exist_ok=True)
+        # 작업별 전용 디렉토리 (다른 사용자/작업의 같은 이름 이미지와 섞이지 않도록)
+        extract_dir = os.path.join(settings.UPLOAD_DIR, f"user_{user_id}", job_id or uuid.uuid4().hex)
+        os.makedirs(extract_dir, exist_ok=True)
         
-        try:
-            # ZIP 파일 해제
-            with zipfile.ZipFile(zip_file_path, 'r') as zip_ref:
-                zip_ref.extractall(temp_dir)
-            
-            # 이미지 파일 목록 추출 (macOS 메타데이터 파일 제외)
-            image_files = []
-            for root, dirs, files in os.walk(temp_dir):
-                for file in files:
-                    if (not file.startswith('._') and 
-                        not root.endswith('__MACOSX') and 
-                        file.lower().endswith((".jpg", ".png", ".jpeg"))):
-                        # 이미지를 uploads 디렉토리로 복사
-                        src_path = os.path.join(root, file)
-                        dst_path = os.path.join(settings.UPLOAD_DIR, file)
-                        shutil.copy2(src_path, dst_path)
-                        image_files.append(dst_path)
-            
-            if not image_files:
-                raise ValueError("ZIP 파일에 처리 가능한 이미지가 없습니다.")
+        # ZIP 이미지를 작업 디렉토리로 바로 추출 (추출하면서 해시 계산)
+        image_hashes = self._extract_images_from_zip(zip_file_path, extract_dir)
+        image_files = list(image_hashes)
+        
+        if not image_files:
+            raise ValueError("ZIP 파일에 처리 가능한 이미지가 없습니다.")
+        
+        # 진행상황 초기화
+        self._update_progress(done=0, total=len(image_files))
+        
+        # 아카이브된 영수증 번호를 한 번만 로드 (영수증마다 DB를 조회하지 않도록)
+        if settings.ARCHIVED_DUPLICATE_CHECK_ENABLED:
+            self.archived_numbers = self.ocr_repo.get_archived_receipt_numbers(user_id, duty_free_type.value)
+            print(f"아카이브 영수증 번호 로드: {len(self.archived_numbers)}개")
+        
+        print(f"전체 이미지 수: {self.progress['total']}")
+        
+        # 이미지 병렬 OCR/GPT 처리 (DB 저장은 현재 스레드에서 수행)
+        cache_hits = self._process_images_concurrently(image_hashes, user_id, duty_free_type)
+        
+        # OCR 숫자 오인식으로 엑셀과 1자리 다른 영수증 번호 자동 보정 (후보가 1개뿐일 때)
+        if settings.RECEIPT_AUTO_CORRECT_ENABLED:
+            self._auto_correct_receipt_numbers(user_id, duty_free_type.value)
+        
+        # 이전 세션에서 이미 아카이브된 영수증 수 (중복 지급 주의)
+        archived_duplicates = self._count_archived_duplicates(user_id, duty_free_type.value)
+        
+        # 모든 워커 완료 후 매칭 1회 실행 (매칭 전후로 작업 heartbeat 갱신)
+        self._update_progress(done=self.progress["done"])
+        if duty_free_type == DutyFreeType.LOTTE:
+            matched_count = self._execute_lotte_matching(user_id)
+        else:
+            matched_count = self._execute_shilla_matching(user_id)
+        self._update_progress(done=self.progress["done"])
+        
+        # 통계 조회
+        stats = self.ocr_repo.get_user_statistics(user_id)
+        
+        return OcrProcessResponse(
+            success=True,
+            total_images=len(image_files),
+            processed_images=self.progress["done"],
+            matched_receipts=stats["matched_receipts"],
+            unmatched_receipts=stats["unmatched_receipts"],
+            processing_time=f"{len(image_files)}개 이미지 처리 완료",
+            cache_hits=cache_hits,
+            cache_hit_ratio=round(cache_hits / len(image_files), 3),
+            archived_duplicates=archived_duplicates
+        )
+    
+    def _extract_images_from_zip(self, zip_file_path: str, extract_dir: str) -> Dict[str, str]:
+        """ZIP 안의 이미지를 임시 디렉토리 없이 작업 디렉토리로 스트리밍 추출
+        
+        macOS 메타데이터 파일은 제외하며, {저장 경로: SHA-256 해시}를 반환합니다.
+        ZIP 안의 다른 폴더에 같은 이름의 이미지가 있으면 번호를 붙여 저장하므로
+        해시를 계산한 바이트와 OCR이 읽는 파일이 항상 같습니다.
+        """
+        image_hashes: Dict[str, str] = {}
+        
+        with zipfile.ZipFile(zip_file_path, 'r') as zip_ref:
+            for member in zip_ref.infolist():
+                if member.is_dir():
+                    continue
+                
+                file = os.path.basename(member.filename)
+                if (file.startswith('._') or
+                    '__MACOSX' in member.filename.split('/') or
+                    not file.lower().endswith((".jpg", ".png", ".jpeg"))):
+                    continue
+                
+                dst_path = os.path.join(extract_dir, file)
+                stem, ext = os.path.splitext(file)
+                suffix = 1
+                while dst_path in image_hashes:
+                    dst_path = os.path.join(extract_dir, f"{stem}_{suffix}{ext}")
+                    suffix += 1
+                sha256 = hashlib.sha256()
+                with zip_ref.open(member) as src, open(dst_path, "wb") as dst:
+                    for chunk in iter(lambda: src.read(HASH_CHUNK_SIZE), b""):
+                        sha256.update(chunk)
+                        dst.write(chunk)
+                
+                image_hashes[dst_path] = sha256.hexdigest()
+        
+        return image_hashes
+    
+    def _process_images_concurrently(self, image_hashes: Dict[str, str], user_id: int, duty_free_type: DutyFreeType) -> int:
+        """OCR은 엔진별 워커 풀, GPT는 스레드 풀에서 파이프라인으로 처리
+        
+        OCR이 끝난 이미지는 즉시 GPT 단계로 넘기고, GPT 결과는 완료되는 순서대로
+        현재 스레드에서 모아 두었다가 일괄 저장합니다. (DB 세션은 스레드 간 공유하지 않음)
+        이미지 SHA-256 기준 캐시에 결과가 있으면 OCR/GPT를 모두 생략하며, 캐시 적중 수를 반환합니다.
+        """
+        # OCR 엔진마다 텍스트가 다르므로 캐시 키에 엔진 이름 포함
+        prompt_version = f"{self.ocr_backend.name}:{get_prompt_version(duty_free_type.value)}"
+        
+        # 저장할 행은 모아 두었다가 DB_BATCH_SIZE 이미지마다 한 번에 저장
+        self.writer = OcrBatchWriter(self.db, user_id)
+        
+        # 이미지 해시별 그룹화 (ZIP 안의 동일 이미지는 한 번만 처리)
+        paths_by_hash: Dict[str, List[str]] = {}
+        for img_path, image_hash in image_hashes.items():
+            paths_by_hash.setdefault(image_hash, []).append(img_path)
+        
+        # 캐시 적중 이미지는 저장된 결과로 바로 처리
+        cache_hits = 0
+        if settings.OCR_CACHE_ENABLED:
+            cached = self.ocr_repo.get_ocr_cache_entries(list(paths_by_hash), duty_free_type.value, prompt_version)
             
-            # 진행상황 초기화
-            progress["total"] = len(image_files)
-            progress["done"] = 0
+            for image_hash, entry in cached.items():
+                img_paths = paths_by_hash.pop(image_hash)
+                for img_path in img_paths:
+                    self._save_parsed_result(img_path, user_id, duty_free_type, entry.parsed_result)
+                    cache_hits += 1
+                self._update_progress(done=self.progress["done"] + len(img_paths), persist=False)
             
-            print(f"전체 이미지 수: {progress['total']}")
+            self.ocr_repo.mark_ocr_cache_hits([entry.id for entry in cached.values()])
+            self._flush_results()
+            print(f"OCR 캐시 적중: {cache_hits}/{len(image_hashes)}")
+        
+        if not paths_by_hash:
+            return cache_hits
+        
+        ocr_texts: Dict[str, str] = {}
+        
+        with self.ocr_backend.create_executor(settings.OCR_WORKERS) as ocr_pool, \
+             ThreadPoolExecutor(max_workers=settings.GPT_WORKERS) as gpt_pool:
+            pending = {
+                ocr_pool.submit(run_ocr, self.ocr_backend.name, img_paths[0]): ("ocr", image_hash)
+                for image_hash, img_paths in paths_by_hash.items()
+            }
             
-            # 각 이미지 OCR 처리
-            for img_path in image_files:
-                try:
-                    if duty_free_type == DutyFreeType.LOTTE:
-                        self._process_lotte_image(img_path, user_id)
+            while pending:
+                # GPT 응답이 느려도 JOB_HEARTBEAT_INTERVAL_SECONDS마다 깨어나 heartbeat 갱신
+                done, _ = wait(list(pending), timeout=settings.JOB_HEARTBEAT_INTERVAL_SECONDS,
+                               return_when=FIRST_COMPLETED)
+                if time.monotonic() - self.last_heartbeat >= settings.JOB_HEARTBEAT_INTERVAL_SECONDS:
+                    self._update_progress(done=self.progress["done"])
+                
+                for future in done:
+                    stage, image_hash = pending.pop(future)
+                    img_paths = paths_by_hash[image_hash]
+                    
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        for img_path in img_paths:
+                            self._save_failed_image(img_path, user_id, e)
                     else:
-                        self._process_shilla_image(img_path, user_id)
-                except Exception as e:
-                    print(f"이미지 처리 중 오류 발생: {img_path} - {str(e)}")
-                finally:
-                    progress["done"] += 1
-                    print(f"처리 완료: {progress['done']}/{progress['total']}")
-            
-            # 처리 완료 후 매칭 실행
-            if duty_free_type == DutyFreeType.LOTTE:
-                matched_count = self._execute_lotte_matching(user_id)
-            else:
-                matched_count = self._execute_shilla_matching(user_id)
-            
-            # 통계 조회
-            stats = self.ocr_repo.get_user_statistics(user_id)
-            
-            return OcrProcessResponse(
-                success=True,
-                total_images=len(image_files),
-                processed_images=progress["done"],
-                matched_receipts=stats["matched_receipts"],
-                unmatched_receipts=stats["unmatched_receipts"],
-                processing_time=f"{len(image_files)}개 이미지 처리 완료"
-            )
-            
-        finally:
-            # 임시 디렉토리 정리
-            shutil.rmtree(temp_dir)
+                        if stage == "ocr":
+                            # OCR 완료 → GPT 단계로 전달
+                            ocr_texts[image_hash] = result
+                            pending[gpt_pool.submit(_classify_ocr_text, result, duty_free_type)] = ("gpt", image_hash)
+                            continue
+                        
+                        for img_path in img_paths:
+                            self._save_parsed_result(img_path, user_id, duty_free_type, result)
+                        
+                        if settings.OCR_CACHE_ENABLED:
+                            self.writer.add_cache_entry(image_hash, duty_free_type.value, prompt_version,
+                                                        ocr_texts.pop(image_hash, ""), result)
+                    
+                    self._update_progress(done=self.progress["done"] + len(img_paths), persist=False)
+                    print(f"처리 완료: {self.progress['done']}/{self.progress['total']}")
+                    
+                    if len(self.writer) >= settings.DB_BATCH_SIZE:
+                        self._flush_results()
+        
+        self._flush_results()
+        return cache_hits
     
-    def _process_lotte_image(self, image_path: str, user_id: int):
-        """롯데 면세점 이미지 처리 (기존 LotteAiOcr 로직)"""
+    def _save_parsed_result(self, image_path: str, user_id: int, duty_free_type: DutyFreeType,
+                            parsed_result: Dict[str, Any]):
+        """면세점 타입별 분류 결과를 일괄 저장기에 추가 (변환 실패 시 인식 실패 이미지로 기록)"""
         try:
-            # OCR 및 GPT 처리
-            ocr_result = self.vision_ocr.process_image(image_path)
-            gpt_result = LotteClassificationUseGpt(ocr_result)
-            
-            # JSON 파싱
-            parsed_result = json.loads(gpt_result)
-            print(f"롯데 파싱 결과: {image_path}")
-            print(json.dumps(parsed_result, indent=2, ensure_ascii=False))
-            
-            # 영수증 처리
-            if "receipts" in parsed_result:
-                for receipt in parsed_result["receipts"]:
-                    receipt_number = receipt.get('receiptNumber', '')
-                    if receipt_number:
-                        self.ocr_repo.create_receipt(user_id, receipt_number, image_path)
-            
-            # 여권 처리
-            if "passports" in parsed_result:
-                for passport in parsed_result["passports"]:
-                    passport_name = passport.get('name', '')
-                    passport_number = passport.get('passportNumber', '')
-                    passport_birthday = passport.get('birthDay', '')
-                    
-                    if passport_name or passport_number:
-                        self.ocr_repo.create_passport(
-                            user_id, passport_name, passport_number, 
-                            passport_birthday, image_path
-                        )
-            
+            if duty_free_type == DutyFreeType.LOTTE:
+                self.writer.add(image_path, self._build_lotte_rows(image_path, user_id, parsed_result))
+            else:
+                self.writer.add(image_path, self._build_shilla_rows(image_path, user_id, parsed_result))
         except Exception as e:
-            print(f"롯데 이미지 처리 오류: {e}")
-            # 인식되지 않은 이미지로 저장
-            self.ocr_repo.create_unrecognized_image(user_id, image_path)
+            self._save_failed_image(image_path, user_id, e)
     
-    def _process_shilla_image(self, image_path: str, user_id: int):
-        """신라 면세점 이미지 처리 (기존 ShillaAiOcr 로직)"""
-        try:
-            # OCR 및 GPT 처리
-            ocr_result = self.vision_ocr.process_image(image_path)
-            gpt_result = ShillaClassificationUseGpt(ocr_result)
-            
-            # JSON 파싱
-            parsed_result = json.loads(gpt_result)
-            print(f"신라 파싱 결과: {image_path}")
-            print(json.dumps(parsed_result, indent=2, ensure_ascii=False))
-            
-            # 데이터 저장 여부 확인
-            saved_data = False
-            
-            # 영수증 처리 (신라용)
-            if "receipts" in parsed_result and parsed_result["receipts"]:
-                for receipt in parsed_result["receipts"]:
-                    receipt_number = receipt.get('receiptNumber', '')
-                    passport_number = receipt.get('passportNumber', '')
-                    
-                    if receipt_number:
-                        self.ocr_repo.create_shilla_receipt(
-                            user_id, str(receipt_number), 
-                            passport_number if passport_number else None, 
-                            image_path
-                        )
-                        saved_data = True
-                        print(f"신라 영수증 저장: {receipt_number}, 여권번호: {passport_number}")
-            
-            # 여권 처리
-            if "passports" in parsed_result and parsed_result["passports"]:
-                for passport in parsed_result["passports"]:
-                    passport_name = passport.get('name', '')
-                    passport_number = passport.get('passportNumber', '')
-                    passport_birthday = passport.get('birthDay', '')
-                    
-                    if passport_name or passport_number:
-                        self.ocr_repo.create_passport(
-                            user_id, passport_name, passport_number, 
-                            passport_birthday, image_path
-                        )
-                        saved_data = True
-                        print(f"여권 저장: {passport_name}, 번호: {passport_number}")
-            
-            if not saved_data:
-                # 인식된 데이터가 없는 경우
-                print(f"인식된 데이터가 없어서 unrecognized_images에 저장: {image_path}")
-                self.ocr_repo.create_unrecognized_image(user_id, image_path)
+    def _save_failed_image(self, image_path: str, user_id: int, error: Exception):
+        """OCR/GPT 단계에서 실패한 이미지를 인식 실패 이미지로 저장"""
+        print(f"이미지 처리 중 오류 발생: {image_path} - {str(error)}")
+        self.writer.add_unrecognized(image_path)
+    
+    def _flush_results(self):
+        """모아 둔 결과를 DB에 저장하고 진행상황 반영"""
+        failed_count = self.writer.flush()
+        if failed_count:
+            print(f"저장 실패로 인식 실패 처리된 이미지: {failed_count}개")
+        self._update_progress(done=self.progress["done"])
+    
+    def _update_progress(self, done: int, total: Optional[int] = None, persist: bool = True):
+        """진행상황 갱신 (작업으로 실행 중이면 작업 레코드와 heartbeat에도 반영)"""
+        self.progress["done"] = done
+        if total is not None:
+            self.progress["total"] = total
+        
+        if persist and self.job_id:
+            self.ocr_repo.update_job(self.job_id, **self.progress)
+            self.last_heartbeat = time.monotonic()
+    
+    def _build_lotte_rows(self, image_path: str, user_id: int, parsed_result: Dict[str, Any]) -> Dict[str, List[Dict[str, Any]]]:
+        """롯데 면세점 이미지 분류 결과를 저장 행으로 변환 (기존 LotteAiOcr 로직)"""
+        print(f"롯데 파싱 결과: {image_path}")
+        print(json.dumps(parsed_result, indent=2, ensure_ascii=False))
+        
+        rows = {"receipts": [], "passports": []}
+        
+        # 영수증 처리
+        if "receipts" in parsed_result:
+            for receipt in parsed_result["receipts"]:
+                receipt_number = receipt.get('receiptNumber', '')
+                if receipt_number:
+                    receipt_number = normalize_receipt_number(receipt_number, "lotte") or str(receipt_number)
+                    rows["receipts"].append({
+                        "user_id": user_id,
+                        "receipt_number": receipt_number,
+                        "is_archived_duplicate": self._is_archived_receipt(receipt_number),
+                        "file_path": image_path
+                    })
+        
+        # 여권 처리
+        if "passports" in parsed_result:
+            for passport in parsed_result["passports"]:
+                passport_name = passport.get('name', '')
+                passport_number = passport.get('passportNumber', '')
+                passport_birthday = passport.get('birthDay', '')
                 
-        except json.JSONDecodeError as e:
-            print(f"JSON 파싱 오류: {e}")
-            self.ocr_repo.create_unrecognized_image(user_id, image_path)
-        except Exception as e:
-            print(f"신라 이미지 처리 오류: {e}")
-            self.ocr_repo.create_unrecognized_image(user_id, image_path)
+                if passport_name or passport_number:
+                    rows["passports"].append(
+                        self._passport_row(user_id, passport_name, passport_number, passport_birthday, image_path)
+                    )
+        
+        return rows
     
-    def _execute_lotte_matching(self, user_id: int) -> int:
-        """롯데 매칭 실행 (기존 matchingResult 로직)"""
-        from sqlalchemy import text
-        
-        sql = """
-        SELECT DISTINCT r.receipt_number,
-               CASE
-                   WHEN e."receiptNumber" IS NOT NULL THEN TRUE
-                   ELSE FALSE 
-               END AS is_matched
-        FROM receipts r
-        LEFT JOIN lotte_excel_data e
-          ON r.receipt_number = e."receiptNumber"
-        WHERE r.user_id = :user_id
-        """
+    def _build_shilla_rows(self, image_path: str, user_id: int, parsed_result: Dict[str, Any]) -> Dict[str, List[Dict[str, Any]]]:
+        """신라 면세점 이미지 분류 결과를 저장 행으로 변환 (기존 ShillaAiOcr 로직)"""
+        print(f"신라 파싱 결과: {image_path}")
+        print(json.dumps(parsed_result, indent=2, ensure_ascii=False))
+        
+        rows = {"shilla_receipts": [], "passports": []}
+        
+        # 영수증 처리 (신라용)
+        if "receipts" in parsed_result and parsed_result["receipts"]:
+            for receipt in parsed_result["receipts"]:
+                receipt_number = receipt.get('receiptNumber', '')
+                passport_number = receipt.get('passportNumber', '')
+                
+                if receipt_number:
+                    receipt_number = normalize_receipt_number(receipt_number, "shilla") or str(receipt_number)
+                    rows["shilla_receipts"].append({
+                        "user_id": user_id,
+                        "receipt_number": receipt_number,
+                        "passport_number": passport_number if passport_number else None,
+                        "is_archived_duplicate": self._is_archived_receipt(receipt_number),
+                        "file_path": image_path
+                    })
+                    print(f"신라 영수증 저장: {receipt_number}, 여권번호: {passport_number}")
+        
+        # 여권 처리
+        if "passports" in parsed_result and parsed_result["passports"]:
+            for passport in parsed_result["passports"]:
+                passport_name = passport.get('name', '')
+                passport_number = passport.get('passportNumber', '')
+                passport_birthday = passport.get('birthDay', '')
+                
+                if passport_name or passport_number:
+                    rows["passports"].append(
+                        self._passport_row(user_id, passport_name, passport_number, passport_birthday, image_path)
+                    )
+                    print(f"여권 저장: {passport_name}, 번호: {passport_number}")
+        
+        if not rows["shilla_receipts"] and not rows["passports"]:
+            # 인식된 데이터가 없는 경우
+            print(f"인식된 데이터가 없어서 unrecognized_images에 저장: {image_path}")
+            return {"unrecognized_images": [{"user_id": user_id, "file_path": image_path}]}
+        
+        return rows
+    
+    def _is_archived_receipt(self, receipt_number: str) -> bool:
+        """이전 세션에서 아카이브된 영수증 번호인지 확인 (메모리 집합 조회)"""
+        return self.archived_numbers is not None and receipt_number in self.archived_numbers
+    
+    @staticmethod
+    def _passport_row(user_id: int, name: str, passport_number: str, birthday: Optional[str],
+                      file_path: str) -> Dict[str, Any]:
+        """여권 저장 행 (생년월일이 비어 있으면 NULL로 저장)"""
+        return {
+            "user_id": user_id,
+            "name": name,
+            "name_key": normalize_name(name),
+            "passport_number": passport_number,
+            "birthday": birthday or None,
+            "file_path": file_path
+        }
+    
+    def _auto_correct_receipt_numbers(self, user_id: int, duty_free_type: str) -> int:
+        """엑셀에 없는 영수증 번호를 가장 가까운 엑셀 번호로 보정 (매칭 전 실행)"""
+        index = self.ocr_repo.get_excel_receipt_index(user_id, duty_free_type)
+        if not len(index):
+            return 0
         
-        results = self.db.execute(text(sql), {"user_id": user_id}).fetchall()
-        matched_count = 0
+        receipts = self.ocr_repo.get_user_receipt_numbers(user_id, duty_free_type)
+        claimed = {receipt_number for _, receipt_number in receipts if receipt_number in index}
         
-        for row in results:
-            match_log = self.ocr_repo.create_match_log(
-                user_id=user_id,
-                receipt_number=row[0],
-                is_matched=row[1]
+        corrections = {}
+        for receipt_id, receipt_number in receipts:
+            if receipt_number in index:
+                continue
+            corrected = index.unique_correction(
+                receipt_number, claimed, settings.RECEIPT_AUTO_CORRECT_MAX_DISTANCE
             )
-            if row[1]:  # is_matched가 True인 경우
-                matched_count += 1
+            if corrected:
+                print(f"영수증 번호 자동 보정: {receipt_number} -> {corrected}")
+                corrections[receipt_id] = corrected
+                claimed.add(corrected)
+        
+        if corrections:
+            self.ocr_repo.correct_receipt_numbers(duty_free_type, corrections)
+            self.ocr_repo.refresh_archived_duplicate_flags(user_id, duty_free_type, list(corrections.values()))
+            self.db.commit()
+        print(f"영수증 번호 자동 보정: {len(corrections)}개")
+        return len(corrections)
+    
+    def _count_archived_duplicates(self, user_id: int, duty_free_type: str) -> int:
+        """이번 세션 영수증 중 이전 세션에서 이미 아카이브된 영수증 수"""
+        if not self.archived_numbers:
+            return 0
+        count = self.ocr_repo.count_archived_duplicates(user_id, duty_free_type)
+        if count:
+            print(f"이전 세션에서 아카이브된 영수증: {count}개 (중복 지급 주의)")
+        return count
+    
+    def _execute_lotte_matching(self, user_id: int) -> int:
+        """롯데 매칭 실행 (기존 matchingResult 로직)"""
+        # 매칭 결과를 서버에서 바로 receipt_match_log에 저장 (이미 있는 번호는 갱신, 통계는 증감 반영)
+        matched_count, total_count = self.matcher.match(user_id, "lotte")
+        self.db.commit()
         
-        print(f"롯데 매칭 결과 저장 완료: {matched_count}개 매칭")
+        print(f"롯데 매칭 결과 저장 완료: {matched_count}/{total_count}개 매칭")
         return matched_count
     
     def _execute_shilla_matching(self, user_id: int) -> int:
         """신라 매칭 실행 (기존 shilla_matching_result 로직)"""
-        from sqlalchemy import text
-        
         print(f"신라 매칭 시작 - 사용자 {user_id}")
         
-        # 1단계: 영수증 번호 매칭 및 여권번호 업데이트
-        sql_update_passport = text("""
-        UPDATE shilla_excel_data se
-        SET passport_number = sr.passport_number
-        FROM shilla_receipts sr
-        WHERE se."receiptNumber"::text = sr.receipt_number  
-        AND sr.user_id = :user_id
-        AND sr.passport_number IS NOT NULL
-        AND sr.passport_number != ''
-        AND (se.passport_number IS NULL OR se.passport_number = '' OR se.passport_number != sr.passport_number)
-        """)
-        updated_rows = self.db.execute(sql_update_passport, {"user_id": user_id}).rowcount
-        print(f"신라 엑셀 데이터에 여권번호 업데이트: {updated_rows}행")
-        
-        # 2단계: 여권 매칭 상태 업데이트
-        sql_update_passport_status = text("""
-        UPDATE passports p
-        SET is_matched = TRUE
-        FROM shilla_excel_data se
-        WHERE p.passport_number = se.passport_number
-        AND p.user_id = :user_id
-        AND se.passport_number IS NOT NULL
-        AND se.passport_number != ''
-        AND p.is_matched = FALSE
-        """)
-        passport_updated = self.db.execute(sql_update_passport_status, {"user_id": user_id}).rowcount
-        print(f"자동 여권 매칭 상태 업데이트: {passport_updated}개")
-        
-        # 3단계: 매칭 결과 로그 저장
-        sql_matching = text("""
-        SELECT DISTINCT 
-            sr.receipt_number,
-            CASE
-                WHEN se."receiptNumber" IS NOT NULL THEN TRUE
-                ELSE FALSE 
-            END AS is_matched,
-            se.name as excel_name,
-            sr.passport_number as receipt_passport_number,
-            se.passport_number as excel_passport_number,
-            p.name as passport_name,
-            p.birthday as passport_birthday
-        FROM shilla_receipts sr
-        LEFT JOIN shilla_excel_data se
-          ON se."receiptNumber"::text = sr.receipt_number
-        LEFT JOIN passports p
-          ON (sr.passport_number = p.passport_number OR se.passport_number = p.passport_number) 
-          AND p.user_id = :user_id
-        WHERE sr.user_id = :user_id
-        ORDER BY sr.receipt_number
-        """)
-        
-        results = self.db.execute(sql_matching, {"user_id": user_id}).fetchall()
-        matched_count = 0
-        
-        for row in results:
-            receipt_number, is_matched, excel_name, receipt_passport_number, excel_passport_number, passport_name, passport_birthday = row
-            final_passport_number = receipt_passport_number or excel_passport_number
-            
-            self.ocr_repo.create_match_log(
-                user_id=user_id,
-                receipt_number=receipt_number,
-                is_matched=is_matched,
-                excel_name=excel_name if is_matched else None,
-                passport_number=final_passport_number,
-                birthday=passport_birthday
-            )
-            
-            if is_matched:
-                matched_count += 1
+        matched_count, total_count = self.matcher.match(user_id, "shilla")
         
+        # 여권번호/매칭 상태 업데이트, 매칭 로그, 세션 통계 증감을 한 트랜잭션으로 커밋
         self.db.commit()
-        print(f"신라 매칭 결과 저장 완료: {matched_count}개 매칭")
+        print(f"신라 매칭 결과 저장 완료: {matched_count}/{total_count}개 매칭")
         return matched_count
     
     def get_progress(self) -> Dict[str, int]:
         """현재 처리 진행상황 반환"""
-        global progress
-        return progress.copy()
\ No newline at end of file
+        return self.progress.copy()
\ No newline at end of file
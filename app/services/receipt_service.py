@@ -9,12 +9,14 @@ from openpyxl.styles import Alignment
 from datetime import datetime
 
 from ..core.config import settings
+from ..repositories.ocr_repository import OcrRepository
 
 class ReceiptService:
     """수령증 생성 서비스 (기존 로직 100% 보존)"""
     
     def __init__(self, db: Session):
         self.db = db
+        self.ocr_repo = OcrRepository(db)
     
     def generate_receipts_for_user(self, user_id: int) -> str:
         """사용자별 수령증 생성 (기존 get_matched_name_and_payback 로직)"""
@@ -26,34 +28,31 @@ class ReceiptService:
         
         os.makedirs(output_dir, exist_ok=True)
         
-        # 사용자의 면세점 타입을 동적으로 감지
-        duty_free_type = self._detect_duty_free_type(user_id)
+        # 처리 세션의 면세점 타입 조회
+        duty_free_type = self.ocr_repo.get_user_duty_free_type(user_id)
         print(f"사용자 {user_id}의 면세점 타입: {duty_free_type}")
         
         if duty_free_type == "lotte":
-            # 롯데 면세점 데이터 조회 (동적 테이블)
+            # 롯데 면세점 데이터 조회 (사용자 파티션)
             sql1 = text("""
             SELECT e.name, e."PayBack"
             FROM lotte_excel_data e
             JOIN receipt_match_log m
-            ON e."receiptNumber" = m.receipt_number
+            ON e.user_id = m.user_id AND e."receiptNumber" = m.receipt_number
             WHERE m.is_matched = TRUE AND m.user_id = :user_id;
             """)
         else:
-            # 신라 면세점 데이터 조회 (동적 테이블)
+            # 신라 면세점 데이터 조회 (사용자 파티션)
             sql1 = text("""
             SELECT e.name, e."PayBack"
             FROM shilla_excel_data e
             JOIN receipt_match_log m
-            ON e."receiptNumber"::text = m.receipt_number
+            ON e.user_id = m.user_id AND e."receiptNumber" = m.receipt_number
             WHERE m.is_matched = TRUE AND m.user_id = :user_id;
             """)
 
-        sql2 = text("""
-        SELECT p.passport_number, p.birthday, p.name
-        FROM passports p
-        WHERE p.name = :name AND p.user_id = :user_id;
-        """)
+        # 여권 이름 정규화 키 인덱스 (이름마다 조회하지 않고 한 번만 생성, 키가 같은 여권만 사용)
+        name_matcher = self.ocr_repo.get_passport_name_matcher(user_id)
 
         try:
             results = self.db.execute(sql1, {"user_id": user_id}).fetchall()
@@ -67,12 +66,11 @@ class ReceiptService:
 
         for name, payback in results:
             try:
-                passport_result = self.db.execute(
-                    sql2, {"name": name, "user_id": user_id}
-                ).fetchone()
+                passport_result = name_matcher.match(name)
 
                 if passport_result:
-                    passport_number, birthday, passport_name = passport_result
+                    passport = passport_result[0]
+                    passport_number, birthday, passport_name = passport.passport_number, passport.birthday, passport.name
                     person = (passport_name, payback, passport_number, birthday)
 
                     if person in printed_people:
@@ -131,27 +129,3 @@ class ReceiptService:
         print(f"수령증 ZIP 파일 생성 완료: {zip_path}")
         
         return zip_path
-    
-    def _detect_duty_free_type(self, user_id: int) -> str:
-        """사용자의 현재 데이터를 기반으로 면세점 타입을 감지 (기존 로직 보존)"""
-        try:
-            # 신라 데이터 개수 확인
-            shilla_count_sql = text("SELECT COUNT(*) FROM shilla_receipts WHERE user_id = :user_id")
-            shilla_count = self.db.execute(shilla_count_sql, {"user_id": user_id}).scalar() or 0
-            
-            # 롯데 데이터 개수 확인
-            lotte_count_sql = text("SELECT COUNT(*) FROM receipts WHERE user_id = :user_id")
-            lotte_count = self.db.execute(lotte_count_sql, {"user_id": user_id}).scalar() or 0
-            
-            print(f"데이터 감지: 신라={shilla_count}, 롯데={lotte_count}")
-            
-            # 더 많은 데이터가 있는 쪽을 선택
-            if shilla_count >= lotte_count:
-                return "shilla"
-            else:
-                return "lotte"
-                
-        except Exception as e:
-            print(f"면세점 타입 감지 오류: {e}")
-            # 오류 시 기본값 반환
-            return "lotte"
\ No newline at end of file
@@ -1,8 +1,41 @@
 # app/utils/excel_parser.py
+import codecs
+import csv
+import io
+import os
 import pandas as pd
-from sqlalchemy import create_engine, text
-from typing import Tuple, Dict, Any
+from openpyxl import load_workbook
+from sqlalchemy import create_engine
+from typing import Tuple, Dict, Any, Iterable, Iterator, List, Optional
 from ..core.config import settings
+from ..models.ocr_model import excel_partition_name
+from .normalizer import normalize_receipt_number, normalize_text, normalize_amount
+from .name_matcher import normalize_name
+
+try:
+    import pyarrow.parquet as pq
+    PARQUET_AVAILABLE = True
+except ModuleNotFoundError:
+    print("⚠️ pyarrow 모듈이 없습니다. Parquet 업로드 비활성화됨.")
+    PARQUET_AVAILABLE = False
+
+# 엑셀 테이블별 적재 컬럼 (COPY 대상)
+EXCEL_TABLE_COLUMNS = {
+    "lotte_excel_data": ("receiptNumber", "name", "PayBack", "name_key"),
+    "shilla_excel_data": ("receiptNumber", "name", "PayBack", "passport_number", "name_key"),
+}
+
+# 헤더 탐색 행 수 (롯데 매출 엑셀은 2단 헤더)
+HEADER_SCAN_ROWS = 2
+
+# CSV 인코딩 판별에 사용할 앞부분 크기
+CSV_ENCODING_SAMPLE_BYTES = 64 * 1024
+
+# 업로드 가능한 판매 데이터 파일 확장자 (.xls 외에는 스트리밍 파싱)
+SALES_FILE_EXTENSIONS = ('.xlsx', '.xls', '.csv', '.parquet')
+
+# 신라 엑셀 컬럼 매핑 (단순 헤더)
+SHILLA_COLUMN_MAPPING = {'BILL 번호': 'receiptNumber', '고객명': 'name', '수수료': 'PayBack'}
 
 class ExcelParser:
     """엑셀 파싱 유틸리티 클래스 (기존 로직 100% 보존)"""
@@ -56,6 +89,7 @@ class ExcelParser:
             print(f"최종 컬럼들: {list(df.columns)}")
             print(f"데이터 샘플: {df.head()}")
             
+            df = self._coerce_to_schema(df, "lotte")
             return df, 0, len(df)
             
         except Exception as e:
@@ -84,6 +118,7 @@ class ExcelParser:
             if 'PayBack' not in df.columns:
                 df['PayBack'] = 0
             
+            df = self._coerce_to_schema(df, "lotte")
             return df, 0, len(df)
     
     def parse_shilla_excel(self, excel_path: str) -> Tuple[pd.DataFrame, int, int]:
@@ -109,81 +144,332 @@ class ExcelParser:
             df['PayBack'] = 0
             print("PayBack 컬럼이 없어서 기본값 0으로 설정")
         
-        # 신라 전용: passport_number 컬럼 추가 (매칭 시 업데이트용)
-        df['passport_number'] = None
-        
         # 중복 컬럼 제거 (같은 이름으로 매핑된 컬럼들)
         df = df.loc[:, ~df.columns.duplicated()]
         
+        # 테이블 스키마로 변환 (신라 전용 passport_number 컬럼 포함)
+        df = self._coerce_to_schema(df, "shilla")
+        
         print(f"신라 최종 컬럼들: {list(df.columns)}")
         print(f"신라 데이터 샘플:\n{df.head()}")
         print(f"receiptNumber 타입: {df['receiptNumber'].dtype}")
         
         return df, 0, len(df)
     
-    def save_to_database(self, df: pd.DataFrame, table_name: str) -> Tuple[int, int]:
-        """데이터베이스에 엑셀 데이터 저장 (기존 로직 보존)"""
-        with self.engine.connect() as connection:
-            connection.execute(text("BEGIN"))
-            
-            try:
-                # 기존 데이터 수 조회
-                try:
-                    count_sql = text(f"SELECT COUNT(*) FROM {table_name}")
-                    records_before = connection.execute(count_sql).scalar()
-                    print(f"기존 레코드 수: {records_before}")
-                except Exception as count_error:
-                    print(f"기존 데이터 조회 실패 (테이블이 없을 수 있음): {count_error}")
-                    records_before = 0
-                    connection.execute(text("ROLLBACK"))
-                    connection.execute(text("BEGIN"))
-                
-                # 기존 데이터와 중복 체크
-                existing_receipts = set()
-                try:
-                    existing_sql = text(f'SELECT "receiptNumber" FROM {table_name}')
-                    existing_data = connection.execute(existing_sql).fetchall()
-                    existing_receipts = {row[0] for row in existing_data if row[0]}
-                    print(f"기존 영수증 번호 수: {len(existing_receipts)}")
-                except Exception as existing_error:
-                    print(f"기존 데이터 조회 실패 (테이블이 없을 수 있음): {existing_error}")
-                    existing_receipts = set()
-                    connection.execute(text("ROLLBACK"))
-                    connection.execute(text("BEGIN"))
-                
-                # 중복되지 않은 데이터만 필터링
-                if existing_receipts:
-                    df_new = df[~df['receiptNumber'].isin(existing_receipts)]
-                else:
-                    df_new = df.copy()
-                
-                records_added = len(df_new)
-                print(f"추가할 레코드 수: {records_added}")
-                
-                if records_added > 0:
-                    try:
-                        # 먼저 append로 시도
-                        df_new.to_sql(table_name, connection, if_exists='append', index=False)
-                        print(f"✅ {table_name} 테이블에 {records_added}개 레코드 추가 완료")
-                    except Exception as append_error:
-                        print(f"append 실패, replace로 재시도: {append_error}")
-                        connection.execute(text("ROLLBACK"))
-                        connection.execute(text("BEGIN"))
-                        
-                        # 전체 데이터로 테이블 새로 생성
-                        df.to_sql(table_name, connection, if_exists='replace', index=False)
-                        records_added = len(df)
-                        print(f"✅ {table_name} 테이블을 새로 생성하고 {records_added}개 레코드 추가 완료")
-                        records_before = 0
-                else:
-                    print("추가할 새로운 데이터가 없습니다.")
-                
-                connection.execute(text("COMMIT"))
-                print("✅ 트랜잭션 커밋 완료")
-                
-                return records_added, records_before + records_added
-                
-            except Exception as e:
-                print(f"데이터베이스 작업 중 오류: {e}")
-                connection.execute(text("ROLLBACK"))
-                raise e
\ No newline at end of file
+    def iter_file_chunks(self, file_path: str, duty_free_type: str,
+                         chunk_size: Optional[int] = None) -> Iterator[List[tuple]]:
+        """파일 확장자(.xlsx, .csv, .parquet)에 맞는 스트리밍 파서로 행 청크 반환"""
+        extension = os.path.splitext(file_path)[1].lower()
+        if extension == ".csv":
+            return self.iter_csv_chunks(file_path, duty_free_type, chunk_size)
+        if extension == ".parquet":
+            return self.iter_parquet_chunks(file_path, duty_free_type, chunk_size)
+        return self.iter_excel_chunks(file_path, duty_free_type, chunk_size)
+    
+    def iter_excel_chunks(self, excel_path: str, duty_free_type: str,
+                          chunk_size: Optional[int] = None) -> Iterator[List[tuple]]:
+        """엑셀(.xlsx)을 스트리밍으로 읽어 테이블 컬럼 순서의 행 청크를 반환
+        
+        openpyxl 읽기 전용 모드로 한 행씩 읽으므로 메모리 사용량은 파일 크기가 아니라 청크 크기에 비례합니다.
+        영수증 번호가 없는 행은 제외하고, 중복 번호는 적재 시 ON CONFLICT로 첫 행만 남습니다.
+        """
+        workbook = load_workbook(excel_path, read_only=True, data_only=True)
+        try:
+            rows = workbook.active.iter_rows(values_only=True)
+            yield from self._iter_row_chunks(rows, duty_free_type, chunk_size)
+        finally:
+            workbook.close()
+    
+    def iter_csv_chunks(self, csv_path: str, duty_free_type: str,
+                        chunk_size: Optional[int] = None) -> Iterator[List[tuple]]:
+        """CSV를 스트리밍으로 읽어 행 청크 반환 (모든 셀을 문자열로 읽으므로 영수증 번호 앞자리 0 유지)"""
+        with open(csv_path, newline="", encoding=self._detect_csv_encoding(csv_path)) as f:
+            yield from self._iter_row_chunks(csv.reader(f), duty_free_type, chunk_size)
+    
+    def iter_parquet_chunks(self, parquet_path: str, duty_free_type: str,
+                            chunk_size: Optional[int] = None) -> Iterator[List[tuple]]:
+        """Parquet을 배치 단위로 읽어 행 청크 반환 (매핑된 컬럼만 읽음)"""
+        if not PARQUET_AVAILABLE:
+            raise RuntimeError("Parquet 파일을 읽으려면 pyarrow 패키지가 필요합니다.")
+        
+        chunk_size = chunk_size or settings.EXCEL_COPY_CHUNK_ROWS
+        parquet_file = pq.ParquetFile(parquet_path)
+        column_names = parquet_file.schema_arrow.names
+        
+        column_indexes = self._map_header(column_names, duty_free_type)
+        missing_columns = [col for col in ('receiptNumber', 'name') if col not in column_indexes]
+        if missing_columns:
+            raise Exception(f"필수 컬럼이 없습니다: {missing_columns}")
+        print(f"{duty_free_type} Parquet 컬럼 위치: {column_indexes}")
+        
+        # 매핑된 컬럼만 읽어 (영수증 번호, 고객명, 수수료) 순서로 사용
+        targets = [target for target in ('receiptNumber', 'name', 'PayBack') if target in column_indexes]
+        selected = [column_names[column_indexes[target]] for target in targets]
+        
+        def data_rows():
+            for batch in parquet_file.iter_batches(batch_size=chunk_size, columns=selected):
+                columns = batch.to_pydict()
+                yield from zip(*(columns[name] for name in selected))
+        
+        yield from self._chunk_rows(
+            data_rows(),
+            {target: index for index, target in enumerate(targets)},
+            duty_free_type,
+            chunk_size
+        )
+    
+    def _iter_row_chunks(self, rows: Iterator[tuple], duty_free_type: str,
+                         chunk_size: Optional[int] = None) -> Iterator[List[tuple]]:
+        """행 이터레이터의 앞쪽 행만으로 헤더를 판별한 뒤 데이터 행을 청크로 반환"""
+        rows = iter(rows)
+        header_rows = [row for _, row in zip(range(HEADER_SCAN_ROWS), rows)]
+        header_size, column_indexes = self._detect_header(header_rows, duty_free_type)
+        print(f"{duty_free_type} 엑셀 헤더 {header_size}행, 컬럼 위치: {column_indexes}")
+        
+        def data_rows():
+            yield from header_rows[header_size:]
+            yield from rows
+        
+        yield from self._chunk_rows(data_rows(), column_indexes, duty_free_type, chunk_size)
+    
+    def _chunk_rows(self, rows: Iterable[tuple], column_indexes: Dict[str, int], duty_free_type: str,
+                    chunk_size: Optional[int] = None) -> Iterator[List[tuple]]:
+        """데이터 행을 테이블 컬럼 순서의 정규화된 튜플로 변환하여 청크 단위로 반환"""
+        chunk_size = chunk_size or settings.EXCEL_COPY_CHUNK_ROWS
+        receipt_index = column_indexes['receiptNumber']
+        name_index = column_indexes['name']
+        payback_index = column_indexes.get('PayBack')
+        extra_columns = (None,) if duty_free_type == "shilla" else ()  # 신라 passport_number (매칭 시 업데이트)
+        
+        chunk = []
+        skipped = 0
+        for row in rows:
+            receipt_number = normalize_receipt_number(self._cell(row, receipt_index), duty_free_type)
+            if receipt_number is None:
+                skipped += 1
+                continue
+            
+            name = normalize_text(self._cell(row, name_index))
+            chunk.append((
+                receipt_number,
+                name,
+                normalize_amount(self._cell(row, payback_index)),
+            ) + extra_columns + (normalize_name(name),))
+            
+            if len(chunk) >= chunk_size:
+                yield chunk
+                chunk = []
+        
+        if chunk:
+            yield chunk
+        print(f"영수증 번호가 없어 제외된 행: {skipped}개")
+    
+    @staticmethod
+    def _detect_csv_encoding(csv_path: str) -> str:
+        """CSV 인코딩 판별 (UTF-8이 아니면 엑셀 한글 CSV 기본값인 cp949)"""
+        with open(csv_path, "rb") as f:
+            sample = f.read(CSV_ENCODING_SAMPLE_BYTES)
+        try:
+            codecs.getincrementaldecoder("utf-8")().decode(sample, final=False)
+            return "utf-8-sig"
+        except UnicodeDecodeError:
+            return "cp949"
+    
+    def _detect_header(self, header_rows: List[tuple], duty_free_type: str) -> Tuple[int, Dict[str, int]]:
+        """헤더 행 수(1 또는 2)와 컬럼 위치 판별
+        
+        첫 행만으로 필수 컬럼이 모두 매핑되고 다음 행이 데이터이면 단순 헤더, 아니면 2단 헤더로 처리합니다.
+        """
+        if not header_rows:
+            raise Exception("엑셀 파일에 데이터가 없습니다.")
+        
+        required_columns = ['receiptNumber', 'name']
+        single = self._map_header(self._flatten_header(header_rows[:1]), duty_free_type)
+        has_required = all(col in single for col in required_columns)
+        
+        if has_required and (len(header_rows) < 2 or duty_free_type == "shilla" or
+                             normalize_receipt_number(self._cell(header_rows[1], single['receiptNumber'])) is not None):
+            return 1, single
+        
+        if len(header_rows) >= 2:
+            multi = self._map_header(self._flatten_header(header_rows[:2]), duty_free_type)
+            if all(col in multi for col in required_columns):
+                return 2, multi
+        
+        if has_required:
+            return 1, single
+        
+        missing_columns = [col for col in required_columns if col not in single]
+        raise Exception(f"필수 컬럼이 없습니다: {missing_columns}")
+    
+    @staticmethod
+    def _flatten_header(header_rows: List[tuple]) -> List[str]:
+        """1~2단 헤더를 1단 컬럼명으로 변환 (병합된 상위 헤더는 오른쪽으로 채움)"""
+        if len(header_rows) == 1:
+            return [str(value).strip() if value is not None else "" for value in header_rows[0]]
+        
+        top = []
+        previous = ""
+        for value in header_rows[0]:
+            previous = str(value).strip() if value not in (None, "") else previous
+            top.append(previous)
+        
+        columns = []
+        for index, parent in enumerate(top):
+            child = ExcelParser._cell(header_rows[1], index)
+            child = str(child).strip() if child is not None else ""
+            column = f"{parent}_{child}" if parent and child else (parent or child)
+            columns.append(column.replace("매출_", ""))
+        return columns
+    
+    @staticmethod
+    def _map_header(columns: List[str], duty_free_type: str) -> Dict[str, int]:
+        """컬럼명을 테이블 컬럼 위치로 매핑 (같은 컬럼으로 매핑되면 첫 컬럼 사용)"""
+        column_indexes = {}
+        for index, column in enumerate(columns):
+            if duty_free_type == "shilla":
+                target = SHILLA_COLUMN_MAPPING.get(column)
+            elif '교환권번호' in column or 'receiptNumber' in column:
+                target = 'receiptNumber'
+            elif '고객명' in column or 'name' in column:
+                target = 'name'
+            elif 'PayBack' in column or '환급' in column or '페이백' in column or '수수료' in column:
+                target = 'PayBack'
+            else:
+                target = None
+            
+            if target and target not in column_indexes:
+                column_indexes[target] = index
+        return column_indexes
+    
+    @staticmethod
+    def _cell(row: tuple, index: Optional[int]) -> Any:
+        """행에서 셀 값 조회 (읽기 전용 모드에서는 행 길이가 헤더보다 짧을 수 있음)"""
+        if index is None or index >= len(row):
+            return None
+        return row[index]
+    
+    def _coerce_to_schema(self, df: pd.DataFrame, duty_free_type: str) -> pd.DataFrame:
+        """엑셀 데이터를 테이블 스키마에 맞게 변환
+        
+        영수증 번호는 숫자 문자열로 정규화하고, 번호가 없는 행은 제외하며, 중복 번호는 첫 행만 유지합니다.
+        """
+        df = df.loc[:, ~df.columns.duplicated()]
+        
+        coerced = pd.DataFrame({
+            'receiptNumber': df['receiptNumber'].map(lambda value: normalize_receipt_number(value, duty_free_type)),
+            'name': df['name'].map(normalize_text),
+            'PayBack': df['PayBack'].map(normalize_amount),
+        })
+        if duty_free_type == "shilla":
+            coerced['passport_number'] = None  # 매칭 시 업데이트용
+        coerced['name_key'] = coerced['name'].map(normalize_name)
+        
+        rows_before = len(coerced)
+        coerced = coerced[coerced['receiptNumber'].notna()]
+        coerced = coerced.drop_duplicates(subset='receiptNumber', keep='first').reset_index(drop=True)
+        print(f"스키마 변환: {rows_before}행 → {len(coerced)}행 (영수증 번호 없음/중복 제외)")
+        
+        return coerced
+    
+    def save_to_database(self, df: pd.DataFrame, table_name: str, user_id: int,
+                         file_name: Optional[str] = None) -> Tuple[int, int, int]:
+        """데이터베이스에 엑셀 데이터 저장 (DataFrame을 청크로 나누어 save_rows_to_database로 적재)"""
+        columns = list(EXCEL_TABLE_COLUMNS.get(table_name, ()))
+        chunk_size = settings.EXCEL_COPY_CHUNK_ROWS
+        chunks = (
+            list(df.iloc[offset:offset + chunk_size][columns].itertuples(index=False, name=None))
+            for offset in range(0, len(df), chunk_size)
+        )
+        return self.save_rows_to_database(chunks, table_name, user_id, file_name)
+    
+    def save_rows_to_database(self, chunks: Iterable[List[tuple]], table_name: str, user_id: int,
+                              file_name: Optional[str] = None) -> Tuple[int, int, int]:
+        """엑셀 행 청크를 사용자 파티션에 새 업로드 배치로 저장
+        
+        COPY로 임시 테이블에 적재한 뒤 INSERT ... ON CONFLICT로 사용자의 기존 영수증 번호를 제외합니다.
+        배치 행과 데이터는 한 트랜잭션으로 커밋되므로 매칭은 완료된 배치만 봅니다.
+        반환값: (추가된 행 수, 사용자 전체 행 수, 배치 ID)
+        """
+        if table_name not in EXCEL_TABLE_COLUMNS:
+            raise ValueError(f"지원하지 않는 엑셀 테이블입니다: {table_name}")
+        
+        columns = EXCEL_TABLE_COLUMNS[table_name]
+        column_list = ", ".join(f'"{column}"' for column in columns)
+        staging_table = f"{table_name}_staging"
+        duty_free_type = table_name.split("_")[0]
+        
+        connection = self.engine.raw_connection()
+        try:
+            cursor = connection.cursor()
+            
+            self._ensure_partition(connection, table_name, user_id)
+            
+            cursor.execute(f"SELECT COUNT(*) FROM {table_name} WHERE user_id = %s", (user_id,))
+            records_before = cursor.fetchone()[0]
+            print(f"기존 레코드 수 (사용자 {user_id}): {records_before}")
+            
+            cursor.execute(
+                "INSERT INTO excel_upload_batches (user_id, duty_free_type, file_name, row_count) "
+                "VALUES (%s, %s, %s, 0) RETURNING id",
+                (user_id, duty_free_type, file_name)
+            )
+            batch_id = cursor.fetchone()[0]
+            
+            # 트랜잭션 종료 시 자동 삭제되는 임시 테이블
+            cursor.execute(
+                f"CREATE TEMP TABLE {staging_table} ON COMMIT DROP AS "
+                f"SELECT {column_list} FROM {table_name} WITH NO DATA"
+            )
+            
+            # 청크 단위로 COPY (CSV 변환 버퍼를 청크 크기로 제한)
+            staged_rows = 0
+            for chunk in chunks:
+                buffer = io.StringIO()
+                csv.writer(buffer).writerows(chunk)
+                buffer.seek(0)
+                cursor.copy_expert(
+                    f"COPY {staging_table} ({column_list}) FROM STDIN WITH (FORMAT csv)",
+                    buffer
+                )
+                staged_rows += len(chunk)
+            print(f"임시 테이블 적재 완료: {staged_rows}행")
+            
+            cursor.execute(
+                f"INSERT INTO {table_name} (user_id, batch_id, {column_list}) "
+                f"SELECT %s, %s, {column_list} FROM {staging_table} "
+                f'ON CONFLICT (user_id, "receiptNumber") DO NOTHING',
+                (user_id, batch_id)
+            )
+            records_added = cursor.rowcount
+            
+            cursor.execute("UPDATE excel_upload_batches SET row_count = %s WHERE id = %s", (records_added, batch_id))
+            
+            connection.commit()
+            print(f"✅ {table_name} 배치 {batch_id}에 {records_added}개 레코드 추가 완료 (중복 {staged_rows - records_added}개 제외)")
+            
+            return records_added, records_before + records_added, batch_id
+            
+        except Exception as e:
+            print(f"데이터베이스 작업 중 오류: {e}")
+            connection.rollback()
+            raise e
+        finally:
+            connection.close()
+    
+    @staticmethod
+    def _ensure_partition(connection, table_name: str, user_id: int):
+        """사용자 파티션이 없으면 생성 (부모 테이블 잠금을 짧게 유지하도록 별도 트랜잭션으로 커밋)"""
+        partition_name = excel_partition_name(table_name, user_id)
+        cursor = connection.cursor()
+        
+        cursor.execute("SELECT to_regclass(%s)", (partition_name,))
+        if cursor.fetchone()[0] is None:
+            # 같은 사용자의 동시 업로드가 파티션을 중복 생성하지 않도록 직렬화
+            cursor.execute("SELECT pg_advisory_xact_lock(hashtext(%s))", (partition_name,))
+            cursor.execute(
+                f"CREATE TABLE IF NOT EXISTS {partition_name} "
+                f"PARTITION OF {table_name} FOR VALUES IN ({int(user_id)})"
+            )
+            print(f"사용자 파티션 생성: {partition_name}")
+        connection.commit()
@@ -0,0 +1,185 @@
+# app/utils/fast_extractor.py
+import re
+from datetime import date, datetime
+from typing import Any, Dict, List, Optional
+
+# 면세점별 영수증 번호 패턴 (앞뒤로 숫자가 붙지 않은 정확한 자리수)
+RECEIPT_PATTERNS = {
+    "lotte": re.compile(r"(?<!\d)\d{14}(?!\d)"),   # 롯데: 14자리
+    "shilla": re.compile(r"(?<!\d)\d{13}(?!\d)"),  # 신라: 13자리
+}
+RECEIPT_LENGTHS = {"lotte": 14, "shilla": 13}
+
+# 공백으로 나뉜 숫자 묶음 (OCR이 영수증 번호를 쪼개 읽은 경우 탐지용)
+DIGIT_GROUP_PATTERN = re.compile(r"(?<!\d)\d+(?: \d+)*(?!\d)")
+
+# 영수증 번호 자리수보다 이만큼까지 짧은 숫자 묶음은 번호 일부로 보고 GPT로 처리
+PARTIAL_RECEIPT_MAX_MISSING_DIGITS = 4
+
+# 영수증에 인쇄된 여권번호 패턴
+PASSPORT_NUMBER_PATTERN = re.compile(r"(?<![A-Z0-9])[A-Z]{1,2}\d{7,8}(?![A-Z0-9])")
+
+# TD3(여권) MRZ 두 줄 패턴 (각 44자)
+MRZ_LINE1_PATTERN = re.compile(r"^P[A-Z<][A-Z<]{3}[A-Z<]{39}$")
+MRZ_LINE2_PATTERN = re.compile(r"^[A-Z0-9<]{9}[0-9][A-Z<]{3}[0-9]{6}[0-9][MF<][0-9]{6}[0-9][A-Z0-9<]{14}[0-9<][0-9]$")
+
+MONTH_NAMES = ["Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"]
+
+def mrz_check_digit(value: str) -> int:
+    """ICAO 9303 체크 디지트 계산 (가중치 7, 3, 1)"""
+    weights = (7, 3, 1)
+    total = 0
+    for i, char in enumerate(value):
+        if char.isdigit():
+            number = int(char)
+        elif char.isalpha():
+            number = ord(char) - ord("A") + 10
+        else:  # '<'
+            number = 0
+        total += number * weights[i % 3]
+    return total % 10
+
+def _format_birthday(yymmdd: str) -> Optional[str]:
+    """MRZ 생년월일(YYMMDD)을 GPT 응답과 같은 'DD Mon YYYY' 형식으로 변환"""
+    try:
+        yy, mm, dd = int(yymmdd[0:2]), int(yymmdd[2:4]), int(yymmdd[4:6])
+        century = 1900 if yy > date.today().year % 100 else 2000
+        birthday = date(century + yy, mm, dd)
+    except ValueError:
+        return None
+    return f"{birthday.day:02d} {MONTH_NAMES[birthday.month - 1]} {birthday.year}"
+
+def _normalize_mrz_line(line: str) -> str:
+    """OCR 결과의 MRZ 줄 정리 (공백 제거, 대문자, 꺾쇠 문자 통일)"""
+    return re.sub(r"\s+", "", line).upper().replace("«", "<").replace("‹", "<")
+
+def parse_td3_mrz(line1: str, line2: str) -> Optional[Dict[str, str]]:
+    """TD3 MRZ 두 줄을 파싱하여 이름/여권번호/생년월일 반환 (체크 디지트 불일치 시 None)"""
+    if not MRZ_LINE1_PATTERN.match(line1) or not MRZ_LINE2_PATTERN.match(line2):
+        return None
+    
+    passport_number = line2[0:9]
+    birth_date = line2[13:19]
+    expiry_date = line2[21:27]
+    personal_number = line2[28:42]
+    
+    # 여권번호, 생년월일, 만료일, 복합 체크 디지트 모두 확인
+    checks = [
+        (passport_number, line2[9]),
+        (birth_date, line2[19]),
+        (expiry_date, line2[27]),
+        (line2[0:10] + line2[13:20] + line2[21:43], line2[43]),
+    ]
+    if line2[42] != "<" or personal_number.strip("<"):
+        checks.append((personal_number, line2[42]))
+    
+    for value, check_digit in checks:
+        if not check_digit.isdigit() or mrz_check_digit(value) != int(check_digit):
+            return None
+    
+    birthday = _format_birthday(birth_date)
+    if birthday is None:
+        return None
+    
+    # 이름: 성<<이름<중간이름
+    surname, _, given_names = line1[5:].partition("<<")
+    name = " ".join(part for part in (surname.replace("<", " ").strip(),
+                                       given_names.replace("<", " ").strip()) if part)
+    if not name:
+        return None
+    
+    return {
+        "name": " ".join(name.split()),
+        "passportNumber": passport_number.replace("<", ""),
+        "birthDay": birthday
+    }
+
+def _is_timestamp(digits: str) -> bool:
+    """14자리 숫자가 YYYYMMDDHHMMSS 일시인지 확인 (영수증 번호로 오인 방지)"""
+    if len(digits) != 14:
+        return False
+    try:
+        parsed = datetime.strptime(digits, "%Y%m%d%H%M%S")
+    except ValueError:
+        return False
+    return 1990 <= parsed.year <= 2100
+
+def _has_partial_receipt_number(body: str, duty_free_type: str, receipt_numbers: List[str]) -> bool:
+    """확정한 번호 외에 영수증 번호 일부로 보이는 숫자 묶음이 있는지 확인 (쪼개지거나 자리수가 틀린 번호)"""
+    min_digits = RECEIPT_LENGTHS[duty_free_type] - PARTIAL_RECEIPT_MAX_MISSING_DIGITS
+    for group in DIGIT_GROUP_PATTERN.findall(body):
+        digits = group.replace(" ", "")
+        if digits in receipt_numbers or _is_timestamp(digits):
+            continue
+        if len(digits) >= min_digits:
+            return True
+    return False
+
+def _find_mrz(lines: List[str]) -> Optional[Dict[str, Any]]:
+    """텍스트 줄에서 TD3 MRZ 탐색 (결과와 MRZ 줄 번호 반환)"""
+    normalized = [_normalize_mrz_line(line) for line in lines]
+    
+    for i in range(len(normalized) - 1):
+        if normalized[i].startswith("P") and len(normalized[i]) == 44:
+            return {
+                "passport": parse_td3_mrz(normalized[i], normalized[i + 1]),
+                "line_indexes": (i, i + 1)
+            }
+    return None
+
+def extract_fast_path(ocr_text: str, duty_free_type: str) -> Optional[Dict[str, Any]]:
+    """GPT 호출 전 로컬 추출 (확실한 경우에만 GPT 응답과 같은 형식의 결과 반환)
+    
+    - 여권: 체크 디지트가 모두 맞는 TD3 MRZ
+    - 영수증: 면세점별 자리수와 정확히 일치하는 번호가 하나뿐인 경우
+      (일시 형식 14자리는 제외, 신라는 영수증에 인쇄된 여권번호도 하나로 확정되어야 함)
+    애매한 경우(쪼개지거나 자리수가 틀린 번호 일부가 남은 경우 포함) None을 반환하며, 이때는 GPT로 처리합니다.
+    """
+    if not ocr_text or not ocr_text.strip():
+        return None
+    
+    lines = ocr_text.splitlines()
+    passports = []
+    
+    mrz = _find_mrz(lines)
+    if mrz:
+        # MRZ가 있는데 검증에 실패하면 GPT로 처리
+        if mrz["passport"] is None:
+            return None
+        passports.append(mrz["passport"])
+        lines = [line for i, line in enumerate(lines) if i not in mrz["line_indexes"]]
+    
+    body = "\n".join(lines)
+    
+    # MRZ 일부만 인식된 경우(꺾쇠 채움 문자만 남음) 여권 누락 방지를 위해 GPT로 처리
+    if not passports and "<<" in body:
+        return None
+    
+    receipt_numbers = [
+        number for number in dict.fromkeys(RECEIPT_PATTERNS[duty_free_type].findall(body))
+        if not _is_timestamp(number)
+    ]
+    
+    if len(receipt_numbers) > 1:
+        return None
+    
+    # 영수증 번호 일부만 인식된 경우 영수증 누락 방지를 위해 GPT로 처리
+    if _has_partial_receipt_number(body, duty_free_type, receipt_numbers):
+        return None
+    
+    receipts = []
+    if receipt_numbers:
+        receipt = {"receiptNumber": receipt_numbers[0]}
+        
+        if duty_free_type == "shilla":
+            passport_numbers = list(dict.fromkeys(PASSPORT_NUMBER_PATTERN.findall(body.upper())))
+            if len(passport_numbers) != 1:
+                return None
+            receipt["passportNumber"] = passport_numbers[0]
+        
+        receipts.append(receipt)
+    
+    if not receipts and not passports:
+        return None
+    
+    return {"receipts": receipts, "passports": passports}
@@ -0,0 +1,39 @@
+# app/utils/file_upload.py
+import os
+import tempfile
+from fastapi import HTTPException, UploadFile, status
+
+from ..core.config import settings
+
+# 업로드 스트리밍 읽기 단위
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+async def save_upload_to_temp(upload_file: UploadFile, suffix: str, max_size: int = None) -> str:
+    """업로드 파일을 청크 단위로 임시 파일에 저장하고 경로 반환
+    
+    전체 파일을 메모리에 올리지 않으며, 최대 크기를 넘으면 저장을 중단하고 413 에러를 반환합니다.
+    """
+    max_size = max_size or settings.MAX_FILE_SIZE
+    written = 0
+    
+    with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as tmp_file:
+        tmp_path = tmp_file.name
+        try:
+            while True:
+                chunk = await upload_file.read(UPLOAD_CHUNK_SIZE)
+                if not chunk:
+                    break
+                
+                written += len(chunk)
+                if written > max_size:
+                    raise HTTPException(
+                        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                        detail=f"파일 크기가 제한({max_size // (1024 * 1024)}MB)을 초과했습니다"
+                    )
+                tmp_file.write(chunk)
+        except BaseException:
+            tmp_file.close()
+            os.remove(tmp_path)
+            raise
+    
+    return tmp_path
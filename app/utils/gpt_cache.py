@@ -0,0 +1,141 @@
+# app/utils/gpt_cache.py
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Optional, Tuple
+
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+from ..core.config import settings
+from ..core.database import SessionLocal
+from ..models.ocr_model import LlmResponseCache
+
+def hash_text(value: str) -> str:
+    """문자열 SHA-256 해시"""
+    return hashlib.sha256(value.encode("utf-8")).hexdigest()
+
+class GptResponseCache:
+    """GPT 분류 응답 캐시 (메모리 LRU + PostgreSQL 영구 저장)
+    
+    키는 (모델, 시스템 프롬프트 해시, OCR 텍스트 해시)이며, 메모리에 없으면 DB를 조회합니다.
+    GPT 워커 스레드에서 동시에 호출되므로 메모리 캐시는 락으로 보호하고, DB는 호출마다 별도 세션을 사용합니다.
+    """
+    
+    def __init__(self, max_entries: int, ttl_seconds: int):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[Tuple[str, str, str], Tuple[str, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get(self, model: str, prompt_hash: str, ocr_text: str) -> Optional[str]:
+        """캐시된 응답 조회 (없거나 만료되었으면 None)"""
+        key = (model, prompt_hash, hash_text(ocr_text))
+        
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry:
+                response, expires_at = entry
+                if expires_at > time.time():
+                    self._entries.move_to_end(key)
+                    return response
+                del self._entries[key]
+        
+        try:
+            db = SessionLocal()
+            try:
+                row = db.query(LlmResponseCache).filter(
+                    LlmResponseCache.model == key[0],
+                    LlmResponseCache.prompt_hash == key[1],
+                    LlmResponseCache.text_hash == key[2],
+                    LlmResponseCache.expires_at > datetime.now()
+                ).first()
+            finally:
+                db.close()
+        except Exception as e:
+            print(f"GPT 캐시 조회 오류: {e}")
+            return None
+        
+        if row is None:
+            return None
+        
+        self._remember(key, row.response, row.expires_at.timestamp())
+        return row.response
+    
+    def set(self, model: str, prompt_hash: str, ocr_text: str, response: str):
+        """응답 저장 (메모리 + DB)"""
+        key = (model, prompt_hash, hash_text(ocr_text))
+        expires_at = datetime.now() + timedelta(seconds=self.ttl_seconds)
+        self._remember(key, response, expires_at.timestamp())
+        
+        try:
+            db = SessionLocal()
+            try:
+                stmt = pg_insert(LlmResponseCache).values(
+                    model=key[0],
+                    prompt_hash=key[1],
+                    text_hash=key[2],
+                    response=response,
+                    expires_at=expires_at
+                )
+                stmt = stmt.on_conflict_do_update(
+                    constraint="uq_llm_response_cache_key",
+                    set_={"response": stmt.excluded.response, "expires_at": stmt.excluded.expires_at}
+                )
+                db.execute(stmt)
+                db.commit()
+            finally:
+                db.close()
+        except Exception as e:
+            print(f"GPT 캐시 저장 오류: {e}")
+    
+    def invalidate_prompt(self, model: str, prompt_hash: str):
+        """프롬프트 변경 시 이전 프롬프트로 생성된 응답 삭제"""
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == model and key[1] == prompt_hash]:
+                del self._entries[key]
+        
+        try:
+            db = SessionLocal()
+            try:
+                deleted = db.query(LlmResponseCache).filter(
+                    LlmResponseCache.model == model,
+                    LlmResponseCache.prompt_hash == prompt_hash
+                ).delete(synchronize_session=False)
+                db.commit()
+            finally:
+                db.close()
+            print(f"GPT 캐시 무효화 ({model}): {deleted}건 삭제")
+        except Exception as e:
+            print(f"GPT 캐시 무효화 오류: {e}")
+    
+    def purge_expired(self) -> int:
+        """만료된 응답 삭제 (조회 시에는 만료 행을 걸러내기만 하므로 주기적으로 정리)"""
+        now = time.time()
+        with self._lock:
+            for key in [key for key, (_, expires_at) in self._entries.items() if expires_at <= now]:
+                del self._entries[key]
+        
+        db = SessionLocal()
+        try:
+            deleted = db.query(LlmResponseCache).filter(
+                LlmResponseCache.expires_at <= datetime.now()
+            ).delete(synchronize_session=False)
+            db.commit()
+        finally:
+            db.close()
+        
+        if deleted:
+            print(f"만료된 GPT 캐시 삭제: {deleted}건")
+        return deleted
+    
+    def _remember(self, key: Tuple[str, str, str], response: str, expires_at: float):
+        """메모리 LRU에 저장 (최대 개수 초과 시 가장 오래된 항목 제거)"""
+        with self._lock:
+            self._entries[key] = (response, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+gpt_cache = GptResponseCache(settings.GPT_CACHE_MAX_ENTRIES, settings.GPT_CACHE_TTL_SECONDS)
@@ -1,16 +1,18 @@
 # app/utils/gpt_response.py
 import openai
 import os
+import json
+import threading
+from typing import Dict, Optional, Tuple
 from ..core.config import settings
+from .gpt_cache import gpt_cache, hash_text
 
-def LotteClassificationUseGpt(ocr_text: str) -> str:
-    """롯데 면세점 OCR 텍스트를 GPT로 분류 (기존 로직 100% 보존)"""
-    try:
-        with open(settings.LOTTE_PROMPT_PATH, "r", encoding="utf-8") as f:
-            SYSTEM_PROMPT = f.read()
-    except FileNotFoundError:
-        # 기본 프롬프트 사용
-        SYSTEM_PROMPT = """
+# 면세점별 GPT 모델
+LOTTE_GPT_MODEL = "gpt-4o-mini"
+SHILLA_GPT_MODEL = "gpt-4.1-mini"
+
+# 프롬프트 파일이 없을 때 사용하는 기본 프롬프트
+DEFAULT_LOTTE_PROMPT = """
         Please convert the LOTTE duty-free receipt OCR results into the JSON format below.
         Include only the specified keys, and do not include any keys other than those mentioned.
         
@@ -32,27 +34,8 @@ def LotteClassificationUseGpt(ocr_text: str) -> str:
           ]
         }
         """
-    
-    openai.api_key = settings.OPENAI_API_KEY or os.getenv("OPENAI_API_KEY_COMPANY")
-    
-    response = openai.ChatCompletion.create(
-        model="gpt-4o-mini",
-        messages=[
-            {"role": "system", "content": SYSTEM_PROMPT},
-            {"role": "user", "content": ocr_text}
-        ],
-        temperature=0.0
-    )
-    return response['choices'][0]['message']['content']
 
-def ShillaClassificationUseGpt(ocr_text: str) -> str:
-    """신라 면세점 OCR 텍스트를 GPT로 분류 (기존 로직 100% 보존)"""
-    try:
-        with open(settings.SHILLA_PROMPT_PATH, "r", encoding="utf-8") as f:
-            SYSTEM_PROMPT = f.read()
-    except FileNotFoundError:
-        # 기본 프롬프트 사용
-        SYSTEM_PROMPT = """
+DEFAULT_SHILLA_PROMPT = """
         Please convert the SHILLA duty-free receipt OCR results into the JSON format below.
         Include only the specified keys, and do not include any keys other than those mentioned.
         
@@ -77,15 +60,86 @@ def ShillaClassificationUseGpt(ocr_text: str) -> str:
           ]
         }
         """
+
+# 프롬프트 파일 캐시 (경로 → (수정 시각, 프롬프트))
+_prompt_cache: Dict[str, Tuple[Optional[float], str]] = {}
+_prompt_lock = threading.Lock()
+
+def _load_prompt(prompt_path: str, default_prompt: str, model: str) -> str:
+    """프롬프트 파일 읽기 (파일이 없으면 기본 프롬프트 사용)
+    
+    파일 수정 시각이 바뀐 경우에만 다시 읽으며, 내용이 바뀌었으면 이전 프롬프트의 GPT 캐시를 무효화합니다.
+    """
+    try:
+        mtime = os.path.getmtime(prompt_path)
+    except OSError:
+        mtime = None
+    
+    with _prompt_lock:
+        cached = _prompt_cache.get(prompt_path)
+        if cached and cached[0] == mtime:
+            return cached[1]
+        
+        try:
+            with open(prompt_path, "r", encoding="utf-8") as f:
+                prompt = f.read()
+        except FileNotFoundError:
+            prompt = default_prompt
+        
+        _prompt_cache[prompt_path] = (mtime, prompt)
+    
+    if cached and cached[1] != prompt:
+        print(f"프롬프트 변경 감지: {prompt_path}")
+        gpt_cache.invalidate_prompt(model, hash_text(cached[1]))
+    
+    return prompt
+
+def get_prompt_version(duty_free_type: str) -> str:
+    """현재 모델/프롬프트 조합의 버전 해시 (프롬프트나 모델이 바뀌면 값이 달라짐)"""
+    if duty_free_type == "lotte":
+        model = LOTTE_GPT_MODEL
+        prompt = _load_prompt(settings.LOTTE_PROMPT_PATH, DEFAULT_LOTTE_PROMPT, model)
+    else:
+        model = SHILLA_GPT_MODEL
+        prompt = _load_prompt(settings.SHILLA_PROMPT_PATH, DEFAULT_SHILLA_PROMPT, model)
+    return hash_text(f"{model}\n{prompt}")[:16]
+
+def _classify_with_cache(model: str, prompt_path: str, default_prompt: str, ocr_text: str) -> str:
+    """GPT 분류 호출 (동일 모델/프롬프트/OCR 텍스트는 캐시된 응답 반환)"""
+    SYSTEM_PROMPT = _load_prompt(prompt_path, default_prompt, model)
+    prompt_hash = hash_text(SYSTEM_PROMPT)
+    
+    if settings.GPT_CACHE_ENABLED:
+        cached_response = gpt_cache.get(model, prompt_hash, ocr_text)
+        if cached_response is not None:
+            return cached_response
     
     openai.api_key = settings.OPENAI_API_KEY or os.getenv("OPENAI_API_KEY_COMPANY")
     
     response = openai.ChatCompletion.create(
-        model="gpt-4.1-mini",
+        model=model,
         messages=[
             {"role": "system", "content": SYSTEM_PROMPT},
             {"role": "user", "content": ocr_text}
         ],
         temperature=0.0
     )
-    return response['choices'][0]['message']['content']
\ No newline at end of file
+    content = response['choices'][0]['message']['content']
+    
+    # JSON으로 파싱 가능한 응답만 캐시 (잘못된 응답이 고정되지 않도록)
+    if settings.GPT_CACHE_ENABLED:
+        try:
+            json.loads(content)
+            gpt_cache.set(model, prompt_hash, ocr_text, content)
+        except (TypeError, ValueError):
+            pass
+    
+    return content
+
+def LotteClassificationUseGpt(ocr_text: str) -> str:
+    """롯데 면세점 OCR 텍스트를 GPT로 분류 (동일 입력은 캐시된 응답 사용)"""
+    return _classify_with_cache(LOTTE_GPT_MODEL, settings.LOTTE_PROMPT_PATH, DEFAULT_LOTTE_PROMPT, ocr_text)
+
+def ShillaClassificationUseGpt(ocr_text: str) -> str:
+    """신라 면세점 OCR 텍스트를 GPT로 분류 (동일 입력은 캐시된 응답 사용)"""
+    return _classify_with_cache(SHILLA_GPT_MODEL, settings.SHILLA_PROMPT_PATH, DEFAULT_SHILLA_PROMPT, ocr_text)
\ No newline at end of file
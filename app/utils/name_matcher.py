@@ -0,0 +1,121 @@
+# app/utils/name_matcher.py
+import re
+import unicodedata
+from difflib import SequenceMatcher
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from ..core.config import settings
+
+# 이름 안에서 붙여 쓰는 기호 (MIN-JUN → MINJUN) / 토큰 구분 기호
+NAME_JOINERS = re.compile(r"[-‐‑'’`.]")
+NAME_SEPARATORS = re.compile(r"[\s,<>/()]+")
+
+# 후보 묶음(blocking) 키로 사용할 토큰 앞글자 수
+BLOCK_PREFIX_LENGTH = 3
+
+def name_tokens(name: Optional[str]) -> List[str]:
+    """이름을 정규화된 토큰 목록으로 변환 (NFKC, 대문자, 하이픈/마침표 제거, 공백/쉼표/< 기준 분리)"""
+    if not name:
+        return []
+    text = unicodedata.normalize("NFKC", str(name)).upper()
+    text = NAME_JOINERS.sub("", text)
+    return [token for token in NAME_SEPARATORS.split(text) if token]
+
+def normalize_name(name: Optional[str]) -> Optional[str]:
+    """이름 정규화 키 (토큰을 정렬하여 성/이름 순서, 띄어쓰기, 대소문자 차이를 없앰)
+    
+    DB의 name_key 컬럼과 같은 규칙이며, 마이그레이션의 SQL 백필도 이 규칙을 따릅니다.
+    """
+    tokens = name_tokens(name)
+    return " ".join(sorted(tokens)) if tokens else None
+
+def name_similarity(left: Optional[str], right: Optional[str]) -> float:
+    """토큰 집합 유사도 (0~1)
+    
+    공통 토큰을 앞에 두고 나머지 토큰을 정렬하여 비교하므로 순서 차이에 영향이 없고,
+    나머지 토큰을 붙여서도 비교하여 띄어쓰기 차이(GIL DONG / GILDONG)를 같은 이름으로 봅니다.
+    """
+    left_tokens, right_tokens = name_tokens(left), name_tokens(right)
+    if not left_tokens or not right_tokens:
+        return 0.0
+    
+    common = sorted(set(left_tokens) & set(right_tokens))
+    left_rest = [token for token in left_tokens if token not in common]
+    right_rest = [token for token in right_tokens if token not in common]
+    
+    if "".join(left_rest) == "".join(right_rest) or "".join(sorted(left_rest)) == "".join(sorted(right_rest)):
+        return 1.0
+    
+    left_sorted = " ".join(common + sorted(left_rest))
+    right_sorted = " ".join(common + sorted(right_rest))
+    return SequenceMatcher(None, left_sorted, right_sorted).ratio()
+
+def blocking_keys(name: Optional[str]) -> List[str]:
+    """후보 묶음 키 (토큰 앞 3글자, 같은 키를 가진 이름끼리만 유사도 비교)"""
+    return sorted({token[:BLOCK_PREFIX_LENGTH] for token in name_tokens(name)})
+
+class NameMatcher:
+    """이름 매칭 인덱스
+    
+    정규화 키가 같거나 띄어쓰기만 다른(유사도 1.0) 항목만 같은 사람으로 매칭합니다(match).
+    키가 다른 유사 이름(한 글자 차이 등)은 다른 사람일 수 있으므로 사용자 확인용 후보로만 반환합니다(suggest).
+    """
+    
+    def __init__(self, entries: Iterable[Tuple[Any, Optional[str]]], threshold: Optional[float] = None):
+        self.threshold = settings.NAME_MATCH_THRESHOLD if threshold is None else threshold
+        self._entries: List[Tuple[Any, str]] = []
+        self._by_key: Dict[str, List[int]] = {}
+        self._blocks: Dict[str, List[int]] = {}
+        
+        for value, name in entries:
+            key = normalize_name(name)
+            if key is None:
+                continue
+            position = len(self._entries)
+            self._entries.append((value, name))
+            self._by_key.setdefault(key, []).append(position)
+            for block in blocking_keys(name):
+                self._blocks.setdefault(block, []).append(position)
+    
+    def __len__(self) -> int:
+        return len(self._entries)
+    
+    def match(self, name: Optional[str], exclude: Iterable[Any] = ()) -> Optional[Tuple[Any, str]]:
+        """정규화 키가 같은 첫 번째 항목, 없으면 띄어쓰기만 다른 첫 번째 항목 (값, 이름)
+        
+        exclude에 있는 값은 이미 배정된 것으로 보고 건너뜁니다.
+        """
+        key = normalize_name(name)
+        if key is None:
+            return None
+        excluded = set(exclude)
+        for position in self._by_key.get(key, ()):
+            value, entry_name = self._entries[position]
+            if value not in excluded:
+                return value, entry_name
+        
+        # 띄어쓰기 차이(GIL DONG HONG / GILDONG HONG)는 키가 달라도 같은 이름으로 연결
+        positions = sorted({position for block in blocking_keys(name) for position in self._blocks.get(block, ())})
+        for position in positions:
+            value, entry_name = self._entries[position]
+            if value not in excluded and name_similarity(name, entry_name) == 1.0:
+                return value, entry_name
+        return None
+    
+    def suggest(self, name: Optional[str]) -> List[Tuple[Any, str, float]]:
+        """정규화 키는 다르지만 유사도가 기준 이상인 (값, 이름, 유사도) 후보 (유사도 높은 순, 1.0 미만은 자동 매칭에 사용하지 않음)"""
+        key = normalize_name(name)
+        if key is None:
+            return []
+        
+        positions = sorted({position for block in blocking_keys(name) for position in self._blocks.get(block, ())})
+        scored = []
+        for position in positions:
+            value, candidate_name = self._entries[position]
+            if normalize_name(candidate_name) == key:
+                continue
+            score = name_similarity(name, candidate_name)
+            if score >= self.threshold:
+                scored.append((value, candidate_name, score))
+        scored.sort(key=lambda item: -item[2])
+        return scored
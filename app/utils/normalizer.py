@@ -0,0 +1,74 @@
+# app/utils/normalizer.py
+import math
+import numbers
+import re
+from decimal import Decimal, InvalidOperation
+from typing import Any, Optional
+
+# 면세점별 영수증 번호 자리수
+RECEIPT_NUMBER_LENGTHS = {
+    "lotte": 14,
+    "shilla": 13,
+}
+
+def normalize_receipt_number(value: Any, duty_free_type: Optional[str] = None) -> Optional[str]:
+    """영수증 번호를 숫자 문자열로 정규화 (엑셀 숫자/지수 표기, 구분자 제거, 잘린 앞자리 0 보정)
+    
+    정규화할 수 없으면 None을 반환합니다.
+    """
+    if value is None:
+        return None
+    
+    # 숫자로 읽힌 값은 앞자리 0이 잘렸을 수 있음
+    from_number = isinstance(value, numbers.Real) and not isinstance(value, bool)
+    
+    if isinstance(value, numbers.Integral):
+        value = int(value)
+    elif isinstance(value, numbers.Real):
+        value = float(value)
+        if math.isnan(value):
+            return None
+        value = int(value) if value.is_integer() else value
+    
+    text = str(value).strip()
+    
+    # "1234.0", "1.2345E+13" 처럼 숫자가 문자열로 변환된 값
+    if re.fullmatch(r"[0-9.]+([eE][+-]?[0-9]+)?", text) and ("." in text or "e" in text.lower()):
+        try:
+            number = Decimal(text)
+            if number == number.to_integral_value():
+                text = str(int(number))
+                from_number = True
+        except InvalidOperation:
+            pass
+    
+    digits = re.sub(r"[^0-9]", "", text)
+    if not digits:
+        return None
+    
+    # 엑셀에서 숫자로 저장되며 잘린 앞자리 0 복원
+    length = RECEIPT_NUMBER_LENGTHS.get(duty_free_type)
+    if from_number and length and len(digits) < length:
+        digits = digits.zfill(length)
+    
+    return digits
+
+def normalize_text(value: Any) -> Optional[str]:
+    """문자열 컬럼 정규화 (앞뒤 공백 제거, 빈 값/NaN은 None)"""
+    if value is None or (isinstance(value, float) and math.isnan(value)):
+        return None
+    text = str(value).strip()
+    return text or None
+
+def normalize_amount(value: Any) -> float:
+    """금액 컬럼 정규화 (쉼표/통화 기호 제거, 변환 불가 시 0)"""
+    if value is None or (isinstance(value, float) and math.isnan(value)):
+        return 0.0
+    if isinstance(value, numbers.Real):
+        return float(value)
+    
+    text = re.sub(r"[^0-9.\-]", "", str(value))
+    try:
+        return float(text) if text else 0.0
+    except ValueError:
+        return 0.0
@@ -0,0 +1,139 @@
+# app/utils/ocr_backend.py
+import hashlib
+import os
+from abc import ABC, abstractmethod
+import shutil
+import subprocess
+import threading
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Dict, Optional
+
+from ..core.config import settings
+
+SUPPORTED_IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.tiff', '.tif')
+
+class OcrBackend(ABC):
+    """OCR 엔진 공통 인터페이스
+    
+    모든 엔진은 이미지 1장의 텍스트를 반환(process_image)하며, 엔진 특성에 맞는 워커 풀(create_executor)을 제공합니다.
+    이미지는 1장씩 워커 풀에 제출되어 OCR이 끝나는 대로 GPT 단계로 넘어갑니다.
+    """
+    
+    name = ""
+    use_process_pool = False  # True면 프로세스 풀, False면 스레드 풀에서 실행
+    
+    @abstractmethod
+    def process_image(self, image_path: str) -> str:
+        """이미지 1장에서 텍스트 추출"""
+    
+    def create_executor(self, max_workers: int) -> Executor:
+        """엔진에 맞는 OCR 워커 풀 생성 (작업은 run_ocr로 제출)"""
+        if self.use_process_pool:
+            return ProcessPoolExecutor(
+                max_workers=max_workers,
+                initializer=_init_ocr_worker,
+                initargs=(self.name,)
+            )
+        return ThreadPoolExecutor(max_workers=max_workers)
+    
+    @staticmethod
+    def _validate_image(image_path: str):
+        """이미지 파일 존재 및 형식 확인"""
+        if not os.path.exists(image_path):
+            raise FileNotFoundError(f"이미지 파일을 찾을 수 없습니다: {image_path}")
+        
+        if not image_path.lower().endswith(SUPPORTED_IMAGE_EXTENSIONS):
+            raise ValueError(f"지원하지 않는 이미지 형식입니다: {image_path}")
+
+class VisionOcrBackend(OcrBackend):
+    """macOS Vision 프레임워크 OCR (프로세스당 VisionOcr 1개)"""
+    
+    name = "vision"
+    use_process_pool = True
+    
+    def __init__(self):
+        from .vision_ocr import VisionOcr
+        self._ocr = VisionOcr()
+    
+    def process_image(self, image_path: str) -> str:
+        return self._ocr.process_image(image_path)
+
+class TesseractOcrBackend(OcrBackend):
+    """tesseract CLI OCR (Linux 서버용)
+    
+    이미지마다 tesseract 서브프로세스를 실행하므로 스레드 풀 워커 수만큼 프로세스가 병렬로 동작합니다.
+    """
+    
+    name = "tesseract"
+    
+    def __init__(self):
+        self.command = shutil.which(settings.TESSERACT_CMD)
+        if self.command is None:
+            raise RuntimeError(f"tesseract 실행 파일을 찾을 수 없습니다: {settings.TESSERACT_CMD}")
+    
+    def process_image(self, image_path: str) -> str:
+        self._validate_image(image_path)
+        
+        completed = subprocess.run(
+            [self.command, image_path, "stdout", "-l", settings.TESSERACT_LANG],
+            capture_output=True,
+            timeout=settings.OCR_TIMEOUT_SECONDS,
+            env={**os.environ, "OMP_THREAD_LIMIT": "1"}  # 프로세스 간 CPU 경합 방지
+        )
+        if completed.returncode != 0:
+            raise RuntimeError(f"tesseract 오류: {completed.stderr.decode('utf-8', errors='replace').strip()}")
+        
+        return completed.stdout.decode("utf-8", errors="replace").strip()
+
+class FakeOcrBackend(OcrBackend):
+    """벤치마크/테스트용 가짜 OCR (같은 이미지는 항상 같은 텍스트 반환)
+    
+    이미지 옆에 같은 이름의 .txt 파일이 있으면 그 내용을, 없으면 이미지 해시 기반 텍스트를 반환합니다.
+    """
+    
+    name = "fake"
+    
+    def process_image(self, image_path: str) -> str:
+        self._validate_image(image_path)
+        
+        if settings.FAKE_OCR_DELAY_MS:
+            time.sleep(settings.FAKE_OCR_DELAY_MS / 1000)
+        
+        text_path = os.path.splitext(image_path)[0] + ".txt"
+        if os.path.exists(text_path):
+            with open(text_path, encoding="utf-8") as f:
+                return f.read()
+        
+        with open(image_path, "rb") as f:
+            digest = hashlib.sha256(f.read()).hexdigest()
+        return f"FAKE OCR {os.path.basename(image_path)} {digest[:16]}"
+
+OCR_BACKENDS = {
+    VisionOcrBackend.name: VisionOcrBackend,
+    TesseractOcrBackend.name: TesseractOcrBackend,
+    FakeOcrBackend.name: FakeOcrBackend,
+}
+
+# 프로세스별 OCR 엔진 인스턴스 (엔진 초기화는 프로세스당 1회)
+_backends: Dict[str, OcrBackend] = {}
+_backends_lock = threading.Lock()
+
+def get_ocr_backend(name: Optional[str] = None) -> OcrBackend:
+    """설정된 OCR 엔진 반환 (엔진을 사용할 수 없으면 RuntimeError)"""
+    name = (name or settings.OCR_BACKEND).lower()
+    if name not in OCR_BACKENDS:
+        raise ValueError(f"지원하지 않는 OCR 엔진입니다: {name} (지원: {', '.join(OCR_BACKENDS)})")
+    
+    with _backends_lock:
+        if name not in _backends:
+            _backends[name] = OCR_BACKENDS[name]()
+        return _backends[name]
+
+def _init_ocr_worker(name: str):
+    """OCR 워커 프로세스 초기화"""
+    get_ocr_backend(name)
+
+def run_ocr(name: str, image_path: str) -> str:
+    """OCR 워커에서 이미지 1장 처리"""
+    return get_ocr_backend(name).process_image(image_path)
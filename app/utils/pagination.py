@@ -0,0 +1,28 @@
+# app/utils/pagination.py
+import base64
+import json
+from datetime import datetime
+from typing import Optional, Tuple
+
+# 한 페이지 최대 행 수
+MAX_PAGE_SIZE = 200
+
+def encode_cursor(sort_value: datetime, row_id: int) -> str:
+    """키셋 페이지네이션 커서 생성 (마지막 행의 정렬 시각과 ID, 클라이언트에는 불투명한 문자열)"""
+    payload = json.dumps([sort_value.isoformat(), int(row_id)], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+def decode_cursor(cursor: Optional[str]) -> Optional[Tuple[datetime, int]]:
+    """커서를 (정렬 시각, ID)로 변환 (커서가 없으면 None, 형식이 잘못되면 ValueError)"""
+    if not cursor:
+        return None
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        sort_value, row_id = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        return datetime.fromisoformat(sort_value), int(row_id)
+    except (ValueError, TypeError, UnicodeError) as e:
+        raise ValueError("잘못된 페이지 커서입니다.") from e
+
+def clamp_page_size(limit: int) -> int:
+    """페이지 크기를 1 ~ MAX_PAGE_SIZE 범위로 제한"""
+    return max(1, min(int(limit), MAX_PAGE_SIZE))
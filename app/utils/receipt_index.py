@@ -0,0 +1,144 @@
+# app/utils/receipt_index.py
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Iterable, List, Optional, Set
+
+import numpy as np
+
+from ..core.config import settings
+
+class _LengthIndex:
+    """같은 자리수 영수증 번호의 다중 세그먼트 인덱스
+    
+    자리 위치를 (최대 거리 + 1)개 세그먼트로 나누면, 해밍 거리가 최대 거리 이하인 번호는
+    적어도 한 세그먼트가 검색어와 정확히 같습니다(비둘기집 원리). 세그먼트별로 정렬된 코드 배열에서
+    후보를 찾고, 후보만 자리별로 비교합니다.
+    """
+    
+    def __init__(self, receipt_numbers: List[str], max_distance: int):
+        self.receipt_numbers = receipt_numbers
+        length = len(receipt_numbers[0])
+        self.digits = (
+            np.frombuffer("".join(receipt_numbers).encode("ascii"), dtype=np.uint8).reshape(-1, length) - ord("0")
+        )
+        
+        # 자리별 엔트로피가 고르게 나뉘도록 세그먼트 구성 (앞자리처럼 값이 거의 같은 자리가 한 세그먼트에 몰리지 않게)
+        entropies = [self._entropy(self.digits[:, position]) for position in range(length)]
+        segment_count = min(max_distance + 1, length)
+        segments: List[List[int]] = [[] for _ in range(segment_count)]
+        totals = [0.0] * segment_count
+        for position in sorted(range(length), key=lambda p: -entropies[p]):
+            target = totals.index(min(totals))
+            segments[target].append(position)
+            totals[target] += entropies[position]
+        
+        self.tables = []
+        for positions in segments:
+            positions = sorted(positions)
+            weights = np.array([10 ** i for i in range(len(positions))], dtype=np.int64)
+            codes = self.digits[:, positions].astype(np.int64) @ weights
+            order = np.argsort(codes, kind="stable")
+            self.tables.append((positions, weights, codes[order], order))
+    
+    @staticmethod
+    def _entropy(column: np.ndarray) -> float:
+        counts = np.bincount(column, minlength=10) / len(column)
+        counts = counts[counts > 0]
+        return float(-(counts * np.log10(counts)).sum())
+    
+    def lookup(self, receipt_number: str, max_distance: int) -> List[tuple]:
+        query = np.frombuffer(receipt_number.encode("ascii"), dtype=np.uint8) - ord("0")
+        
+        candidates = []
+        for positions, weights, sorted_codes, order in self.tables:
+            code = int(query[positions].astype(np.int64) @ weights)
+            lo = np.searchsorted(sorted_codes, code, "left")
+            hi = np.searchsorted(sorted_codes, code, "right")
+            candidates.append(order[lo:hi])
+        
+        rows = np.unique(np.concatenate(candidates))
+        distances = (self.digits[rows] != query).sum(axis=1)
+        within = distances <= max_distance
+        return [
+            (self.receipt_numbers[row], distance)
+            for row, distance in zip(rows[within].tolist(), distances[within].tolist())
+        ]
+
+class ReceiptNumberIndex:
+    """엑셀 영수증 번호 근사 검색 인덱스 (OCR 숫자 오인식 보정용)
+    
+    OCR 오인식(0/8, 1/7 등)은 자리수가 같은 숫자 치환이므로 해밍 거리로 후보를 찾습니다.
+    """
+    
+    def __init__(self, receipt_numbers: Iterable[str], max_distance: int = 2):
+        self.max_distance = max_distance
+        self.receipt_numbers: Set[str] = {number for number in receipt_numbers if number and number.isdigit()}
+        
+        by_length: Dict[int, List[str]] = {}
+        for number in self.receipt_numbers:
+            by_length.setdefault(len(number), []).append(number)
+        self._indexes = {
+            length: _LengthIndex(sorted(numbers), max_distance) for length, numbers in by_length.items()
+        }
+    
+    def __len__(self) -> int:
+        return len(self.receipt_numbers)
+    
+    def __contains__(self, receipt_number: str) -> bool:
+        return receipt_number in self.receipt_numbers
+    
+    def lookup(self, receipt_number: Optional[str], max_distance: Optional[int] = None) -> List[tuple]:
+        """거리 1 이상, max_distance 이하인 (영수증 번호, 거리) 목록"""
+        max_distance = self.max_distance if max_distance is None else min(max_distance, self.max_distance)
+        if not receipt_number or not receipt_number.isdigit() or len(receipt_number) not in self._indexes:
+            return []
+        
+        return [
+            (number, distance)
+            for number, distance in self._indexes[len(receipt_number)].lookup(receipt_number, max_distance)
+            if distance > 0
+        ]
+    
+    def suggest(self, receipt_number: Optional[str], claimed: Iterable[str] = (),
+                max_distance: Optional[int] = None, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """보정 후보 목록 (거리가 가깝고, 다른 영수증이 아직 매칭하지 않은 번호 우선)"""
+        claimed = claimed if isinstance(claimed, (set, frozenset)) else set(claimed)
+        candidates = [
+            {"receipt_number": number, "distance": distance, "claimed": number in claimed}
+            for number, distance in self.lookup(receipt_number, max_distance)
+        ]
+        candidates.sort(key=lambda c: (c["distance"], c["claimed"], c["receipt_number"]))
+        return candidates[:limit] if limit else candidates
+    
+    def unique_correction(self, receipt_number: Optional[str], claimed: Iterable[str] = (),
+                          max_distance: Optional[int] = None) -> Optional[str]:
+        """자동 보정할 번호 (가장 가까운 후보가 1개뿐이고 미매칭 번호일 때만 반환)"""
+        candidates = self.suggest(receipt_number, claimed, max_distance)
+        if not candidates:
+            return None
+        
+        best = candidates[0]
+        closest = [c for c in candidates if c["distance"] == best["distance"]]
+        if len(closest) != 1 or best["claimed"]:
+            return None
+        return best["receipt_number"]
+
+# (사용자, 면세점 타입, 엑셀 배치 목록)별 인덱스 캐시 (배치가 바뀌면 키가 달라져 다시 생성)
+_index_cache: "OrderedDict[Hashable, ReceiptNumberIndex]" = OrderedDict()
+_index_cache_lock = threading.Lock()
+
+def get_receipt_index(key: Hashable, loader: Callable[[], Iterable[str]]) -> ReceiptNumberIndex:
+    """캐시된 영수증 번호 인덱스 반환 (없으면 loader로 번호를 읽어 생성)"""
+    with _index_cache_lock:
+        if key in _index_cache:
+            _index_cache.move_to_end(key)
+            return _index_cache[key]
+    
+    index = ReceiptNumberIndex(loader(), settings.RECEIPT_SUGGESTION_MAX_DISTANCE)
+    
+    with _index_cache_lock:
+        _index_cache[key] = index
+        _index_cache.move_to_end(key)
+        while len(_index_cache) > settings.RECEIPT_INDEX_CACHE_SIZE:
+            _index_cache.popitem(last=False)
+    return index
@@ -1,8 +1,8 @@
 # app/utils/vision_ocr.py
-import AppKit
 import os
 
 try:
+    import AppKit
     from Vision import (
         VNRecognizeTextRequest,
         VNImageRequestHandler,
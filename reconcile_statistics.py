@@ -0,0 +1,56 @@
+# 세션 통계 카운터 재계산 및 불일치 점검
+# 사용법: python reconcile_statistics.py [--user-id 1] [--fix]
+import argparse
+
+from app.core.database import SessionLocal
+from app.models.user_model import User
+from app.models.ocr_model import SessionStatistics
+from app.repositories.ocr_repository import OcrRepository, STATISTICS_COLUMNS
+
+def main():
+    parser = argparse.ArgumentParser(description="session_statistics 카운터를 처음부터 다시 계산하여 비교합니다.")
+    parser.add_argument("--user-id", type=int, help="특정 사용자만 점검")
+    parser.add_argument("--fix", action="store_true", help="불일치 카운터를 재계산 값으로 저장")
+    args = parser.parse_args()
+    
+    db = SessionLocal()
+    ocr_repo = OcrRepository(db)
+    drift_count = 0
+    
+    try:
+        user_ids = [args.user_id] if args.user_id else [user_id for (user_id,) in db.query(User.id).order_by(User.id)]
+        
+        for user_id in user_ids:
+            stored = db.query(SessionStatistics).filter(SessionStatistics.user_id == user_id).first()
+            expected = ocr_repo.compute_user_statistics(user_id)
+            
+            if stored is None:
+                if not any(expected.values()):
+                    continue
+                diffs = {column: (None, expected[column]) for column in STATISTICS_COLUMNS}
+            else:
+                diffs = {
+                    column: (getattr(stored, column), expected[column])
+                    for column in STATISTICS_COLUMNS
+                    if getattr(stored, column) != expected[column]
+                }
+            
+            if not diffs:
+                continue
+            
+            drift_count += 1
+            detail = ", ".join(f"{column}: {current} -> {value}" for column, (current, value) in diffs.items())
+            print(f"사용자 {user_id} 불일치: {detail}")
+            
+            if args.fix:
+                ocr_repo.refresh_statistics(user_id)
+        
+        if args.fix:
+            db.commit()
+        
+        print(f"점검 완료: 사용자 {len(user_ids)}명 중 {drift_count}명 불일치" + (" (수정됨)" if args.fix and drift_count else ""))
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+# tests/test_excel_parser.py
+import pytest
+from openpyxl import Workbook
+
+from app.utils.excel_parser import ExcelParser
+
+def write_workbook(path, rows):
+    """테스트용 엑셀 파일 생성"""
+    workbook = Workbook()
+    sheet = workbook.active
+    for row in rows:
+        sheet.append(row)
+    workbook.save(path)
+    return str(path)
+
+class TestStreamingParser:
+    """스트리밍 엑셀 파싱 테스트"""
+    
+    def test_lotte_multi_header(self, tmp_path):
+        """롯데 2단 헤더 파싱 테스트"""
+        excel_path = write_workbook(tmp_path / "lotte.xlsx", [
+            ["순번", "매출", None, None],
+            [None, "교환권번호", "고객명", "수수료"],
+            [1, 90208724000593, "HONG GILDONG", "1,200"],
+            [2, None, "EMPTY", 0],
+            [3, "9020-8724-000594", " KIM ", None],
+        ])
+        chunks = list(ExcelParser().iter_excel_chunks(excel_path, "lotte"))
+        assert chunks == [[
+            ("90208724000593", "HONG GILDONG", 1200.0, "GILDONG HONG"),
+            ("90208724000594", "KIM", 0.0, "KIM"),
+        ]]
+    
+    def test_lotte_single_header(self, tmp_path):
+        """롯데 단순 헤더 파싱 테스트 (첫 데이터 행 유지)"""
+        excel_path = write_workbook(tmp_path / "lotte.xlsx", [
+            ["교환권번호", "고객명"],
+            [90208724000593, "HONG GILDONG"],
+        ])
+        chunks = list(ExcelParser().iter_excel_chunks(excel_path, "lotte"))
+        assert chunks == [[("90208724000593", "HONG GILDONG", 0.0, "GILDONG HONG")]]
+    
+    def test_shilla_chunks(self, tmp_path):
+        """신라 파싱 및 청크 분할 테스트"""
+        excel_path = write_workbook(tmp_path / "shilla.xlsx", [
+            ["BILL 번호", "고객명", "수수료"],
+            [123456789012, "A", 10],
+            ["1234567890124", "B", 20],
+            ["1234567890125", "C", 30],
+        ])
+        chunks = list(ExcelParser().iter_excel_chunks(excel_path, "shilla", chunk_size=2))
+        assert [len(chunk) for chunk in chunks] == [2, 1]
+        assert chunks[0][0] == ("0123456789012", "A", 10.0, None, "A")
+    
+    def test_missing_columns(self, tmp_path):
+        """필수 컬럼이 없으면 오류 테스트"""
+        excel_path = write_workbook(tmp_path / "shilla.xlsx", [["번호", "이름"], [1, "A"]])
+        with pytest.raises(Exception, match="필수 컬럼"):
+            list(ExcelParser().iter_excel_chunks(excel_path, "shilla"))
+
+class TestColumnarFormats:
+    """CSV/Parquet 파싱 테스트"""
+    
+    def test_csv_keeps_leading_zero(self, tmp_path):
+        """CSV 영수증 번호 문자열 유지 테스트"""
+        csv_path = tmp_path / "shilla.csv"
+        csv_path.write_text("BILL 번호,고객명,수수료\n0123456789012,홍길동,\"1,000\"\n,빈 행,0\n", encoding="utf-8")
+        chunks = list(ExcelParser().iter_file_chunks(str(csv_path), "shilla"))
+        assert chunks == [[("0123456789012", "홍길동", 1000.0, None, "홍길동")]]
+    
+    def test_cp949_csv(self, tmp_path):
+        """CP949 CSV 파싱 테스트"""
+        csv_path = tmp_path / "lotte.csv"
+        csv_path.write_bytes("교환권번호,고객명\n90208724000593,홍길동\n".encode("cp949"))
+        chunks = list(ExcelParser().iter_file_chunks(str(csv_path), "lotte"))
+        assert chunks == [[("90208724000593", "홍길동", 0.0, "홍길동")]]
+    
+    def test_parquet(self, tmp_path):
+        """Parquet 파싱 테스트 (매핑된 컬럼만 사용)"""
+        pa = pytest.importorskip("pyarrow")
+        pq = pytest.importorskip("pyarrow.parquet")
+        parquet_path = tmp_path / "lotte.parquet"
+        pq.write_table(pa.table({
+            "순번": [1, 2],
+            "교환권번호": ["90208724000593", "90208724000594"],
+            "고객명": ["A", "B"],
+            "수수료": [100, 200],
+        }), parquet_path)
+        chunks = list(ExcelParser().iter_file_chunks(str(parquet_path), "lotte", chunk_size=1))
+        assert chunks == [[("90208724000593", "A", 100.0, "A")], [("90208724000594", "B", 200.0, "B")]]
@@ -0,0 +1,89 @@
+# tests/test_fast_extractor.py
+from app.utils.fast_extractor import extract_fast_path, mrz_check_digit, parse_td3_mrz
+
+# ICAO 9303 예시 여권 MRZ
+MRZ_LINE1 = "P<UTOERIKSSON<<ANNA<MARIA<<<<<<<<<<<<<<<<<<<"
+MRZ_LINE2 = "L898902C36UTO7408122F1204159ZE184226B<<<<<10"
+
+class TestMrz:
+    """MRZ 파싱 테스트"""
+    
+    def test_check_digit(self):
+        """체크 디지트 계산 테스트"""
+        assert mrz_check_digit("L898902C3") == 6
+        assert mrz_check_digit("740812") == 2
+        assert mrz_check_digit("120415") == 9
+    
+    def test_parse_valid_mrz(self):
+        """정상 MRZ 파싱 테스트"""
+        result = parse_td3_mrz(MRZ_LINE1, MRZ_LINE2)
+        assert result == {
+            "name": "ERIKSSON ANNA MARIA",
+            "passportNumber": "L898902C3",
+            "birthDay": "12 Aug 1974"
+        }
+    
+    def test_parse_invalid_check_digit(self):
+        """체크 디지트 불일치 시 None 반환 테스트"""
+        broken = MRZ_LINE2[:9] + "7" + MRZ_LINE2[10:]
+        assert parse_td3_mrz(MRZ_LINE1, broken) is None
+
+class TestFastPath:
+    """GPT 우회 로컬 추출 테스트"""
+    
+    def test_passport_page(self):
+        """여권 이미지 추출 테스트"""
+        ocr_text = f"PASSPORT\nUTOPIA\n{MRZ_LINE1}\n{MRZ_LINE2}"
+        result = extract_fast_path(ocr_text, "lotte")
+        assert result["receipts"] == []
+        assert result["passports"][0]["passportNumber"] == "L898902C3"
+    
+    def test_mrz_with_ocr_spaces(self):
+        """OCR 공백이 섞인 MRZ 추출 테스트"""
+        ocr_text = f"{MRZ_LINE1[:20]} {MRZ_LINE1[20:]}\n{MRZ_LINE2}"
+        result = extract_fast_path(ocr_text, "shilla")
+        assert result["passports"][0]["name"] == "ERIKSSON ANNA MARIA"
+    
+    def test_broken_mrz_falls_back(self):
+        """MRZ 검증 실패 시 GPT로 처리 테스트"""
+        broken = MRZ_LINE2[:9] + "7" + MRZ_LINE2[10:]
+        assert extract_fast_path(f"{MRZ_LINE1}\n{broken}", "lotte") is None
+    
+    def test_lotte_receipt(self):
+        """롯데 영수증 번호 추출 테스트"""
+        ocr_text = "LOTTE DUTY FREE\n교환권번호 90208724000593\n합계 120,000"
+        result = extract_fast_path(ocr_text, "lotte")
+        assert result == {"receipts": [{"receiptNumber": "90208724000593"}], "passports": []}
+    
+    def test_split_receipt_number_falls_back(self):
+        """MRZ가 있어도 영수증 번호가 쪼개져 인식되면 GPT로 처리 테스트"""
+        ocr_text = f"교환권번호 9020 8724 000593\n{MRZ_LINE1}\n{MRZ_LINE2}"
+        assert extract_fast_path(ocr_text, "lotte") is None
+        assert extract_fast_path("교환권번호 9020872400059", "lotte") is None
+    
+    def test_timestamp_is_not_receipt_number(self):
+        """14자리 일시는 롯데 영수증 번호로 보지 않음 테스트"""
+        assert extract_fast_path("발행일시 20240105143012", "lotte") is None
+        ocr_text = "교환권번호 90208724000593\n발행일시 20240105143012"
+        result = extract_fast_path(ocr_text, "lotte")
+        assert result["receipts"] == [{"receiptNumber": "90208724000593"}]
+    
+    def test_multiple_receipt_numbers_fall_back(self):
+        """영수증 번호 후보가 여러 개면 GPT로 처리 테스트"""
+        ocr_text = "90208724000593\n90208724000594"
+        assert extract_fast_path(ocr_text, "lotte") is None
+    
+    def test_shilla_receipt(self):
+        """신라 영수증 번호/여권번호 추출 테스트"""
+        ocr_text = "THE SHILLA DUTY FREE\nNo. 1234567890123\nPassport MZ9268755"
+        result = extract_fast_path(ocr_text, "shilla")
+        assert result["receipts"] == [{"receiptNumber": "1234567890123", "passportNumber": "MZ9268755"}]
+    
+    def test_shilla_receipt_without_passport_falls_back(self):
+        """신라 영수증에 여권번호가 없으면 GPT로 처리 테스트"""
+        assert extract_fast_path("THE SHILLA\nNo. 1234567890123", "shilla") is None
+    
+    def test_empty_text(self):
+        """빈 텍스트 테스트"""
+        assert extract_fast_path("", "lotte") is None
+        assert extract_fast_path("아무 내용 없음", "lotte") is None
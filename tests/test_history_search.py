@@ -0,0 +1,40 @@
+# tests/test_history_search.py
+from app.services.archive_service import ArchiveService
+
+class TestHistorySearchConditions:
+    """이력 검색 인덱스 경로 선택 테스트"""
+    
+    def test_receipt_query_uses_prefix(self):
+        """숫자 검색어는 영수증 번호 접두사 + 여권번호 검색을 OR 대신 ID UNION 조건 1개로 결합 테스트"""
+        params = {}
+        conditions = ArchiveService._history_search_conditions("9020-8724", "all", params)
+        assert params["receipt_prefix"] == "90208724%"
+        assert params["passport_query"] == "%9020-8724%"
+        assert "name_query" not in params
+        assert len(conditions) == 1
+        assert "matching_history_receipts" in conditions[0]
+        assert "UNION" in conditions[0]
+        assert "ph.passport_number ILIKE :passport_query" in conditions[0]
+    
+    def test_receipt_search_type(self):
+        """영수증 검색 유형은 영수증 번호 접두사 조건만 사용 테스트"""
+        params = {}
+        conditions = ArchiveService._history_search_conditions("90208724", "receipt", params)
+        assert len(conditions) == 1
+        assert "UNION" not in conditions[0]
+        assert "passport_query" not in params
+    
+    def test_name_query_uses_trigram(self):
+        """문자 검색어는 고객명/여권번호 부분 문자열 검색 (LIKE 특수문자 이스케이프) 테스트"""
+        params = {}
+        conditions = ArchiveService._history_search_conditions("KIM_50%", "all", params)
+        assert params["name_query"] == "%KIM\\_50\\%%"
+        assert "receipt_prefix" not in params
+        assert conditions == ["mh.customer_name ILIKE :name_query", "mh.passport_number ILIKE :passport_query"]
+    
+    def test_search_type(self):
+        """검색 유형별 조건 테스트"""
+        params = {}
+        assert ArchiveService._history_search_conditions("KIM", "receipt", params) == []
+        assert ArchiveService._history_search_conditions("123", "customer", params) == ["mh.customer_name ILIKE :name_query"]
+        assert ArchiveService._history_search_conditions("", "all", {}) == []
@@ -0,0 +1,56 @@
+# tests/test_name_matcher.py
+from app.utils.name_matcher import NameMatcher, normalize_name, name_similarity
+
+class TestNormalizeName:
+    """이름 정규화 키 테스트"""
+    
+    def test_order_case_and_spacing(self):
+        """성/이름 순서, 대소문자, 구분 기호 차이 제거 테스트"""
+        assert normalize_name("Hong Gildong") == "GILDONG HONG"
+        assert normalize_name("GILDONG, HONG") == "GILDONG HONG"
+        assert normalize_name("HONG<<GILDONG") == "GILDONG HONG"
+        assert normalize_name("  ＨＯＮＧ  GIL-DONG ") == "GILDONG HONG"
+    
+    def test_empty(self):
+        """빈 이름 테스트"""
+        assert normalize_name(None) is None
+        assert normalize_name(" - ") is None
+
+class TestNameMatcher:
+    """이름 매칭 테스트 (정규화 키 일치만 자동 매칭)"""
+    
+    def test_similarity(self):
+        """띄어쓰기 차이는 같은 이름, 한 글자 오인식은 높은 유사도 테스트"""
+        assert name_similarity("HONG GIL DONG", "HONG GILDONG") == 1.0
+        assert name_similarity("ZHANG WEI", "ZHANG WEl") > 0.85
+        assert name_similarity("ZHANG WEI", "LI NA") < 0.5
+    
+    def test_exact_key_match(self):
+        """정규화 키가 같은 후보만 매칭 테스트"""
+        matcher = NameMatcher([(1, "WANG XIAOMING"), (2, "XIAOMING WANG"), (3, "WANG XIAOMIN")], threshold=0.85)
+        assert matcher.match("wang xiaoming") == (1, "WANG XIAOMING")
+        assert matcher.match("wang xiaoming", exclude={1}) == (2, "XIAOMING WANG")
+        assert matcher.match("wang xiaoming", exclude={1, 2}) is None
+        assert len(matcher) == 3
+    
+    def test_spacing_difference_is_matched(self):
+        """띄어쓰기만 다른 이름은 정규화 키가 달라도 매칭 테스트"""
+        matcher = NameMatcher([(1, "GILDONG HONG"), (2, "GIL DONG HONG")], threshold=0.85)
+        assert matcher.match("GIL DONG HONG") == (2, "GIL DONG HONG")
+        assert matcher.match("GIL DONG HONG", exclude={2}) == (1, "GILDONG HONG")
+        assert matcher.match("HONG GILDONG", exclude={1}) == (2, "GIL DONG HONG")
+        assert matcher.match("GIL DONG HONK", exclude={2}) is None
+    
+    def test_one_character_difference_is_not_matched(self):
+        """한 글자만 다른 다른 사람은 자동 매칭하지 않고 후보로만 반환 테스트"""
+        matcher = NameMatcher([(1, "WANG LU"), (2, "LEE JUN"), (3, "ZHANG WEN")], threshold=0.85)
+        assert matcher.match("WANG LI") is None
+        assert matcher.match("LEE JIN") is None
+        assert matcher.match("ZHANG WEI") is None
+        assert [candidate[0] for candidate in matcher.suggest("ZHANG WEI")] == [3]
+    
+    def test_suggest_excludes_exact_key(self):
+        """후보 목록은 정규화 키가 다른 유사 이름만 반환 테스트"""
+        matcher = NameMatcher([(1, "WANG XIAOMING"), (2, "WANG XIAOMlNG"), (3, "LI NA")], threshold=0.85)
+        assert [candidate[0] for candidate in matcher.suggest("WANG XIAOMING")] == [2]
+        assert matcher.suggest("ZHAO LEI") == []
@@ -0,0 +1,37 @@
+# tests/test_normalizer.py
+from app.utils.normalizer import normalize_amount, normalize_receipt_number, normalize_text
+
+class TestReceiptNumber:
+    """영수증 번호 정규화 테스트"""
+    
+    def test_string_value(self):
+        """문자열 영수증 번호 테스트"""
+        assert normalize_receipt_number(" 9020-8724-000593 ") == "90208724000593"
+        assert normalize_receipt_number("0123", "shilla") == "0123"
+    
+    def test_numeric_value(self):
+        """숫자/지수 표기로 읽힌 영수증 번호 테스트"""
+        assert normalize_receipt_number(90208724000593.0, "lotte") == "90208724000593"
+        assert normalize_receipt_number("1.234567890123E+12", "shilla") == "1234567890123"
+        assert normalize_receipt_number(123456789012, "shilla") == "0123456789012"
+    
+    def test_empty_value(self):
+        """빈 값 테스트"""
+        assert normalize_receipt_number(None) is None
+        assert normalize_receipt_number(float("nan")) is None
+        assert normalize_receipt_number("nan") is None
+
+class TestColumns:
+    """문자열/금액 컬럼 정규화 테스트"""
+    
+    def test_text(self):
+        """문자열 정규화 테스트"""
+        assert normalize_text("  홍길동 ") == "홍길동"
+        assert normalize_text("") is None
+        assert normalize_text(float("nan")) is None
+    
+    def test_amount(self):
+        """금액 정규화 테스트"""
+        assert normalize_amount("12,000원") == 12000.0
+        assert normalize_amount(None) == 0.0
+        assert normalize_amount("없음") == 0.0
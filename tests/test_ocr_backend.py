@@ -0,0 +1,47 @@
+# tests/test_ocr_backend.py
+import pytest
+
+from app.utils.ocr_backend import OcrBackend, FakeOcrBackend, get_ocr_backend, run_ocr
+
+class TestOcrBackend:
+    """OCR 엔진 선택 및 가짜 엔진 테스트"""
+    
+    def test_unknown_backend(self):
+        """지원하지 않는 엔진 이름 테스트"""
+        with pytest.raises(ValueError):
+            get_ocr_backend("unknown")
+    
+    def test_fake_backend_is_deterministic(self, tmp_path):
+        """가짜 엔진은 같은 이미지에 같은 텍스트 반환"""
+        image_path = tmp_path / "receipt.jpg"
+        image_path.write_bytes(b"fake image")
+        
+        backend = get_ocr_backend("fake")
+        assert isinstance(backend, FakeOcrBackend)
+        assert backend.process_image(str(image_path)) == backend.process_image(str(image_path))
+    
+    def test_fake_backend_sidecar_text(self, tmp_path):
+        """이미지 옆 .txt 파일 내용을 OCR 결과로 사용"""
+        first = tmp_path / "a.jpg"
+        second = tmp_path / "b.png"
+        first.write_bytes(b"a")
+        second.write_bytes(b"b")
+        (tmp_path / "a.txt").write_text("교환권번호 90208724000593", encoding="utf-8")
+        
+        assert run_ocr("fake", str(first)) == "교환권번호 90208724000593"
+        assert run_ocr("fake", str(second)).startswith("FAKE OCR b.png")
+    
+    def test_backend_requires_process_image(self):
+        """process_image를 구현하지 않은 엔진은 생성할 수 없음 테스트"""
+        class IncompleteBackend(OcrBackend):
+            name = "incomplete"
+        
+        with pytest.raises(TypeError):
+            IncompleteBackend()
+    
+    def test_fake_backend_rejects_unsupported_file(self, tmp_path):
+        """지원하지 않는 이미지 형식 테스트"""
+        pdf_path = tmp_path / "scan.pdf"
+        pdf_path.write_bytes(b"pdf")
+        with pytest.raises(ValueError):
+            get_ocr_backend("fake").process_image(str(pdf_path))
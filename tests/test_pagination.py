@@ -0,0 +1,29 @@
+# tests/test_pagination.py
+from datetime import datetime
+
+import pytest
+
+from app.utils.pagination import encode_cursor, decode_cursor, clamp_page_size
+
+class TestCursor:
+    """키셋 페이지네이션 커서 테스트"""
+    
+    def test_round_trip(self):
+        """커서 생성/해석 왕복 테스트"""
+        created_at = datetime(2026, 10, 16, 17, 21, 44, 608319)
+        cursor = encode_cursor(created_at, 123)
+        assert "=" not in cursor
+        assert decode_cursor(cursor) == (created_at, 123)
+    
+    def test_empty_and_invalid(self):
+        """빈 커서는 첫 페이지, 잘못된 커서는 ValueError 테스트"""
+        assert decode_cursor(None) is None
+        assert decode_cursor("") is None
+        with pytest.raises(ValueError):
+            decode_cursor("not-a-cursor")
+    
+    def test_clamp_page_size(self):
+        """페이지 크기 제한 테스트"""
+        assert clamp_page_size(0) == 1
+        assert clamp_page_size(50) == 50
+        assert clamp_page_size(100000) == 200
@@ -0,0 +1,37 @@
+# tests/test_receipt_index.py
+from app.utils.receipt_index import ReceiptNumberIndex
+
+EXCEL_NUMBERS = ["90208724000593", "90208724000598", "90208724001234", "1234567890123"]
+
+class TestReceiptNumberIndex:
+    """영수증 번호 근사 검색 테스트"""
+    
+    def test_lookup_within_distance(self):
+        """자리 차이 1~2 후보 검색 테스트"""
+        index = ReceiptNumberIndex(EXCEL_NUMBERS)
+        assert index.lookup("90208724000598") == [("90208724000593", 1)]
+        assert sorted(index.lookup("98208724000593")) == [("90208724000593", 1), ("90208724000598", 2)]
+        assert index.lookup("90208724777777") == []
+    
+    def test_length_and_format(self):
+        """자리수가 다르거나 숫자가 아닌 번호는 후보 없음 테스트"""
+        index = ReceiptNumberIndex(EXCEL_NUMBERS)
+        assert index.lookup("9020872400059") == []
+        assert index.lookup("ABC") == []
+        assert index.lookup(None) == []
+        assert index.lookup("1234567890128") == [("1234567890123", 1)]
+    
+    def test_suggest_ranks_unclaimed_first(self):
+        """같은 거리면 미매칭 번호 우선 테스트"""
+        index = ReceiptNumberIndex(EXCEL_NUMBERS)
+        suggestions = index.suggest("90208724000590", claimed={"90208724000593"})
+        assert [s["receipt_number"] for s in suggestions] == ["90208724000598", "90208724000593"]
+        assert suggestions[1]["claimed"] is True
+    
+    def test_unique_correction(self):
+        """후보가 1개뿐일 때만 자동 보정 테스트"""
+        index = ReceiptNumberIndex(EXCEL_NUMBERS)
+        assert index.unique_correction("90208724001284") == "90208724001234"
+        assert index.unique_correction("90208724000590") is None  # 거리 1 후보 2개
+        assert index.unique_correction("90208724001284", claimed={"90208724001234"}) is None
+        assert index.unique_correction("98208724000593", max_distance=1) == "90208724000593"